@@ -0,0 +1,304 @@
+#!/usr/bin/python
+
+from dataloader import DataLoader
+from galaxy_temp import run_galaxies
+from galaxyfinder import GalaxyFinder
+from galaxyimage import GalaxyImage
+from galaxyloader import GalaxyLoader
+from galaxymasker import GalaxyMasker
+from galaxyunwinder import GalaxyUnwinder
+from radialaverager import RadialAverager
+from radialprofiler import RadialProfiler
+from syntheticdataset import write_dataset
+from temperaturecalculator import TemperatureCalculator
+from temperatureprofile import TemperatureProfile
+
+from typing import Any, Callable
+import argparse
+import json
+import numpy
+import os
+import platform
+import sys
+import tempfile
+import time
+
+"""
+benchmark.py
+
+Times every stage of the pipeline, and the whole pipeline, in galaxies per second.
+
+By default the benchmarks run on a freshly generated synthetic data set (see
+syntheticdataset.py), so they need nothing but the code. Each stage is timed over
+the same galaxies several times and the best pass is kept. Results are compared with
+a stored baseline, and any stage slower than the baseline by more than the tolerance
+is reported as a regression.
+
+    ./benchmark.py --save-baseline   # record the baseline on this machine
+    ./benchmark.py                   # compare against it
+"""
+
+BASELINE_PATH = "benchmark_baseline.json"
+
+# Fraction of its baseline speed a stage may lose before it counts as a regression
+REGRESSION_TOLERANCE = 0.2
+
+
+def time_stage(stage: Callable[[], Any], repeats: int) -> tuple[float, Any]:
+    """
+    Times a pass of a stage over every benchmark galaxy.
+
+    Parameters:
+        stage (Callable): runs the stage on every galaxy
+        repeats (int): number of passes, the fastest is kept
+
+    Returns:
+        float: seconds taken by the fastest pass
+        Any: what the last pass returned
+    """
+    best = numpy.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = stage()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmarks(dataset_path: str, count: int, repeats: int = 3) -> dict[str, float]:
+    """
+    Times every stage on the first count spirals of a data set.
+
+    Must run in a scratch directory, as TemperatureProfile writes to output/.
+
+    Parameters:
+        dataset_path (str): data set to benchmark on
+        count (int): number of galaxies to time
+        repeats (int): passes per stage, the fastest is kept
+
+    Returns:
+        dict[str, float]: galaxies per second of each stage and the whole pipeline
+    """
+    rates: dict[str, float] = {}
+
+    def record(name: str, stage: Callable[[], Any], galaxies: int) -> Any:
+        seconds, result = time_stage(stage, repeats)
+        rates[name] = galaxies / seconds
+        print(f"{name:<36} {rates[name]:10.1f} galaxies/s", flush=True)
+        return result
+
+    with DataLoader(dataset_path) as data_loader:
+        galaxy_numbers = [
+            int(n) for n in data_loader.catalog.select(count=count, sample=False)
+        ]
+
+        def load_galaxies() -> list[GalaxyLoader]:
+            galaxies = [GalaxyLoader(n, data_loader.dataset) for n in galaxy_numbers]
+            for galaxy in galaxies:
+                galaxy.pixels
+            return galaxies
+
+        galaxies = record("DataLoader", load_galaxies, len(galaxy_numbers))
+
+        wide = [galaxy.load_image("Wide") for galaxy in galaxies]
+
+        def find_galaxies(fast: bool) -> list:
+            locations = []
+            for image in wide:
+                try:
+                    locations.append(GalaxyFinder(image, fast=fast).find_galaxy())
+                except ValueError:
+                    locations.append(None)
+            return locations
+
+        locations = record("GalaxyFinder", lambda: find_galaxies(False), len(wide))
+        record("GalaxyFinder (fast)", lambda: find_galaxies(True), len(wide))
+
+        # The later stages only run on the galaxies that were found
+        found = [
+            (n, galaxy, location)
+            for n, galaxy, location in zip(galaxy_numbers, galaxies, locations)
+            if location is not None
+        ]
+        bands = [
+            (galaxy.load_image("R"), galaxy.load_image("G")) for _, galaxy, _ in found
+        ]
+
+        record(
+            "TemperatureCalculator",
+            lambda: [
+                TemperatureCalculator(r, g).compute_temperature_image()
+                for r, g in bands
+            ],
+            len(found),
+        )
+        temperatures = record(
+            "TemperatureCalculator (lookup table)",
+            lambda: [
+                TemperatureCalculator(
+                    r, g, use_lookup_table=True
+                ).compute_temperature_image()
+                for r, g in bands
+            ],
+            len(found),
+        )
+        masked = record(
+            "GalaxyMasker",
+            lambda: [
+                GalaxyMasker(temperature, location).mask_out_galaxy()
+                for temperature, (_, _, location) in zip(temperatures, found)
+            ],
+            len(found),
+        )
+        polar = record(
+            "GalaxyUnwinder",
+            lambda: [GalaxyUnwinder(GalaxyImage(image)).unwind() for image in masked],
+            len(found),
+        )
+        record(
+            "RadialAverager",
+            lambda: [RadialAverager(image).compute_average() for image in polar],
+            len(found),
+        )
+        record(
+            "RadialAverager (statistics)",
+            lambda: [
+                RadialAverager(image).compute_statistics(percentiles=(16, 84))
+                for image in polar
+            ],
+            len(found),
+        )
+        profiles = record(
+            "RadialProfiler",
+            lambda: [
+                RadialProfiler(GalaxyImage(image)).compute_profile() for image in masked
+            ],
+            len(found),
+        )
+        os.makedirs("output", exist_ok=True)
+        record(
+            "TemperatureProfile",
+            lambda: [
+                TemperatureProfile(profile).plot_temperature(n)
+                for profile, (n, _, _) in zip(profiles, found)
+            ],
+            len(found),
+        )
+
+        record(
+            "pipeline",
+            lambda: list(run_galaxies(galaxy_numbers, data_loader)),
+            len(galaxy_numbers),
+        )
+
+    return rates
+
+
+def compare(
+    rates: dict[str, float],
+    baseline: dict[str, float],
+    tolerance: float = REGRESSION_TOLERANCE,
+) -> list[str]:
+    """
+    Compares benchmark results with a baseline.
+
+    Parameters:
+        rates (dict[str, float]): galaxies per second of each stage
+        baseline (dict[str, float]): galaxies per second of each stage in the baseline
+        tolerance (float): fraction of its baseline speed a stage may lose
+
+    Returns:
+        list[str]: the stages that regressed
+    """
+    regressions = []
+    print(f"\n{'stage':<36} {'galaxies/s':>10} {'baseline':>10} {'change':>8}")
+    for name, rate in rates.items():
+        if name not in baseline:
+            print(f"{name:<36} {rate:10.1f} {'-':>10} {'-':>8}")
+            continue
+        change = rate / baseline[name] - 1
+        flag = ""
+        if change < -tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36} {rate:10.1f} {baseline[name]:10.1f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time each pipeline stage in galaxies per second."
+    )
+    parser.add_argument(
+        "--dataset",
+        default=None,
+        help="data set to benchmark on (default: a generated synthetic one)",
+    )
+    parser.add_argument(
+        "--count", type=int, default=50, help="number of spirals to time"
+    )
+    parser.add_argument("--repeats", type=int, default=3, help="passes per stage")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store these results as the baseline instead of comparing with it",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=REGRESSION_TOLERANCE,
+        help="fraction of its baseline speed a stage may lose",
+    )
+    args = parser.parse_args(argv)
+
+    baseline_path = os.path.abspath(args.baseline)
+    dataset_path = args.dataset and os.path.abspath(args.dataset)
+
+    # Run in a scratch directory, so plots and caches don't land in the checkout
+    working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            if dataset_path is None:
+                dataset_path = os.path.join(scratch, "Dataset.h5")
+                # Classes 6 and 7 are two thirds of the draws
+                write_dataset(dataset_path, args.count * 3 // 2 + 8, seed=0)
+            rates = run_benchmarks(dataset_path, args.count, args.repeats)
+        finally:
+            os.chdir(working_directory)
+
+    if args.save_baseline:
+        with open(baseline_path, "w") as file:
+            json.dump(
+                {
+                    "environment": {
+                        "machine": platform.machine(),
+                        "processor": platform.processor(),
+                        "python": platform.python_version(),
+                        "numpy": numpy.__version__,
+                        "dataset": args.dataset or "synthetic",
+                        "count": args.count,
+                    },
+                    "rates": rates,
+                },
+                file,
+                indent=4,
+            )
+        print(f"Saved baseline to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}, run with --save-baseline first.")
+        return 0
+    with open(baseline_path) as file:
+        baseline = json.load(file)["rates"]
+
+    regressions = compare(rates, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+from syntheticdataset import write_dataset
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def synthetic_dataset(tmp_path_factory) -> str:
+    """
+    A small synthetic data set of unbarred spirals, shaped like Galaxy10 DECaLS.
+    """
+    path = str(tmp_path_factory.mktemp("dataset") / "Dataset.h5")
+    write_dataset(path, 6, classes=(6, 7), seed=0, size=96)
+    return path
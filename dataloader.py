@@ -1,59 +1,142 @@
+from galaxycatalog import GalaxyCatalog
 from galaxyloader import GalaxyLoader
+from rawdataset import RawDataset
 
-from typing import Generator
+from typing import Generator, Iterable
 import h5py
 import numpy
-import random
 
 
 class DataLoader:
     """
     Loads all of the images in the data set
 
+    The data set file is opened once and shared by every GalaxyLoader handed out.
+    Use the DataLoader as a context manager, or call close(), to release it.
+    The data set is either a Galaxy10 HDF5 file, or a raw export of part of one
+    (see RawDataset), which is memory-mapped instead.
+
     Attributes:
         load_path (str): Path to where the data is stored
+        index_path (str | None): where the catalog of the data set is stored, None
+            for its default place
     """
 
-    def __init__(self, dataset_path: str = "dataset/Dataset.h5"):
+    def __init__(
+        self, dataset_path: str = "dataset/Dataset.h5", index_path: str | None = None
+    ):
         """
         Initializes a DataLoader object
 
         Parameters:
             dataset_path (str): passes to load_path attribute
+            index_path (str, optional): passes to index_path attribute
         """
         self.load_path = dataset_path
+        self.index_path = index_path
+        self._dataset: h5py.File | RawDataset | None = None
+        self._catalog: GalaxyCatalog | None = None
+
+    def __enter__(self) -> "DataLoader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def dataset(self) -> h5py.File | RawDataset:
+        """
+        Gets the shared data set file, opening it on first use.
+
+        Returns:
+            h5py.File | RawDataset: data set opened read-only
+        """
+        if self._dataset is None:
+            if RawDataset.is_raw(self.load_path):
+                self._dataset = RawDataset(self.load_path)
+            else:
+                self._dataset = h5py.File(self.load_path, "r")
+        return self._dataset
+
+    @property
+    def catalog(self) -> GalaxyCatalog:
+        """
+        Gets the index of the data set, building it on first use.
+
+        Returns:
+            GalaxyCatalog: labels and statistics for every galaxy in the data set
+        """
+        if self._catalog is None:
+            self._catalog = GalaxyCatalog.open(
+                self.dataset, self.load_path, self.index_path
+            )
+        return self._catalog
 
-    def load_all_galaxies(self) -> Generator:
+    def close(self) -> None:
+        """
+        Saves any locations recorded in the catalog, then closes the shared
+        data set file, if it is open.
+        """
+        if self._catalog is not None:
+            self._catalog.flush()
+            self._catalog = None
+        if self._dataset is not None:
+            self._dataset.close()
+            self._dataset = None
+
+    def load_batch(self, galaxy_numbers: Iterable[int]) -> numpy.ndarray:
+        """
+        Loads every band of many galaxies in one read.
+
+        Parameters:
+            galaxy_numbers (Iterable[int]): indices of the galaxies to load
+
+        Returns:
+            numpy.ndarray: (N, height, width, 3) G, R and Z bands of each galaxy,
+            in the order of galaxy_numbers
+        """
+        galaxy_numbers = numpy.asarray(galaxy_numbers, dtype="int64")
+        if isinstance(self.dataset, RawDataset):
+            # Band planes are transposed back without copying
+            rows = self.dataset.rows(galaxy_numbers)
+            return self.dataset.images[rows].transpose(0, 2, 3, 1)
+        # h5py can only read increasing, unique indices in one selection
+        unique_numbers, order = numpy.unique(galaxy_numbers, return_inverse=True)
+        return self.dataset["images"][unique_numbers][order]
+
+    def load_all_galaxies(
+        self,
+        classes: Iterable[int] = (6, 7),
+        count: int | None = 10,
+        seed: int | None = None,
+    ) -> Generator:
         """
         Loads all of the galaxies in the data set
 
+        Parameters:
+            classes (Iterable[int]): Galaxy10 classes to load, by default 6 and 7 which
+                are unbarred tight spirals and unbarred loose spirals respectively
+            count (int, optional): number of galaxies to pick at random, all if None
+            seed (int, optional): seed for the random pick, so runs can be repeated
+
         Returns:
             galaxy_number (int): Number of each galaxy loaded in
             GalaxyLoader (GalaxyLoader): GalaxyLoader object for the galaxy number
         """
-        dataset: h5py.File = h5py.File(self.load_path, "r")
-        classification: numpy.ndarray[int] = dataset["ans"]
-        # creates a list of galaxies filtered to only types 6 and 7 which unbarred tight spirals
-        # and unbarred loose spirals respectively
-        filtered_galaxies = [
-            index
-            for index, galaxy_class in enumerate(classification)
-            if int(galaxy_class) in (6, 7)
-        ]
-        # passes a random selection of the filtered galaxies into a GalaxyLoader class
-        for galaxy_number in random.choices(filtered_galaxies, k=10):
-            yield galaxy_number, GalaxyLoader(galaxy_number, self.load_path)
+        # the catalog filters on the stored labels, without scanning the data set
+        for galaxy_number in self.catalog.select(classes, count=count, seed=seed):
+            yield int(galaxy_number), GalaxyLoader(int(galaxy_number), self.dataset)
 
 
 if __name__ == "__main__":
     import matplotlib.pyplot
 
-    dataloader = DataLoader()
-    for galaxyloader in dataloader.load_all_galaxies():
-        images = [image for band, image in galaxyloader[1].load_all_images()]
-        wide, g, r, z = images
-        matplotlib.pyplot.imshow(
-            numpy.array(r.data, dtype="int16") - numpy.array(g.data, dtype="int16")
-        )
-        matplotlib.pyplot.colorbar()
-        matplotlib.pyplot.show()
+    with DataLoader() as dataloader:
+        for galaxyloader in dataloader.load_all_galaxies():
+            images = [image for band, image in galaxyloader[1].load_all_images()]
+            wide, g, r, z = images
+            matplotlib.pyplot.imshow(
+                numpy.array(r.data, dtype="int16") - numpy.array(g.data, dtype="int16")
+            )
+            matplotlib.pyplot.colorbar()
+            matplotlib.pyplot.show()
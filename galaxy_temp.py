@@ -1,16 +1,41 @@
 #!/usr/bin/python
 
-import numpy
+from concurrent.futures import ProcessPoolExecutor
 from dataloader import DataLoader
+from galaxycatalog import INDEX_DIRECTORY, dataset_fingerprint
 from galaxyfinder import GalaxyFinder
+from galaxyloader import GalaxyLoader, required_bands
 from galaxylocation import GalaxyLocation
 from galaxymasker import GalaxyMasker
 from galaxyimage import GalaxyImage
-from galaxyunwinder import GalaxyUnwinder
 from image import Image
-from radialaverager import RadialAverager
+from instrumentation import Instrumentation
+from populationstatistics import PopulationStatistics
+from precision import DEFAULT_PRECISION, PROFILE_TOLERANCE, relative_error
+from prefetchloader import PrefetchLoader
+from profilestore import ROW_CHUNK_SIZE, ProfileStore
+from profilerenderer import ProfileRenderer, render_profiles, sample_profiles
+from radialprofiler import RadialProfiler
+from rawdataset import RawDataset
+from runmanifest import RunManifest
+from sharding import parse_shard, shard_galaxies, shard_path
+from stagecache import StageCache
 from temperaturecalculator import TemperatureCalculator
-from temperatureprofile import TemperatureProfile
+
+from types import ModuleType
+from typing import Any, Callable, Iterable, Iterator
+import argparse
+import functools
+import galaxyfinder
+import galaxyloader
+import galaxymasker
+import image
+import numpy
+import os
+import precision
+import radialprofiler
+import sys
+import temperaturecalculator
 
 """
 galaxy_temp.py
@@ -18,42 +43,666 @@ galaxy_temp.py
 This script processes galaxy images stored in HDF5 (.h5) format to generate temperature profiles.
 
 Workflow:
-1. Load R-band, G-band, and Z-band images from the .h5 file.
-2. Automatically find the location of the galaxy using the R-band.
-3. Mask everything outside the galaxy to clean up noise.
-4. Calculate a temperature map using color differences between bands.
-5. Unwind the image radially.
-6. Compute the radial average temperature profile.
-7. Plot and save the temperature profile as a .png.
+1. Load the bands the stages below consume from the .h5 file, when first needed.
+2. Automatically find the location of the galaxy using the wide band.
+3. Calculate a temperature map using the color difference between the R and G bands.
+4. Mask everything outside the galaxy to clean up noise.
+5. Compute the radial average temperature profile by binning pixels on their radius.
+   Profiles are appended to output/profiles.h5 (see ProfileStore).
+6. Plot and save the temperature profiles as .png files, once every galaxy is done.
 
 This allows us to visualize how the temperature changes as we move outward from the galaxy center.
+
+Galaxies can be spread across several processes with --workers, or across machines with
+--shard (see sharding.py), and an interrupted run can be carried on with --resume; see
+--help for all options.
 """
 
-data_loader: DataLoader = DataLoader()
-for galaxy_number, galaxy in data_loader.load_all_galaxies():
-    galaxy_images: dict[str, Image] = {}
-    for band, image in galaxy.load_all_images():
-        galaxy_images[band] = image
+# Galaxies processed between checkpoints of the profile store and run manifest
+CHECKPOINT_INTERVAL = 32
+
+# Bands of the data set the pipeline's stages consume; the rest are never read
+PIPELINE_BANDS = required_bands(GalaxyFinder, TemperatureCalculator)
+
+# Modules every stage computes with, whose changes invalidate every cached result;
+# this module itself holds the closures computing each stage
+CORE_MODULES = (image, precision, sys.modules[__name__])
+
+
+class PipelineOptions:
+    """
+    PipelineOptions
+
+    Settings of the per-galaxy pipeline, handed to every worker process.
+
+    Attributes:
+        fast_finder (bool): locate galaxies with GalaxyFinder's fast mode
+        stage_cache (StageCache | None): cache of stage results reused between runs,
+            None to compute everything
+        precision (str): float precision every stage computes in, "float32" or
+            "float64"
+        check_precision (bool): also compute each profile in float64, and fail
+            galaxies whose profile differs from it by more than PROFILE_TOLERANCE
+        instrumentation (Instrumentation): measures every stage when enabled
+    """
+
+    def __init__(
+        self,
+        fast_finder: bool = False,
+        stage_cache: StageCache | None = None,
+        precision: str = DEFAULT_PRECISION,
+        check_precision: bool = False,
+        instrumentation: Instrumentation | None = None,
+    ) -> None:
+        self.fast_finder: bool = fast_finder
+        self.stage_cache: StageCache | None = stage_cache
+        self.precision: str = precision
+        self.check_precision: bool = check_precision
+        self.instrumentation: Instrumentation = instrumentation or Instrumentation()
+
+    def run_stage(
+        self,
+        galaxy: GalaxyLoader,
+        stage: str,
+        params: dict,
+        code: tuple[ModuleType, ...],
+        compute: Callable,
+    ) -> Any:
+        """
+        Computes a stage of the pipeline for a galaxy, or loads it from the stage cache.
+
+        Parameters:
+            galaxy (GalaxyLoader): loader for the galaxy the stage runs on
+            stage (str): name of the stage
+            params (dict): parameters of the stage
+            code (tuple[ModuleType, ...]): modules whose source computes the stage
+            compute (Callable): computes the stage result
+
+        Returns:
+            Any: the stage result
+        """
+        with self.instrumentation.measure(stage) as sample:
+            if self.stage_cache is None:
+                result = compute()
+            else:
+                # Results are keyed on the galaxy and the version of the data set
+                # holding it
+                source = (
+                    galaxy.galaxy_number,
+                    dataset_fingerprint(galaxy.dataset_path).tolist(),
+                )
+                result = self.stage_cache.get_or_compute(
+                    stage, params, source, code, compute
+                )
+            sample.add_array(result)
+        return result
+
+
+class GalaxyResult:
+    """
+    GalaxyResult
+
+    Outcome of running the pipeline on one galaxy.
+
+    Attributes:
+        galaxy_number (int): index of the galaxy in the data set
+        location (GalaxyLocation | None): where the galaxy was found, None on failure
+        profile (list[float] | None): radial temperature profile, None on failure
+        error (str | None): why the galaxy failed, None on success
+        samples (list[tuple]): measurements of the galaxy's stages, when the
+            pipeline is instrumented
+    """
+
+    def __init__(
+        self,
+        galaxy_number: int,
+        location: GalaxyLocation | None = None,
+        profile: list[float] | None = None,
+        error: str | None = None,
+        samples: list[tuple] | None = None,
+    ) -> None:
+        self.galaxy_number: int = galaxy_number
+        self.location: GalaxyLocation | None = location
+        self.profile: list[float] | None = profile
+        self.error: str | None = error
+        self.samples: list[tuple] = samples or []
+
+
+def process_galaxy(
+    galaxy: GalaxyLoader, options: PipelineOptions | None = None
+) -> tuple[GalaxyLocation, list[float]]:
+    """
+    Runs every stage of the pipeline on one galaxy.
 
-    galaxy_finder: GalaxyFinder = GalaxyFinder(galaxy_images["Wide"])
-    galaxy_location: GalaxyLocation = galaxy_finder.find_galaxy()
+    Parameters:
+        galaxy (GalaxyLoader): loader for the galaxy to process
+        options (PipelineOptions, optional): settings of the pipeline, defaults
+            to a fresh PipelineOptions()
 
-    mask_images: dict[str, Image] = {}
-    for band, image in galaxy_images.items():
-        galaxy_masker: GalaxyMasker = GalaxyMasker(image, galaxy_location)
-        mask_images[band] = galaxy_masker.mask_out_galaxy()
+    Returns:
+        GalaxyLocation: where the galaxy was found
+        list[float]: radial temperature profile of the galaxy
+    """
+    if options is None:
+        options = PipelineOptions()
 
-    temperature_calculator: TemperatureCalculator = TemperatureCalculator(
-        mask_images["R"], mask_images["G"], mask_images["Z"]
+    # Bands are only read from the data set by the stages that aren't cached, and
+    # only the bands those stages consume
+    def read_bands(*stages: Any) -> None:
+        with options.instrumentation.measure("read"):
+            galaxy.read_bands(required_bands(*stages))
+
+    def find_galaxy() -> GalaxyLocation:
+        read_bands(GalaxyFinder)
+        galaxy_finder: GalaxyFinder = GalaxyFinder(
+            galaxy.load_image("Wide"), fast=options.fast_finder
+        )
+        return galaxy_finder.find_galaxy()
+
+    galaxy_location: GalaxyLocation = options.run_stage(
+        galaxy,
+        "find_galaxy",
+        {"fast": options.fast_finder},
+        (*CORE_MODULES, galaxyloader, galaxyfinder),
+        find_galaxy,
+    )
+    location_params = {
+        "center": [int(x) for x in galaxy_location.center],
+        "radius": int(galaxy_location.radius),
+        "lookup_table": True,
+        "precision": options.precision,
+    }
+
+    def compute_temperature_image() -> numpy.ndarray:
+        # Temperature is computed per pixel on the raw 8-bit bands, so it can be
+        # gathered from the lookup table and only the resulting map needs masking.
+        read_bands(TemperatureCalculator)
+        temperature_calculator: TemperatureCalculator = TemperatureCalculator(
+            galaxy.load_image("R"),
+            galaxy.load_image("G"),
+            use_lookup_table=True,
+            dtype=options.precision,
+        )
+
+        galaxy_masker: GalaxyMasker = GalaxyMasker(
+            temperature_calculator.compute_temperature_image(),
+            galaxy_location,
+            dtype=options.precision,
+        )
+        return galaxy_masker.mask_out_galaxy().data
+
+    def compute_profile() -> numpy.ndarray:
+        temperature_image: GalaxyImage = GalaxyImage(
+            Image(
+                options.run_stage(
+                    galaxy,
+                    "temperature_image",
+                    location_params,
+                    (*CORE_MODULES, galaxyloader, temperaturecalculator, galaxymasker),
+                    compute_temperature_image,
+                )
+            )
+        )
+        radial_profiler: RadialProfiler = RadialProfiler(temperature_image)
+        return numpy.array(radial_profiler.compute_profile())
+
+    profile: numpy.ndarray = options.run_stage(
+        galaxy,
+        "radial_profile",
+        location_params,
+        (
+            *CORE_MODULES,
+            galaxyloader,
+            temperaturecalculator,
+            galaxymasker,
+            radialprofiler,
+        ),
+        compute_profile,
     )
+    return galaxy_location, [float(x) for x in profile]
+
+
+def run_galaxy(
+    galaxy_number: int,
+    galaxy: GalaxyLoader | None = None,
+    options: PipelineOptions | None = None,
+) -> GalaxyResult:
+    """
+    Processes one galaxy, catching any failure so the rest of a batch can carry on.
+
+    Parameters:
+        galaxy_number (int): index of the galaxy in the data set
+        galaxy (GalaxyLoader, optional): loader for the galaxy, defaults to one
+            reading from the data set opened for this worker process
+        options (PipelineOptions, optional): settings of the pipeline, defaults
+            to a fresh PipelineOptions()
 
-    temperature_image: GalaxyImage = temperature_calculator.compute_temperature_image()
+    Returns:
+        GalaxyResult: the profile of the galaxy, or why it failed
+    """
+    if options is None:
+        options = PipelineOptions()
+    if galaxy is None:
+        galaxy = GalaxyLoader(galaxy_number, _worker_loader.dataset)
 
-    galaxy_unwinder: GalaxyUnwinder = GalaxyUnwinder(temperature_image)
-    temperature_unwound: numpy.ndarray = galaxy_unwinder.unwind()
+    try:
+        with options.instrumentation.measure("galaxy"):
+            location, profile = process_galaxy(galaxy, options)
+        if options.check_precision:
+            _, reference = process_galaxy(
+                galaxy, PipelineOptions(options.fast_finder, precision="float64")
+            )
+            error = relative_error(profile, reference)
+            if error > PROFILE_TOLERANCE:
+                raise ValueError(
+                    f"{options.precision} profile differs from float64 by {error:.3g}"
+                )
+    except Exception as error:
+        return GalaxyResult(
+            galaxy_number,
+            error=f"{type(error).__name__}: {error}",
+            samples=options.instrumentation.drain(),
+        )
 
-    radial_averager: RadialAverager = RadialAverager(temperature_unwound)
-    temperature_profile: TemperatureProfile = TemperatureProfile(
-        radial_averager.compute_average()
+    return GalaxyResult(
+        galaxy_number, location, profile, samples=options.instrumentation.drain()
     )
-    temperature_profile.plot_temperature(galaxy_number)
+
+
+# Each worker process opens its own handle on the data set, as h5py file handles
+# can't be shared between processes.
+_worker_loader: DataLoader | None = None
+
+
+def _init_worker(dataset_path: str) -> None:
+    global _worker_loader
+    _worker_loader = DataLoader(dataset_path)
+
+
+def run_galaxies(
+    galaxy_numbers: Iterable[int],
+    data_loader: DataLoader,
+    workers: int = 1,
+    prefetch_depth: int = 16,
+    prefetch_memory: int = 256 * 2**20,
+    options: PipelineOptions | None = None,
+) -> Iterator[GalaxyResult]:
+    """
+    Runs the pipeline over many galaxies, in this process or across a process pool.
+
+    Parameters:
+        galaxy_numbers (Iterable[int]): indices of the galaxies to process
+        data_loader (DataLoader): loader for the data set
+        workers (int): number of worker processes, 1 runs everything in this process
+        prefetch_depth (int): most galaxies read ahead in the background when
+            running in this process, 0 to read each galaxy when it is needed
+        prefetch_memory (int): most bytes of galaxies read ahead
+        options (PipelineOptions, optional): settings of the pipeline, defaults
+            to a fresh PipelineOptions()
+
+    Returns:
+        Iterator[GalaxyResult]: one result per galaxy, in increasing galaxy number
+    """
+    if options is None:
+        options = PipelineOptions()
+    galaxy_numbers = sorted(int(galaxy_number) for galaxy_number in galaxy_numbers)
+
+    if workers <= 1:
+        # Raw exports are memory-mapped, so there is nothing to read ahead
+        if prefetch_depth > 0 and not isinstance(data_loader.dataset, RawDataset):
+            galaxies = PrefetchLoader(
+                data_loader,
+                galaxy_numbers,
+                prefetch_depth,
+                prefetch_memory,
+                PIPELINE_BANDS,
+            )
+        else:
+            galaxies = (
+                (galaxy_number, GalaxyLoader(galaxy_number, data_loader.dataset))
+                for galaxy_number in galaxy_numbers
+            )
+        for galaxy_number, galaxy in galaxies:
+            yield run_galaxy(galaxy_number, galaxy, options)
+        return
+
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(data_loader.load_path,)
+    ) as pool:
+        # map keeps results in submission order, whichever worker finishes first
+        chunksize = max(1, len(galaxy_numbers) // (workers * 8))
+        yield from pool.map(
+            functools.partial(run_galaxy, options=options),
+            galaxy_numbers,
+            chunksize=chunksize,
+        )
+
+
+def fold_stored_profiles(
+    population: PopulationStatistics,
+    profile_store: ProfileStore,
+    galaxy_numbers: Iterable[int],
+    classes: numpy.ndarray,
+    profiles: list[tuple[int, list[float]]] | None = None,
+) -> None:
+    """
+    Folds profiles stored by an earlier, interrupted run into population statistics,
+    reading them a chunk of rows at a time.
+
+    Parameters:
+        population (PopulationStatistics): statistics to fold the profiles into
+        profile_store (ProfileStore): store holding the profiles
+        galaxy_numbers (Iterable[int]): galaxies to fold in, if they are stored
+        classes (numpy.ndarray): Galaxy10 class of every galaxy, e.g. from the catalog
+        profiles (list[tuple[int, list[float]]], optional): also gets the galaxy
+            number and profile of each stored galaxy, so they can be plotted
+    """
+    stored = sorted(int(n) for n in galaxy_numbers if n in profile_store)
+    for start in range(0, len(stored), ROW_CHUNK_SIZE):
+        rows = profile_store.read(stored[start : start + ROW_CHUNK_SIZE])
+        for galaxy_number, length, profile in zip(
+            rows["galaxy_number"].tolist(), rows["length"], rows["profile"]
+        ):
+            population.add(classes[galaxy_number], profile[:length])
+            if profiles is not None:
+                profiles.append((galaxy_number, profile[:length].tolist()))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compute radial temperature profiles of Galaxy10 DECaLS spirals."
+    )
+    parser.add_argument("--dataset", default="dataset/Dataset.h5")
+    parser.add_argument(
+        "--index",
+        default=None,
+        help="where the catalog index of the data set is kept "
+        f"(default: under {INDEX_DIRECTORY})",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="number of processes to run"
+    )
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=10,
+        help="number of galaxies to pick at random, 0 for every galaxy",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="seed of the random galaxy pick"
+    )
+    parser.add_argument(
+        "--prefetch-depth",
+        type=int,
+        default=16,
+        help="galaxies to read ahead in the background, 0 to disable",
+    )
+    parser.add_argument(
+        "--prefetch-memory",
+        type=int,
+        default=256,
+        help="most megabytes of galaxies to read ahead",
+    )
+    parser.add_argument(
+        "--fast-finder",
+        action="store_true",
+        help="only deblend around the central galaxy when it is blended or very large",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="DIRECTORY",
+        default=None,
+        help="reuse stage results stored in DIRECTORY between runs",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        help="most megabytes of stage results to keep in the cache",
+    )
+    parser.add_argument(
+        "--classes",
+        type=int,
+        nargs="+",
+        default=[6, 7],
+        help="Galaxy10 classes to process (default: unbarred spirals)",
+    )
+    parser.add_argument(
+        "--plots",
+        choices=["all", "sample", "summary", "none"],
+        default="all",
+        help="plot every galaxy, a random sample of them, only a summary sheet "
+        "of a sample, or nothing",
+    )
+    parser.add_argument(
+        "--plot-sample",
+        type=int,
+        default=20,
+        help="number of galaxies plotted with --plots sample or summary",
+    )
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=None,
+        help="number of processes rendering plots (default: --workers)",
+    )
+    parser.add_argument(
+        "--store",
+        default="output/profiles.h5",
+        help="HDF5 file the profiles and locations are appended to, with the "
+        "shard in its name when sharded",
+    )
+    parser.add_argument(
+        "--population",
+        default="output/population.npz",
+        help="where the per-class statistics of every profile are saved, and "
+        "plotted next to as .png, with the shard in its name when sharded",
+    )
+    parser.add_argument(
+        "--precision",
+        choices=["float32", "float64"],
+        default=DEFAULT_PRECISION,
+        help="float precision of every stage, float64 for validation",
+    )
+    parser.add_argument(
+        "--check-precision",
+        action="store_true",
+        help="also compute every profile in float64 and fail galaxies that differ "
+        f"by more than a relative {PROFILE_TOLERANCE:g}",
+    )
+    parser.add_argument(
+        "--manifest",
+        default="output/manifest.jsonl",
+        help="checkpoint of the run's finished galaxies, used by --resume, with "
+        "the shard in its name when sharded",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="carry on the run in --manifest, skipping the galaxies it finished",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="attempts at a failing galaxy before --resume gives up on it",
+    )
+    parser.add_argument(
+        "--instrument",
+        metavar="REPORT",
+        default=None,
+        help="time every stage and write a JSON report of them to REPORT",
+    )
+    parser.add_argument(
+        "--no-trace-memory",
+        action="store_true",
+        help="leave out peak memory from --instrument, which slows allocations",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="I/N",
+        type=parse_shard,
+        default=None,
+        help="only process the I-th of N equal shards of the selected galaxies, "
+        "counting from 0; merge the shards with ./sharding.py merge",
+    )
+    args = parser.parse_args(argv)
+    store_path = shard_path(args.store, args.shard)
+    manifest_path = shard_path(args.manifest, args.shard)
+    population_path = shard_path(args.population, args.shard)
+    # A fresh checkout has no output directory yet
+    for path in (store_path, manifest_path, population_path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    instrumentation = Instrumentation(
+        enabled=args.instrument is not None, trace_memory=not args.no_trace_memory
+    )
+
+    if args.resume:
+        manifest = RunManifest.load(manifest_path)
+        params = manifest.params
+        if params["fingerprint"] != dataset_fingerprint(args.dataset).tolist():
+            print(
+                f"Error: {args.dataset} changed since the run in {manifest_path}",
+                file=sys.stderr,
+            )
+            return 1
+        seed = params["seed"]
+    else:
+        # Every shard has to pick the same random galaxies before taking its share
+        if args.shard is not None and args.count and args.seed is None:
+            print("Error: --shard needs --seed unless --count is 0", file=sys.stderr)
+            return 1
+        # Always run with a known seed, so any run can be repeated. Shards of a
+        # run over every galaxy draw nothing, but must agree on their parameters.
+        seed = args.seed
+        if seed is None and args.shard is not None:
+            seed = 0
+        elif seed is None:
+            seed = int(numpy.random.SeedSequence().generate_state(1)[0])
+        params = {
+            "dataset": args.dataset,
+            "fingerprint": dataset_fingerprint(args.dataset).tolist(),
+            "classes": args.classes,
+            "count": args.count,
+            "seed": seed,
+            "fast_finder": args.fast_finder,
+            "precision": args.precision,
+            "shard": list(args.shard) if args.shard is not None else None,
+        }
+    print(f"Seed: {seed}")
+
+    failures = 0
+    profiles = []
+    population = PopulationStatistics()
+    with DataLoader(args.dataset, args.index) as data_loader, ProfileStore(
+        store_path
+    ) as profile_store:
+        if args.resume:
+            galaxy_numbers = manifest.pending(args.max_attempts)
+            print(
+                f"Resuming: {len(manifest.completed)} galaxies done, "
+                f"{len(galaxy_numbers)} to go"
+            )
+            fold_stored_profiles(
+                population,
+                profile_store,
+                manifest.completed,
+                data_loader.catalog.classes,
+                profiles if args.plots != "none" else None,
+            )
+        else:
+            galaxy_numbers = data_loader.catalog.select(
+                params["classes"], count=params["count"] or None, seed=seed
+            )
+            if args.shard is not None:
+                galaxy_numbers = shard_galaxies(galaxy_numbers, *args.shard)
+            manifest = RunManifest.create(manifest_path, params, galaxy_numbers)
+        # The store also records which galaxies the run was given, so merging
+        # shards can tell which are missing
+        profile_store.begin_run(
+            {**params, "galaxies": manifest.galaxy_numbers.tolist()}
+        )
+
+        for checkpoint, result in enumerate(
+            run_galaxies(
+                galaxy_numbers,
+                data_loader,
+                args.workers,
+                args.prefetch_depth,
+                args.prefetch_memory * 2**20,
+                PipelineOptions(
+                    fast_finder=params["fast_finder"],
+                    precision=params.get("precision", DEFAULT_PRECISION),
+                    check_precision=args.check_precision,
+                    stage_cache=(
+                        StageCache(args.cache, args.cache_size * 2**20)
+                        if args.cache is not None
+                        else None
+                    ),
+                    instrumentation=instrumentation,
+                ),
+            ),
+            start=1,
+        ):
+            instrumentation.add_samples(result.samples)
+            if result.error is not None:
+                failures += 1
+                print(
+                    f"Error: galaxy {result.galaxy_number}: {result.error}",
+                    file=sys.stderr,
+                )
+                manifest.record_failed(result.galaxy_number, result.error)
+            else:
+                data_loader.catalog.record_location(
+                    result.galaxy_number, result.location
+                )
+                profile_store.append(
+                    result.galaxy_number, result.location, result.profile
+                )
+                manifest.record_completed(result.galaxy_number)
+                # Profiles are only held on to if they will be plotted
+                if args.plots != "none":
+                    profiles.append((result.galaxy_number, result.profile))
+                population.add(
+                    data_loader.catalog.classes[result.galaxy_number], result.profile
+                )
+
+            # Galaxies only count as finished once their profiles are on disk
+            if checkpoint % CHECKPOINT_INTERVAL == 0:
+                profile_store.flush()
+                manifest.flush()
+
+    manifest.flush()
+    population.save(population_path)
+
+    # Plotting runs after the pipeline, so it never holds up the science stages.
+    # Galaxies come in increasing number, as in a run that was never interrupted,
+    # so a resumed run samples and plots the same galaxies.
+    profiles.sort(key=lambda profile: profile[0])
+    with instrumentation.measure("render"):
+        if args.plots in ("all", "sample"):
+            render_profiles(
+                profiles,
+                "output",
+                args.render_workers or args.workers,
+                sample=args.plot_sample if args.plots == "sample" else None,
+                seed=seed,
+            )
+        elif args.plots == "summary":
+            ProfileRenderer.render_summary(
+                sample_profiles(profiles, args.plot_sample, seed),
+                shard_path("output/summary.png", args.shard),
+            )
+        if args.plots != "none":
+            population.render(os.path.splitext(population_path)[0] + ".png")
+
+    if instrumentation.enabled:
+        instrumentation.write_report(args.instrument)
+        print(f"Wrote stage report to {args.instrument}")
+
+    print(f"Processed {len(galaxy_numbers) - failures}/{len(galaxy_numbers)} galaxies")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+from galaxylocation import GalaxyLocation
+
+from typing import Any, Iterable
+import h5py
+import hashlib
+import numpy
+import os
+
+# Number of galaxies read at once while building an index
+BUILD_CHUNK_SIZE = 256
+
+# Half-width of the box around the image center used for central brightness
+CENTRAL_HALF_WIDTH = 2
+
+# Where indexes are kept by default, rather than next to data sets that may sit on
+# read-only or shared storage
+INDEX_DIRECTORY = "cache/catalog"
+
+
+def dataset_fingerprint(dataset_path: str) -> numpy.ndarray:
+    """
+    Cheaply identifies a version of a data set file on disk.
+
+    Parameters:
+        dataset_path (str): path to the data set file
+
+    Returns:
+        numpy.ndarray: file size and modification time (ns) of the data set
+    """
+    status = os.stat(dataset_path)
+    return numpy.array([status.st_size, status.st_mtime_ns], dtype="int64")
+
+
+def default_index_path(dataset_path: str, directory: str = INDEX_DIRECTORY) -> str:
+    """
+    Picks where the index of a data set is kept by default.
+
+    Parameters:
+        dataset_path (str): path to the data set file
+        directory (str): directory indexes are kept in
+
+    Returns:
+        str: e.g. cache/catalog/Dataset.h5-<hash of the absolute path>.index.npz, so
+        data sets with the same name in different places get their own index
+    """
+    path_hash = hashlib.sha256(os.path.abspath(dataset_path).encode()).hexdigest()
+    return os.path.join(
+        directory, f"{os.path.basename(dataset_path)}-{path_hash[:16]}.index.npz"
+    )
+
+
+class GalaxyCatalog:
+    """
+    GalaxyCatalog
+
+    Sidecar index of per-galaxy labels and statistics for a data set, so subsets
+    can be selected without scanning the whole image file. The index is built
+    once and stored under INDEX_DIRECTORY, keyed by the data set's size and mtime.
+
+    Attributes:
+        index_path (str): where the index is stored
+        fingerprint (numpy.ndarray): size and mtime of the data set the index describes
+        classes (numpy.ndarray): Galaxy10 class label of each galaxy
+        total_flux (numpy.ndarray): sum of every pixel in every band of each galaxy
+        central_brightness (numpy.ndarray): mean summed-band pixel value in a small
+            box at the image center of each galaxy
+        centers (numpy.ndarray): (N, 2) galaxy center in (x, y) found by GalaxyFinder,
+            -1 where not yet known
+        radii (numpy.ndarray): galaxy radius found by GalaxyFinder, -1 where not yet known
+    """
+
+    def __init__(
+        self,
+        index_path: str,
+        fingerprint: numpy.ndarray,
+        classes: numpy.ndarray,
+        total_flux: numpy.ndarray,
+        central_brightness: numpy.ndarray,
+        centers: numpy.ndarray,
+        radii: numpy.ndarray,
+    ) -> None:
+        self.index_path: str = index_path
+        self.fingerprint: numpy.ndarray = fingerprint
+        self.classes: numpy.ndarray = classes
+        self.total_flux: numpy.ndarray = total_flux
+        self.central_brightness: numpy.ndarray = central_brightness
+        self.centers: numpy.ndarray = centers
+        self.radii: numpy.ndarray = radii
+        self._modified: bool = False
+
+    @classmethod
+    def open(
+        cls, dataset: Any, dataset_path: str, index_path: str | None = None
+    ) -> "GalaxyCatalog":
+        """
+        Loads the index of a data set, building it first if it is missing or stale.
+
+        Parameters:
+            dataset (h5py.File | RawDataset): open data set
+            dataset_path (str): path of the data set, used to fingerprint it
+            index_path (str, optional): where the index is stored, defaults to
+                default_index_path(dataset_path)
+
+        Returns:
+            GalaxyCatalog: index matching the current data set file
+        """
+        if index_path is None:
+            index_path = default_index_path(dataset_path)
+        fingerprint = dataset_fingerprint(dataset_path)
+
+        if os.path.exists(index_path):
+            with numpy.load(index_path) as index:
+                if numpy.array_equal(index["fingerprint"], fingerprint):
+                    return cls(
+                        index_path,
+                        fingerprint,
+                        index["classes"],
+                        index["total_flux"],
+                        index["central_brightness"],
+                        index["centers"],
+                        index["radii"],
+                    )
+
+        catalog = cls.build(dataset, index_path, fingerprint)
+        catalog.save()
+        return catalog
+
+    @classmethod
+    def build(
+        cls, dataset: Any, index_path: str, fingerprint: numpy.ndarray
+    ) -> "GalaxyCatalog":
+        """
+        Scans the whole data set once to compute the index.
+
+        Parameters:
+            dataset (h5py.File | RawDataset): open data set
+            index_path (str): where the index will be stored
+            fingerprint (numpy.ndarray): fingerprint of the data set
+
+        Returns:
+            GalaxyCatalog: freshly computed index, with no known locations
+        """
+        if isinstance(dataset, h5py.File):
+            images = dataset["images"]
+            classes = numpy.asarray(dataset["ans"][:], dtype="int64")
+            galaxy_numbers = numpy.arange(len(classes))
+        else:
+            # A raw export holds a subset of the galaxies, as band planes. The index
+            # still covers every Galaxy10 number, and the galaxies missing from the
+            # export get class -1 so they are never selected.
+            images = dataset.images.transpose(0, 2, 3, 1)
+            classes = numpy.full(dataset.source_count, -1, dtype="int64")
+            classes[dataset.galaxy_numbers] = dataset.classes
+            galaxy_numbers = dataset.galaxy_numbers
+        count = len(classes)
+        height, width = images.shape[1:3]
+        center_y, center_x = height // 2, width // 2
+
+        total_flux = numpy.zeros(count, dtype="int64")
+        central_brightness = numpy.zeros(count, dtype="float64")
+        for start in range(0, len(images), BUILD_CHUNK_SIZE):
+            chunk = images[start : start + BUILD_CHUNK_SIZE]
+            rows = galaxy_numbers[start : start + len(chunk)]
+            total_flux[rows] = chunk.sum(axis=(1, 2, 3), dtype="int64")
+            central = chunk[
+                :,
+                center_y - CENTRAL_HALF_WIDTH : center_y + CENTRAL_HALF_WIDTH + 1,
+                center_x - CENTRAL_HALF_WIDTH : center_x + CENTRAL_HALF_WIDTH + 1,
+            ]
+            central_brightness[rows] = central.sum(axis=3, dtype="int64").mean(
+                axis=(1, 2)
+            )
+
+        return cls(
+            index_path,
+            fingerprint,
+            classes,
+            total_flux,
+            central_brightness,
+            numpy.full((count, 2), -1, dtype="int64"),
+            numpy.full(count, -1, dtype="int64"),
+        )
+
+    def _merge_saved_locations(self) -> None:
+        """
+        Takes in the locations another process saved to the index since it was
+        loaded here, e.g. a concurrent run or another shard, for galaxies with no
+        location recorded here.
+        """
+        try:
+            with numpy.load(self.index_path) as index:
+                if not numpy.array_equal(index["fingerprint"], self.fingerprint):
+                    return
+                centers = index["centers"]
+                radii = index["radii"]
+        except (OSError, KeyError, ValueError):
+            return
+
+        unknown = (self.radii < 0) & (radii >= 0)
+        self.centers[unknown] = centers[unknown]
+        self.radii[unknown] = radii[unknown]
+
+    def save(self) -> None:
+        """
+        Writes the index, merged with the one on disk, replacing it atomically.
+
+        If the index can't be written, e.g. because its directory is read-only, the
+        locations recorded are only kept in memory.
+        """
+        self._merge_saved_locations()
+        temporary_path = f"{self.index_path}.{os.getpid()}.tmp.npz"
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            numpy.savez(
+                temporary_path,
+                fingerprint=self.fingerprint,
+                classes=self.classes,
+                total_flux=self.total_flux,
+                central_brightness=self.central_brightness,
+                centers=self.centers,
+                radii=self.radii,
+            )
+            os.replace(temporary_path, self.index_path)
+        except OSError:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            return
+        self._modified = False
+
+    def flush(self) -> None:
+        """
+        Saves the index if any locations were recorded since it was last saved.
+        """
+        if self._modified:
+            self.save()
+
+    def record_location(self, galaxy_number: int, location: GalaxyLocation) -> None:
+        """
+        Stores the center and radius GalaxyFinder found for a galaxy.
+
+        Parameters:
+            galaxy_number (int): index of the galaxy in the data set
+            location (GalaxyLocation): location found for the galaxy
+        """
+        self.centers[galaxy_number] = location.center
+        self.radii[galaxy_number] = location.radius
+        self._modified = True
+
+    def location(self, galaxy_number: int) -> GalaxyLocation | None:
+        """
+        Gets the recorded location of a galaxy.
+
+        Parameters:
+            galaxy_number (int): index of the galaxy in the data set
+
+        Returns:
+            GalaxyLocation | None: recorded location, or None if it is not known yet
+        """
+        if self.radii[galaxy_number] < 0:
+            return None
+        center_x, center_y = self.centers[galaxy_number]
+        return GalaxyLocation(
+            (int(center_x), int(center_y)), int(self.radii[galaxy_number])
+        )
+
+    def select(
+        self,
+        classes: Iterable[int] = (6, 7),
+        min_radius: int | None = None,
+        count: int | None = None,
+        seed: int | None = None,
+        sample: bool = True,
+    ) -> numpy.ndarray:
+        """
+        Selects galaxies from the index without touching the image data.
+
+        Parameters:
+            classes (Iterable[int]): Galaxy10 classes to keep
+            min_radius (int, optional): only keep galaxies with a recorded radius at
+                least this large
+            count (int, optional): number of galaxies to return, all if None
+            seed (int, optional): seed for the random sample, so selections repeat
+            sample (bool): draw count galaxies at random without replacement, rather
+                than taking the first count
+
+        Returns:
+            numpy.ndarray: sorted indices of the selected galaxies
+        """
+        selected = numpy.isin(self.classes, list(classes))
+        if min_radius is not None:
+            selected &= self.radii >= min_radius
+        indices = numpy.flatnonzero(selected)
+
+        if count is not None and count < len(indices):
+            if sample:
+                rng = numpy.random.default_rng(seed)
+                indices = numpy.sort(rng.choice(indices, count, replace=False))
+            else:
+                indices = indices[:count]
+
+        return indices
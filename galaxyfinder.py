@@ -5,6 +5,13 @@ from galaxylocation import GalaxyLocation
 import numpy
 import photutils.background
 import photutils.segmentation
+import scipy.ndimage
+
+# Minimum size in pixels of a source, for both detection and deblending
+NPIXELS = 30
+
+# 8-connectivity, as used by photutils.segmentation.detect_sources
+CONNECTIVITY = numpy.ones((3, 3), dtype=bool)
 
 
 class GalaxyFinder:
@@ -16,13 +23,32 @@ class GalaxyFinder:
 
     Attribute:
         image (Image): Helper class that ensures correct passage
+        fast (bool): only label the source at the image center instead of
+            deblending every source in the image, where that is safe
+        max_fast_area (int): largest central source, in pixels, the fast mode
+            handles before falling back to full deblending
+        neighbor_level (float): fraction of the way from the detection threshold to
+            the central source's peak at which a second bright peak counts as a
+            blended neighbor, making the fast mode fall back to full deblending
     """
 
-    def __init__(self, image: Image) -> None:
+    # Images of the galaxy the finder is given, see galaxyloader.required_bands
+    BANDS: tuple[str, ...] = ("Wide",)
+
+    def __init__(
+        self,
+        image: Image,
+        fast: bool = False,
+        max_fast_area: int = 20000,
+        neighbor_level: float = 0.5,
+    ) -> None:
         """
         Initialize GalaxyFinder with the image to find the central galaxy.
         """
         self.image: Image = image
+        self.fast: bool = fast
+        self.max_fast_area: int = max_fast_area
+        self.neighbor_level: float = neighbor_level
 
     def find_galaxy(self) -> GalaxyLocation:
         """
@@ -31,19 +57,34 @@ class GalaxyFinder:
         Uses photutils to find sources, separate them out based off of brightness,
         deblend, or separate adjacent sources, and iterate to find the central galaxy.
 
+        In fast mode, only the source at the center is labelled and measured, and
+        the full search only runs if that source is too large or blended.
+
         Returns:
             GalaxyLocation: Object containing the coordinates and radius of the galaxy
+
+        Raises:
+            ValueError: if no source contains the center of the image
         """
+        threshold = numpy.percentile(self.image.data, 75)
+
+        if self.fast:
+            location = self._find_central_source(threshold)
+            if location is not None:
+                return location
+
         image_center = (self.image.shape[0] // 2, self.image.shape[1] // 2)
 
         # Find all of the sources in the image
         segment_map = photutils.segmentation.detect_sources(
-            self.image.data, numpy.percentile(self.image.data, 75), npixels=30
+            self.image.data, threshold, npixels=NPIXELS
         )
+        if segment_map is None:
+            raise ValueError("No sources found in the image")
 
         # This tries to separate out sources that are adjacent to each other.
         deblend = photutils.segmentation.deblend_sources(
-            self.image.data, segment_map, npixels=30, nlevels=32, contrast=0.01
+            self.image.data, segment_map, npixels=NPIXELS, nlevels=32, contrast=0.01
         )
 
         if __name__ == "__main__":
@@ -56,6 +97,7 @@ class GalaxyFinder:
 
         # Iterate over the bounding-box boundaries for each source.
         # Basically, within which source is the image center contained?
+        location = None
         for index, coord in enumerate(
             zip(
                 catalogue.bbox_xmin,
@@ -67,10 +109,75 @@ class GalaxyFinder:
             x, y, X, Y = coord
             # If we're inside the bounding box, that's our source!
             if (x < image_center[0] < X) and (y < image_center[0] < Y):
-                center = catalogue.centroid_win[index]
-                center = (int(numpy.round(center[0])), int(numpy.round(center[1])))
-                radius = int(catalogue.equivalent_radius[index].value)
+                location = self._location(catalogue, index)
+
+        if location is None:
+            raise ValueError("No source contains the center of the image")
+
+        return location
+
+    def _find_central_source(self, threshold: float) -> GalaxyLocation | None:
+        """
+        Labels and measures only the connected source at the center of the image.
+
+        Parameters:
+            threshold (float): detection threshold, as for the full search
 
+        Returns:
+            GalaxyLocation | None: location of the central source, or None if the
+            full search is needed because there is no source at the center, it is
+            larger than max_fast_area, or a neighbor is blended into it
+        """
+        data = self.image.data
+        labels, _ = scipy.ndimage.label(data > threshold, structure=CONNECTIVITY)
+        central_label = labels[data.shape[0] // 2, data.shape[1] // 2]
+        if central_label == 0:
+            return None
+
+        source = labels == central_label
+        area = numpy.count_nonzero(source)
+        if area < NPIXELS or area > self.max_fast_area:
+            return None
+
+        # A neighbor merged into the source at the detection threshold shows up as a
+        # second sizeable component once the threshold is raised towards the peak.
+        peak = data[source].max()
+        level = threshold + self.neighbor_level * (peak - threshold)
+        peaks, num_peaks = scipy.ndimage.label(
+            source & (data > level), structure=CONNECTIVITY
+        )
+        if (
+            num_peaks > 1
+            and numpy.count_nonzero(numpy.bincount(peaks.ravel())[1:] >= NPIXELS) > 1
+        ):
+            return None
+
+        # The windowed centroid weighs every pixel around the source, so other
+        # sources would pull it towards them, where the full search masks them
+        neighbors = (labels != 0) & ~source
+        catalogue = photutils.segmentation.SourceCatalog(
+            numpy.where(neighbors, 0, data),
+            photutils.segmentation.SegmentationImage(source.astype("int32")),
+        )
+        return self._location(catalogue, 0)
+
+    @staticmethod
+    def _location(
+        catalogue: photutils.segmentation.SourceCatalog, index: int
+    ) -> GalaxyLocation:
+        """
+        Converts a source of a catalogue into a GalaxyLocation.
+
+        Parameters:
+            catalogue (SourceCatalog): catalogue of the sources in the image
+            index (int): position of the source in the catalogue
+
+        Returns:
+            GalaxyLocation: windowed centroid and equivalent radius of the source
+        """
+        center = catalogue.centroid_win[index]
+        center = (int(numpy.round(center[0])), int(numpy.round(center[1])))
+        radius = int(catalogue.equivalent_radius[index].value)
         return GalaxyLocation(center, radius)
 
 
@@ -13,6 +13,8 @@ class GalaxyImage(Image):
         image (Image): Image object containing galaxy data.
     """
 
+    __slots__ = ()
+
     def __init__(self, image: Image) -> None:
         """
         Initialize a GalaxyImage object from a previous image.
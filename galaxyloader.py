@@ -1,29 +1,179 @@
 from image import Image
+from rawdataset import RawDataset
 import numpy
 import h5py
 
-from typing import Generator
+from typing import Any, Generator, Iterable
+
+# Position of each filter along the last axis of the Galaxy10 "images" dataset
+BAND_INDEX: dict[str, int] = {"G": 0, "R": 1, "Z": 2}
+
+# Bands of the data set each image is built from
+IMAGE_BANDS: dict[str, tuple[str, ...]] = {
+    "G": ("G",),
+    "R": ("R",),
+    "Z": ("Z",),
+    "Wide": ("G", "R", "Z"),
+}
+
+
+def required_bands(*stages: Any) -> tuple[str, ...]:
+    """
+    Finds the bands of the data set a set of stages needs.
+
+    Parameters:
+        stages: stage classes, each listing the images it consumes in BANDS
+
+    Returns:
+        tuple[str, ...]: the bands to read, in data set order
+    """
+    bands = {
+        band for stage in stages for image in stage.BANDS for band in IMAGE_BANDS[image]
+    }
+    return tuple(sorted(bands, key=BAND_INDEX.__getitem__))
+
+
+def band_selection(bands: Iterable[str]) -> tuple[slice, list[int]]:
+    """
+    Finds how to read some bands of the data set in one hyperslab.
+
+    h5py reads a slice along the band axis much faster than a list of indices, and
+    only allows a list on one axis at a time, so the smallest slice covering every
+    band is read and the bands are picked out of it afterwards.
+
+    Parameters:
+        bands (Iterable[str]): bands to read
+
+    Returns:
+        slice: bands to read along the last axis of the data set
+        list[int]: position of each band, in the order given, within that slice
+    """
+    indices = [BAND_INDEX[band] for band in bands]
+    start = min(indices)
+    return slice(start, max(indices) + 1), [index - start for index in indices]
 
 
 class GalaxyLoader:
     """
     Class for loading in galaxies as images
 
+    Bands are read from the data set the first time an image needs them, so the
+    bands no stage consumes are never read. From a RawDataset, bands are views of
+    the memory-mapped file rather than copies.
+
+    A raw export given by path is mapped once, on the first read, and unmapped by
+    close(); an HDF5 file given by path is opened for each read.
+
     Attributes:
-        load_path (str): directs where the data loads from
+        dataset (h5py.File | RawDataset | str): open data set shared with other
+            loaders, or a path to open for just this galaxy
         galaxy_number (int): number of the galaxy in the header of the h5py file
     """
 
-    def __init__(self, galaxy_number: int, dataset_path: str):
+    def __init__(
+        self,
+        galaxy_number: int,
+        dataset: h5py.File | RawDataset | str,
+        pixels: numpy.ndarray | None = None,
+        bands: Iterable[str] = tuple(BAND_INDEX),
+    ):
         """
         Initializes a galaxy loader object
 
         Parameters:
             galaxy_number (int): passed to galaxy_number attribute
-            dataset_path (str): passed to load_path attribute
+            dataset (h5py.File | RawDataset | str): passed to dataset attribute
+            pixels (numpy.ndarray, optional): (height, width, len(bands)) bands of the
+                galaxy if they have already been read, e.g. by a PrefetchLoader
+            bands (Iterable[str]): which bands pixels holds, in order
         """
-        self.load_path = dataset_path
+        self.dataset = dataset
         self.galaxy_number = galaxy_number
+        self._bands: dict[str, numpy.ndarray] = {}
+        self._raw_dataset: RawDataset | None = None
+        if pixels is not None:
+            for position, band in enumerate(bands):
+                self._bands[band] = pixels[:, :, position]
+
+    @property
+    def dataset_path(self) -> str:
+        """
+        Gets the path of the data set the galaxy is read from.
+
+        Returns:
+            str: path of the data set file
+        """
+        if isinstance(self.dataset, str):
+            return self.dataset
+        return self.dataset.filename
+
+    @property
+    def loaded_bands(self) -> tuple[str, ...]:
+        """
+        Gets the bands read from the data set so far.
+
+        Returns:
+            tuple[str, ...]: bands already in memory, in data set order
+        """
+        return tuple(band for band in BAND_INDEX if band in self._bands)
+
+    def read_bands(self, bands: Iterable[str]) -> None:
+        """
+        Reads the given bands that aren't in memory yet, in a single hyperslab.
+
+        Parameters:
+            bands (Iterable[str]): bands of the data set the galaxy needs
+        """
+        missing = [band for band in bands if band not in self._bands]
+        if not missing:
+            return
+
+        dataset = self.dataset
+        if isinstance(dataset, str) and RawDataset.is_raw(dataset):
+            if self._raw_dataset is None:
+                self._raw_dataset = RawDataset(dataset)
+            dataset = self._raw_dataset
+        if isinstance(dataset, RawDataset):
+            # Each band of a galaxy is a contiguous plane of the mapped file
+            row = dataset.row(self.galaxy_number)
+            for band in missing:
+                self._bands[band] = dataset.images[row, BAND_INDEX[band]]
+            return
+
+        selection, positions = band_selection(missing)
+        if isinstance(self.dataset, str):
+            with h5py.File(self.dataset, "r") as dataset:
+                pixels = dataset["images"][self.galaxy_number, :, :, selection]
+        else:
+            pixels = self.dataset["images"][self.galaxy_number, :, :, selection]
+        for band, position in zip(missing, positions):
+            self._bands[band] = pixels[:, :, position]
+
+    def close(self) -> None:
+        """
+        Unmaps the raw export this loader mapped from its path, if any. Bands
+        already read stay valid, as views keep the mapping alive.
+        """
+        if self._raw_dataset is not None:
+            self._raw_dataset.close()
+            self._raw_dataset = None
+
+    def __enter__(self) -> "GalaxyLoader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def pixels(self) -> numpy.ndarray:
+        """
+        Gets every band of the galaxy, reading the missing ones from the data set.
+
+        Returns:
+            numpy.ndarray: (height, width, 3) array of the G, R and Z bands
+        """
+        self.read_bands(BAND_INDEX)
+        return numpy.stack([self._bands[band] for band in BAND_INDEX], axis=2)
 
     def load_image(self, filt: str) -> Image:
         """
@@ -35,23 +185,17 @@ class GalaxyLoader:
         Returns:
             image (Image): image of the galaxy passed through the Image class
         """
-        dataset: h5py.File = h5py.File(self.load_path, "r")
-        # Creates an image that is not wide band
+        self.read_bands(IMAGE_BANDS[filt])
+        # Creates an image that is not wide band, as a view into the band read
         if filt != "Wide":
-            # Indexes the galaxy number, every x value, every y value, and the filter that was chosen
-            image = dataset["images"][
-                self.galaxy_number, :, :, {"G": 0, "R": 1, "Z": 2}[filt]
-            ]
-            return Image(image)
-        # Creates a wide band image by summing all the other bands
+            return Image(self._bands[filt])
+        # Creates a wide band image by summing all the other bands, which fits in
+        # 16 bits as three 8-bit bands sum to at most 765
         else:
-            image = sum(
-                numpy.array(
-                    dataset["images"][self.galaxy_number, :, :, i], dtype="int32"
-                )
-                for i in range(3)
-            )
-            return Image(image)
+            wide = self._bands["G"].astype("uint16")
+            wide += self._bands["R"]
+            wide += self._bands["Z"]
+            return Image(wide)
 
     def load_all_images(self) -> Generator:
         """
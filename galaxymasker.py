@@ -2,10 +2,49 @@
 
 from galaxylocation import GalaxyLocation
 from image import Image
-from math import dist
+from precision import DEFAULT_PRECISION, float_dtype
+import functools
 import numpy
 
 
+@functools.lru_cache(maxsize=64)
+def _squared_distances(shape: tuple[int, int]) -> numpy.ndarray:
+    """
+    Builds the squared distance of every pixel of a crop from its center.
+
+    Parameters:
+        shape (tuple[int, int]): shape of the cropped image
+
+    Returns:
+        numpy.ndarray: read-only integer array of squared distances
+    """
+    y = numpy.arange(shape[0])[:, numpy.newaxis] - shape[0] // 2
+    x = numpy.arange(shape[1])[numpy.newaxis, :] - shape[1] // 2
+    distances = x**2 + y**2
+    distances.flags.writeable = False
+    return distances
+
+
+@functools.lru_cache(maxsize=64)
+def _circular_mask(shape: tuple[int, int], radius: int) -> numpy.ndarray:
+    """
+    Builds the mask of pixels within radius of the center of a crop.
+
+    Galaxies in a run share only a handful of crop sizes, so masks are kept in a
+    bounded LRU cache keyed by (crop shape, radius).
+
+    Parameters:
+        shape (tuple[int, int]): shape of the cropped image
+        radius (int): radius of the circle around the crop center
+
+    Returns:
+        numpy.ndarray: read-only boolean array, True inside the circle
+    """
+    mask = _squared_distances(shape) <= radius**2
+    mask.flags.writeable = False
+    return mask
+
+
 class GalaxyMasker:
     """
     GalaxyMasker
@@ -15,11 +54,18 @@ class GalaxyMasker:
     Attributes:
         image (Image): original image with the galaxy
         location (GalaxyLocation): center and radius of the galaxy
+        dtype (numpy.dtype): float precision of the masked image
     """
 
-    def __init__(self, image: Image, location: GalaxyLocation) -> None:
+    def __init__(
+        self,
+        image: Image,
+        location: GalaxyLocation,
+        dtype: str | numpy.dtype = DEFAULT_PRECISION,
+    ) -> None:
         self.image: Image = image
         self.location: GalaxyLocation = location
+        self.dtype: numpy.dtype = float_dtype(dtype)
 
     # This gets a bounding box around the circle of the galaxy_
     def get_galaxy(self) -> Image:
@@ -27,19 +73,17 @@ class GalaxyMasker:
         Create a region around the galaxy center and radius.
 
         Returns:
-            Image: smaller image that encloses the galaxy.
+            Image: read-only view of the smaller image that encloses the galaxy.
 
         """
         center = self.location.center
         radius = self.location.radius
         center_x, center_y = center
 
-        return Image(
-            self.image[
-                center_y - radius : center_y + radius,
-                center_x - radius : center_x + radius,
-            ]
-        )
+        return self.image[
+            center_y - radius : center_y + radius,
+            center_x - radius : center_x + radius,
+        ]
 
     def mask_out_galaxy(self) -> Image:
         """
@@ -47,26 +91,147 @@ class GalaxyMasker:
         setting them to NaN values.
 
         Returns:
-            Image: cropped image of a circle encapsulating the circular region
+            Image: float cropped image of a circle encapsulating the circular region
+
+        """
+        return Image(
+            self._mask(self.get_galaxy().data, self.location.radius, self.dtype)
+        )
 
+    @staticmethod
+    def mask_out_bands(
+        images: dict[str, Image],
+        location: GalaxyLocation,
+        dtype: str | numpy.dtype = DEFAULT_PRECISION,
+    ) -> dict[str, Image]:
         """
-        galaxy_rectangle = self.get_galaxy()
+        Mask out the same galaxy in several bands at once.
 
-        center = (galaxy_rectangle.shape[0] // 2, galaxy_rectangle.shape[1] // 2)
-        radius = self.location.radius
+        The crops are stacked and masked with a single vectorized call, sharing
+        one cached circular mask.
+
+        Parameters:
+            images (dict[str, Image]): band name to image of that band
+            location (GalaxyLocation): center and radius of the galaxy
+            dtype (str | numpy.dtype): float precision of the masked crops
 
-        new_image = numpy.zeros(galaxy_rectangle.data.shape)
+        Returns:
+            dict[str, Image]: band name to float masked crop of that band
+        """
+        crops = numpy.stack(
+            [
+                GalaxyMasker(image, location).get_galaxy().data
+                for image in images.values()
+            ]
+        )
+        masked = GalaxyMasker._mask(crops, location.radius, float_dtype(dtype))
+
+        return {band: Image(masked[index]) for index, band in enumerate(images)}
+
+    @staticmethod
+    def get_galaxy_batch(
+        images: numpy.ndarray, centers: numpy.ndarray, radius: int
+    ) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Crop the same-sized region around a different center in every image of a stack.
 
+        Parameters:
+            images (numpy.ndarray): (N, height, width, ...) stack of images
+            centers (numpy.ndarray): (N, 2) center of each galaxy in (x, y) format
+            radius (int): half the side of the square crop
+
+        Returns:
+            numpy.ndarray: (N, 2 * radius, 2 * radius, ...) crops, where pixels
+            beyond the image edge repeat the nearest edge pixel
+            numpy.ndarray: (N, 2 * radius, 2 * radius) True where the crop is
+            inside its image
+        """
+        height, width = images.shape[1:3]
+        offsets = numpy.arange(2 * radius) - radius
+        y = centers[:, 1, numpy.newaxis] + offsets
+        x = centers[:, 0, numpy.newaxis] + offsets
+
+        in_bounds = ((y >= 0) & (y < height))[:, :, numpy.newaxis] & (
+            (x >= 0) & (x < width)
+        )[:, numpy.newaxis, :]
+
+        crops = images[
+            numpy.arange(len(images))[:, numpy.newaxis, numpy.newaxis],
+            numpy.clip(y, 0, height - 1)[:, :, numpy.newaxis],
+            numpy.clip(x, 0, width - 1)[:, numpy.newaxis, :],
+        ]
+        return crops, in_bounds
+
+    @staticmethod
+    def galaxy_mask_batch(radii: numpy.ndarray, radius: int) -> numpy.ndarray:
+        """
+        Build the circular mask of every galaxy in a stack of crops.
+
+        Parameters:
+            radii (numpy.ndarray): (N,) radius of each galaxy
+            radius (int): half the side of the square crops
+
+        Returns:
+            numpy.ndarray: (N, 2 * radius, 2 * radius) True inside each galaxy
+        """
+        distances = _squared_distances((2 * radius, 2 * radius))
+        return distances <= (radii**2)[:, numpy.newaxis, numpy.newaxis]
+
+    @staticmethod
+    def mask_out_batch(
+        images: numpy.ndarray,
+        centers: numpy.ndarray,
+        radii: numpy.ndarray,
+        dtype: str | numpy.dtype = DEFAULT_PRECISION,
+    ) -> numpy.ndarray:
+        """
+        Mask out a stack of galaxies, each around its own center and radius.
+
+        Every crop is as large as the largest galaxy, with its galaxy at the
+        crop center, so a galaxy's pixels sit where mask_out_galaxy would put
+        them relative to the center.
+
+        Parameters:
+            images (numpy.ndarray): (N, height, width) stack of images
+            centers (numpy.ndarray): (N, 2) center of each galaxy in (x, y) format
+            radii (numpy.ndarray): (N,) radius of each galaxy
+            dtype (str | numpy.dtype): float precision of the masked crops
+
+        Returns:
+            numpy.ndarray: (N, 2 * max(radii), 2 * max(radii)) float crops, NaN
+            outside each galaxy and beyond the image edge
+        """
+        radius = int(radii.max())
+        crops, in_bounds = GalaxyMasker.get_galaxy_batch(images, centers, radius)
+
+        masked = numpy.full(crops.shape, numpy.nan, dtype=float_dtype(dtype))
+        numpy.copyto(
+            masked,
+            crops,
+            where=in_bounds & GalaxyMasker.galaxy_mask_batch(radii, radius),
+        )
+
+        return masked
+
+    @staticmethod
+    def _mask(crops: numpy.ndarray, radius: int, dtype: numpy.dtype) -> numpy.ndarray:
+        """
+        Copies crops into a float array, with NaN outside the circle.
+
+        Parameters:
+            crops (numpy.ndarray): one crop, or a stack of crops on the first axis
+            radius (int): radius of the galaxy
+            dtype (numpy.dtype): float precision of the masked crops
+
+        Returns:
+            numpy.ndarray: masked crops of dtype, same shape as crops
+        """
         # In effect, we just set every pixel outside the circle to a NaN
         # So that it isn't included. Pretty simple.
-        for y in range(galaxy_rectangle.shape[0]):
-            for x in range(galaxy_rectangle.shape[1]):
-                if dist((x, y), center) > radius:
-                    new_image[x, y] = numpy.nan
-                else:
-                    new_image[y, x] = galaxy_rectangle[x, y]
-
-        return Image(new_image)
+        masked = numpy.full(crops.shape, numpy.nan, dtype=dtype)
+        numpy.copyto(masked, crops, where=_circular_mask(crops.shape[-2:], radius))
+
+        return masked
 
 
 if __name__ == "__main__":
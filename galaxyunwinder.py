@@ -8,8 +8,91 @@ __main__ guard demonstrates its usage for visualization.
 """
 
 from galaxyimage import GalaxyImage
+import functools
 import numpy as np
-import os
+import sys
+
+
+@functools.lru_cache(maxsize=32)
+def _polar_coordinates(
+    height: int, width: int, num_angles: int, num_radii: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the Cartesian (y, x) position of every polar sample for one geometry.
+
+    Args:
+        height (int): Image height in pixels.
+        width (int): Image width in pixels.
+        num_angles (int): Number of angular samples.
+        num_radii (int): Number of radial samples.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Float y and x arrays of shape (num_angles, num_radii).
+    """
+    center_x = width // 2
+    center_y = height // 2
+    max_radius = min(center_x, center_y)
+
+    theta_vals = np.linspace(0, 2 * np.pi, num_angles, endpoint=False)
+    # exclude the endpoint to avoid r == max_radius exactly
+    r_vals = np.linspace(0, max_radius, num_radii, endpoint=False)
+
+    x = center_x + r_vals[np.newaxis, :] * np.cos(theta_vals)[:, np.newaxis]
+    y = center_y + r_vals[np.newaxis, :] * np.sin(theta_vals)[:, np.newaxis]
+    return y, x
+
+
+@functools.lru_cache(maxsize=32)
+def _nearest_remap(
+    height: int, width: int, num_angles: int, num_radii: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute and cache the pixel indices sampled by a nearest-pixel unwind.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Read-only integer y and x index arrays
+        of shape (num_angles, num_radii).
+    """
+    y, x = _polar_coordinates(height, width, num_angles, num_radii)
+    # Truncation matches int(); coordinates are never negative since r < max_radius
+    y_index = y.astype(np.intp)
+    x_index = x.astype(np.intp)
+    y_index.flags.writeable = False
+    x_index.flags.writeable = False
+    return y_index, x_index
+
+
+@functools.lru_cache(maxsize=32)
+def _bilinear_remap(
+    height: int, width: int, num_angles: int, num_radii: int, dtype: str
+) -> tuple[np.ndarray, ...]:
+    """
+    Compute and cache the neighbour indices and weights of a bilinear unwind.
+
+    The weights are stored in the float dtype of the images being unwound, so
+    blending doesn't promote float32 images to float64.
+
+    Returns:
+        tuple[np.ndarray, ...]: Read-only (y0, x0, y1, x1, weight_y, weight_x) arrays
+        of shape (num_angles, num_radii), where the weights belong to y1 and x1.
+    """
+    y, x = _polar_coordinates(height, width, num_angles, num_radii)
+    floor_y = np.floor(y)
+    floor_x = np.floor(x)
+    weight_y = (y - floor_y).astype(dtype)
+    weight_x = (x - floor_x).astype(dtype)
+    y0 = floor_y.astype(np.intp)
+    x0 = floor_x.astype(np.intp)
+    # Samples that land exactly on a pixel reuse it as the neighbour, so a NaN
+    # next to them with zero weight can't leak in. So do samples past the last
+    # pixel of an even-sized image, which only come with num_radii > max_radius.
+    y1 = np.where((weight_y > 0) & (y0 + 1 < height), y0 + 1, y0)
+    x1 = np.where((weight_x > 0) & (x0 + 1 < width), x0 + 1, x0)
+
+    tables = (y0, x0, y1, x1, weight_y, weight_x)
+    for table in tables:
+        table.flags.writeable = False
+    return tables
 
 
 class GalaxyUnwinder:
@@ -36,14 +119,24 @@ class GalaxyUnwinder:
         # Inscribed circle radius (distance to nearest image edge)
         self.max_radius = min(self.center_x, self.center_y)
 
-    def unwind(self, num_angles: int = 360, num_radii: int = None) -> np.ndarray:
+    def unwind(
+        self,
+        num_angles: int = 360,
+        num_radii: int = None,
+        interpolation: str = "nearest",
+    ) -> np.ndarray:
         """
         Convert the image from Cartesian (x, y) to polar (θ, r) coordinates.
 
+        The sample positions depend only on the image shape, num_angles and num_radii,
+        so they are computed once per geometry and every unwind is a single gather.
+
         Args:
             num_angles (int, optional): Number of angular samples (default: 360).
             num_radii (int, optional): Number of radial samples. If None,
                 uses the maximum radius (self.max_radius).
+            interpolation (str, optional): "nearest" samples the pixel each point
+                falls in, "bilinear" blends the four surrounding pixels.
 
         Returns:
             np.ndarray: 2D array of shape (num_angles, num_radii) where each row
@@ -52,20 +145,50 @@ class GalaxyUnwinder:
         if num_radii is None:
             num_radii = self.max_radius
 
-        polar_image = np.zeros((num_angles, num_radii))
-        theta_vals = np.linspace(0, 2 * np.pi, num_angles, endpoint=False)
-        # exclude the endpoint to avoid r == max_radius exactly
-        r_vals = np.linspace(0, self.max_radius, num_radii, endpoint=False)
+        return self.unwind_batch(self.image.data, num_angles, num_radii, interpolation)
 
-        for i, theta in enumerate(theta_vals):
-            for j, r in enumerate(r_vals):
-                x = int(self.center_x + r * np.cos(theta))
-                y = int(self.center_y + r * np.sin(theta))
+    @staticmethod
+    def unwind_batch(
+        images: np.ndarray,
+        num_angles: int = 360,
+        num_radii: int = None,
+        interpolation: str = "nearest",
+    ) -> np.ndarray:
+        """
+        Convert a stack of same-sized images to polar coordinates in one gather.
 
-                # Guaranteed in-bounds since r < max_radius and max_radius <= half-dimension
-                polar_image[i, j] = self.image[y, x]
+        Args:
+            images (np.ndarray): Array of shape (..., height, width).
+            num_angles (int, optional): Number of angular samples (default: 360).
+            num_radii (int, optional): Number of radial samples. If None, uses the
+                inscribed circle radius of the images.
+            interpolation (str, optional): "nearest" or "bilinear", as for unwind.
 
-        return polar_image
+        Returns:
+            np.ndarray: Array of shape (..., num_angles, num_radii).
+        """
+        height, width = images.shape[-2:]
+        if num_radii is None:
+            num_radii = min(height // 2, width // 2)
+
+        if interpolation == "nearest":
+            # Guaranteed in-bounds since r < max_radius and max_radius <= half-dimension
+            y_index, x_index = _nearest_remap(height, width, num_angles, num_radii)
+            return images[..., y_index, x_index]
+
+        if interpolation == "bilinear":
+            dtype = images.dtype if np.issubdtype(images.dtype, np.floating) else None
+            y0, x0, y1, x1, weight_y, weight_x = _bilinear_remap(
+                height, width, num_angles, num_radii, np.dtype(dtype).str
+            )
+            top = images[..., y0, x0] * (1 - weight_x) + images[..., y0, x1] * weight_x
+            bottom = (
+                images[..., y1, x0] * (1 - weight_x) + images[..., y1, x1] * weight_x
+            )
+            return top * (1 - weight_y) + bottom * weight_y
+
+        print(f"Error: Unknown interpolation {interpolation!r}.", file=sys.stderr)
+        raise ValueError
 
 
 if __name__ == "__main__":
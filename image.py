@@ -10,16 +10,39 @@ class Image:
 
     This represents a 2D helper class, providing multiple methods for image manipulation.
 
+    Slicing an image gives a read-only view of the same pixels rather than a copy,
+    and arithmetic can write into an existing image with out= or the in-place
+    operators, so chains of band arithmetic don't allocate temporaries. Images also
+    expose their pixels to numpy without copying.
+
     Attribute:
         data (np.ndarray): 2D array of image data.
     """
 
+    __slots__ = ("_data",)
+
     def __init__(self, data: numpy.ndarray) -> None:
         if len(data.shape) != 2:
             print("Error: Image data must be two-dimensional", file=sys.stderr)
             raise TypeError
         self._data: numpy.ndarray = data
 
+    @classmethod
+    def _wrap(cls, data: numpy.ndarray) -> Self:
+        """
+        Builds an image of this class around an array, without going through the
+        constructor of a subclass.
+
+        Parameter:
+            data (numpy.ndarray): 2D array of image data, used without copying.
+
+        Returns:
+            Image: image holding data.
+        """
+        image = cls.__new__(cls)
+        Image.__init__(image, data)
+        return image
+
     @property
     def data(self) -> numpy.ndarray:
         """
@@ -51,6 +74,39 @@ class Image:
         """
         return (self.data.shape[0], self.data.shape[1])
 
+    def __array__(self, dtype: Any = None, copy: bool | None = None) -> numpy.ndarray:
+        """
+        Lets numpy use the image data directly, e.g. in numpy.asarray(image).
+
+        Returns:
+            numpy.ndarray: the image data itself, unless a copy or another dtype
+            is asked for.
+
+        Raises:
+            ValueError: if copy is False but another dtype needs a copy.
+        """
+        data = self.data
+        if dtype is not None and numpy.dtype(dtype) != data.dtype:
+            if copy is False:
+                print(
+                    f"Error: Image data can't become {dtype} without a copy.",
+                    file=sys.stderr,
+                )
+                raise ValueError
+            return data.astype(dtype)
+        if copy:
+            return data.copy()
+        return data
+
+    def __buffer__(self, flags: int) -> memoryview:
+        """
+        Exposes the image data through the buffer protocol (Python 3.12+).
+
+        Returns:
+            memoryview: view of the image data.
+        """
+        return memoryview(self.data)
+
     def mean(self) -> float:
         """
         Compute the mean of the image data(omit NaNs).
@@ -88,7 +144,7 @@ class Image:
         Returns:
             Image with scaled image data.
         """
-        return type(self)(self.data / num)
+        return self._wrap(self.data / num)
 
     def rot_right(self) -> Self:
         """
@@ -97,7 +153,7 @@ class Image:
         Returns:
             Image: 90 degree rotated image.
         """
-        return type(self)(numpy.rot90(self.data))
+        return self._wrap(numpy.rot90(self.data))
 
     def rot_left(self) -> Self:
         """
@@ -106,25 +162,132 @@ class Image:
         Returns:
             Image: counter-clockwise 90 degree rotated image.
         """
-        return type(self)(
+        return self._wrap(
             numpy.rot90(self.data, 3)
         )  # Rotate 90 degrees 3 times -> 270 degrees
 
-    def __getitem__(self, key: tuple[slice, slice]) -> float | numpy.ndarray:
+    def __getitem__(
+        self, key: tuple[slice | int, slice | int]
+    ) -> Self | numpy.ndarray | Any:
         """
-        Accesses a smaller region of the image.
+        Accesses a smaller region of the image, without copying it.
 
         Parameter:
-            key (tuple): 2 slice indices for x and y coordinates.
+            key (tuple): 2 slice or integer indices for y and x coordinates.
 
         Returns:
-            float | numpy.ndarray: the given subregion of the image.
+            Image | numpy.ndarray | Any: a read-only Image view of the region for two
+            slices, a read-only 1D view for a row or column, or a single pixel value.
         """
-        if len(key) != 2:
+        if not isinstance(key, tuple) or len(key) != 2:
             print("Error: Images must be accessed in two dimensions.")
             raise ValueError
+        # Only basic indexing is allowed, as fancy indexing would copy
+        if not all(isinstance(index, (slice, int, numpy.integer)) for index in key):
+            print("Error: Images can only be indexed with slices and integers.")
+            raise TypeError
+
+        region = self.data[key]
+        if not isinstance(region, numpy.ndarray):
+            return region
+
+        # Basic slicing always gives a fresh view, so this leaves self.data writable
+        region.flags.writeable = False
+        if region.ndim == 2:
+            return self._wrap(region)
+        return region
+
+    def _apply(
+        self,
+        operation: numpy.ufunc,
+        other: "Image",
+        out: "Image | numpy.ndarray | None",
+        verb: str,
+    ) -> Self:
+        """
+        Applies an elementwise operation between two images, optionally writing the
+        result into an existing image or array instead of a new one.
+
+        Parameters:
+            operation (numpy.ufunc): operation to apply
+            other (Image): right-hand image
+            out (Image | numpy.ndarray, optional): where the result is written
+            verb (str): how the operation is described in errors
+
+        Returns:
+            Image: the result, which is out itself if out is an Image.
+        """
+        if not isinstance(other, Image):
+            print(f"Error: Images can only be {verb} with other images.")
+            raise TypeError
+
+        if out is None:
+            return self._wrap(operation(self.data, other.data))
+
+        out_data = out.data if isinstance(out, Image) else out
+        if not out_data.flags.writeable:
+            print("Error: Output image is read-only.", file=sys.stderr)
+            raise ValueError
+        operation(self.data, other.data, out=out_data)
+        return out if isinstance(out, Image) else self._wrap(out_data)
+
+    def add(self, other: "Image", out: "Image | numpy.ndarray | None" = None) -> Self:
+        """
+        Adds two images values.
+
+        Parameters:
+            other (Image): Image to add.
+            out (Image | numpy.ndarray, optional): where the sum is written.
+
+        Returns:
+            Image: Sum of two images values.
+        """
+        return self._apply(numpy.add, other, out, "added")
+
+    def subtract(
+        self, other: "Image", out: "Image | numpy.ndarray | None" = None
+    ) -> Self:
+        """
+        Subtracts two images values.
+
+        Parameters:
+            other (Image): Image to subtract.
+            out (Image | numpy.ndarray, optional): where the difference is written.
+
+        Returns:
+            Image: Difference of two images values.
+        """
+        return self._apply(numpy.subtract, other, out, "subtracted")
+
+    def multiply(
+        self, other: "Image", out: "Image | numpy.ndarray | None" = None
+    ) -> Self:
+        """
+        Multiplies two images values.
+
+        Parameters:
+            other (Image): Image to multiply.
+            out (Image | numpy.ndarray, optional): where the product is written.
+
+        Returns:
+            Image: Product of two images values.
+        """
+        return self._apply(numpy.multiply, other, out, "multiplied")
+
+    def divide(
+        self, other: "Image", out: "Image | numpy.ndarray | None" = None
+    ) -> Self:
+        """
+        Divides two images values.
 
-        return self.data[key]
+        Parameters:
+            other (Image): Image to divide by.
+            out (Image | numpy.ndarray, optional): where the quotient is written.
+
+        Returns:
+            Image: Quotient of two images values.
+        """
+        return self._apply(numpy.true_divide, other, out, "divided")
 
     def __add__(self, other) -> Self:
         """
@@ -135,11 +298,13 @@ class Image:
         Returns:
             Image: Sum of two images values.
         """
-        if not isinstance(other, Image):
-            print("Error: Images can only be added with other images.")
-            raise TypeError
+        return self.add(other)
 
-        return type(self)(self.data + other.data)
+    def __iadd__(self, other) -> Self:
+        """
+        Adds another image's values into this image, without allocating.
+        """
+        return self.add(other, out=self)
 
     def __radd__(self, other) -> None:
         """
@@ -159,11 +324,13 @@ class Image:
         Returns:
             Image: Difference of two images values.
         """
-        if not isinstance(other, Image):
-            print("Error: Images can only be subtracted with other images.")
-            raise TypeError
+        return self.subtract(other)
 
-        return type(self)(self.data - other.data)
+    def __isub__(self, other) -> Self:
+        """
+        Subtracts another image's values from this image, without allocating.
+        """
+        return self.subtract(other, out=self)
 
     def __rsub__(self, other) -> None:
         """
@@ -183,11 +350,13 @@ class Image:
         Returns:
             Image: Product of two images values.
         """
-        if not isinstance(other, Image):
-            print("Error: Images can only be multiplied with other images.")
-            raise TypeError
+        return self.multiply(other)
 
-        return type(self)(self.data * other.data)
+    def __imul__(self, other) -> Self:
+        """
+        Multiplies this image by another image's values, without allocating.
+        """
+        return self.multiply(other, out=self)
 
     def __rmul__(self, other) -> None:
         """
@@ -197,7 +366,7 @@ class Image:
         print("Error: Images can only be multiplied with other images.")
         raise TypeError
 
-    def __div__(self, other) -> Self:
+    def __truediv__(self, other) -> Self:
         """
         Divides two images values.
 
@@ -207,13 +376,15 @@ class Image:
         Returns:
             Image: Quotient of two images values.
         """
-        if not isinstance(other, Image):
-            print("Error: Images can only be divided with other images.")
-            raise TypeError
+        return self.divide(other)
 
-        return type(self)(self.data / other.data)
+    def __itruediv__(self, other) -> Self:
+        """
+        Divides this image by another image's values, without allocating.
+        """
+        return self.divide(other, out=self)
 
-    def __rdiv__(self, other) -> None:
+    def __rtruediv__(self, other) -> None:
         """
         Returns:
             TypeError: can only divide images with other images.
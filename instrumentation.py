@@ -0,0 +1,268 @@
+from contextlib import nullcontext
+from typing import Any, Iterable
+import json
+import numpy
+import time
+import tracemalloc
+
+# Histogram bin edges: a quarter decade per bin from 10 µs to 100 s, and a power
+# of two per bin from 1 KiB to 4 GiB
+SECONDS_BINS = 10 ** numpy.arange(-5, 2.01, 0.25)
+BYTES_BINS = 2.0 ** numpy.arange(10, 33)
+
+PERCENTILES = (50, 90, 99)
+
+
+class StageSample:
+    """
+    StageSample
+
+    Measurements of one run of one pipeline stage.
+
+    Attributes:
+        stage (str): name of the stage
+        wall (float): elapsed seconds, less those of the stages nested in it
+        cpu (float): CPU seconds of the thread running the stage, less those of
+            the stages nested in it
+        peak_bytes (int | None): most bytes allocated at once during the stage,
+            None if memory isn't traced
+        array_bytes (int): bytes of the arrays the stage reported
+    """
+
+    __slots__ = ("stage", "wall", "cpu", "peak_bytes", "array_bytes")
+
+    def __init__(self, stage: str) -> None:
+        self.stage: str = stage
+        self.wall: float = 0.0
+        self.cpu: float = 0.0
+        self.peak_bytes: int | None = None
+        self.array_bytes: int = 0
+
+    def add_array(self, array: Any) -> None:
+        """
+        Counts the size of an array the stage consumed or produced.
+
+        Parameters:
+            array (Any): array, or anything without nbytes, which is ignored
+        """
+        self.array_bytes += getattr(array, "nbytes", 0)
+
+    def to_tuple(self) -> tuple:
+        return (self.stage, self.wall, self.cpu, self.peak_bytes, self.array_bytes)
+
+
+class _NoSample:
+    """
+    Stands in for a StageSample when instrumentation is disabled.
+    """
+
+    __slots__ = ()
+
+    def add_array(self, array: Any) -> None:
+        pass
+
+
+_DISABLED = nullcontext(_NoSample())
+
+
+class _Measurement:
+    """
+    Context manager measuring one run of a stage.
+    """
+
+    __slots__ = (
+        "instrumentation",
+        "sample",
+        "_wall",
+        "_cpu",
+        "_nested_wall",
+        "_nested_cpu",
+        "_frame",
+    )
+
+    def __init__(self, instrumentation: "Instrumentation", stage: str) -> None:
+        self.instrumentation = instrumentation
+        self.sample = StageSample(stage)
+        self._nested_wall: float = 0.0
+        self._nested_cpu: float = 0.0
+
+    def __enter__(self) -> StageSample:
+        if self.instrumentation.trace_memory:
+            self._frame = self.instrumentation._push_memory_frame()
+        self.instrumentation._open.append(self)
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+        return self.sample
+
+    def __exit__(self, *exc_info) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        open_measurements = self.instrumentation._open
+        open_measurements.pop()
+        # The enclosing stage only keeps the time spent outside this one
+        if open_measurements:
+            open_measurements[-1]._nested_wall += wall
+            open_measurements[-1]._nested_cpu += cpu
+        self.sample.wall = wall - self._nested_wall
+        self.sample.cpu = cpu - self._nested_cpu
+        if self.instrumentation.trace_memory:
+            self.sample.peak_bytes = self.instrumentation._pop_memory_frame(self._frame)
+        self.instrumentation.samples.append(self.sample.to_tuple())
+
+
+class Instrumentation:
+    """
+    Instrumentation
+
+    Opt-in timing and memory measurements of pipeline stages, aggregated into
+    per-stage percentiles and histograms for a JSON report.
+
+    Every stage is wrapped in measure(); when instrumentation is disabled that
+    returns one shared do-nothing context, so it can stay in production code.
+    Stages may nest, in which case the outer stage's wall and CPU time exclude the
+    inner one's, so no time is counted twice, while its peak memory includes it.
+    Samples taken in worker processes are sent back with each galaxy's result and
+    merged with add_samples().
+
+    Attributes:
+        enabled (bool): whether stages are measured at all
+        trace_memory (bool): also track peak allocations with tracemalloc, which
+            slows Python allocations noticeably while enabled
+        samples (list[tuple]): (stage, wall, cpu, peak_bytes, array_bytes) of every
+            measured run of a stage
+    """
+
+    def __init__(self, enabled: bool = False, trace_memory: bool = True) -> None:
+        self.enabled: bool = enabled
+        self.trace_memory: bool = enabled and trace_memory
+        self.samples: list[tuple] = []
+        self._memory_frames: list[list[int]] = []
+        self._open: list[_Measurement] = []
+
+    def __getstate__(self) -> dict:
+        # Workers start with no samples of their own
+        return {"enabled": self.enabled, "trace_memory": self.trace_memory}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["enabled"], state["trace_memory"])
+
+    def measure(self, stage: str) -> Any:
+        """
+        Measures one run of a stage.
+
+            with instrumentation.measure("find_galaxy") as sample:
+                location = finder.find_galaxy()
+                sample.add_array(finder.image.data)
+
+        Parameters:
+            stage (str): name of the stage
+
+        Returns:
+            context manager giving a StageSample, or a stand-in when disabled
+        """
+        if not self.enabled:
+            return _DISABLED
+        return _Measurement(self, stage)
+
+    def _push_memory_frame(self) -> list[int]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        current, peak = tracemalloc.get_traced_memory()
+        # The enclosing stage keeps the peak reached so far before it is reset
+        if self._memory_frames:
+            parent = self._memory_frames[-1]
+            parent[1] = max(parent[1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]
+        self._memory_frames.append(frame)
+        return frame
+
+    def _pop_memory_frame(self, frame: list[int]) -> int:
+        peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+        self._memory_frames.pop()
+        if self._memory_frames:
+            parent = self._memory_frames[-1]
+            parent[1] = max(parent[1], peak)
+        return peak - frame[0]
+
+    def drain(self) -> list[tuple]:
+        """
+        Takes every sample recorded so far, e.g. to send them back from a worker.
+
+        Returns:
+            list[tuple]: the samples, which are removed from this instrumentation
+        """
+        samples, self.samples = self.samples, []
+        return samples
+
+    def add_samples(self, samples: Iterable[tuple]) -> None:
+        """
+        Adds samples taken elsewhere, such as in a worker process.
+
+        Parameters:
+            samples (Iterable[tuple]): samples from drain()
+        """
+        self.samples.extend(samples)
+
+    @staticmethod
+    def _summarize(values: numpy.ndarray, bins: numpy.ndarray) -> dict[str, Any]:
+        counts, _ = numpy.histogram(values, bins)
+        summary = {
+            "total": float(values.sum()),
+            "mean": float(values.mean()),
+            "max": float(values.max()),
+            **{
+                f"p{percentile}": float(value)
+                for percentile, value in zip(
+                    PERCENTILES, numpy.percentile(values, PERCENTILES)
+                )
+            },
+            "histogram": {
+                "edges": bins.tolist(),
+                "counts": counts.tolist(),
+                "below": int((values < bins[0]).sum()),
+                "above": int((values >= bins[-1]).sum()),
+            },
+        }
+        return summary
+
+    def report(self) -> dict[str, Any]:
+        """
+        Aggregates the samples of every stage.
+
+        Returns:
+            dict[str, Any]: per stage, the number of runs and summaries of wall
+            time and CPU time excluding nested stages, peak allocated bytes and
+            array bytes
+        """
+        stages: dict[str, list[tuple]] = {}
+        for sample in self.samples:
+            stages.setdefault(sample[0], []).append(sample)
+
+        report = {}
+        for stage, samples in stages.items():
+            _, wall, cpu, peak_bytes, array_bytes = zip(*samples)
+            report[stage] = {
+                "count": len(samples),
+                "wall_seconds": self._summarize(numpy.array(wall), SECONDS_BINS),
+                "cpu_seconds": self._summarize(numpy.array(cpu), SECONDS_BINS),
+            }
+            if all(peak is not None for peak in peak_bytes):
+                report[stage]["peak_bytes"] = self._summarize(
+                    numpy.array(peak_bytes, dtype=float), BYTES_BINS
+                )
+            if any(array_bytes):
+                report[stage]["array_bytes"] = self._summarize(
+                    numpy.array(array_bytes, dtype=float), BYTES_BINS
+                )
+        return report
+
+    def write_report(self, path: str) -> None:
+        """
+        Writes the aggregated report as JSON.
+
+        Parameters:
+            path (str): where the report is written
+        """
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=4)
@@ -0,0 +1,223 @@
+from image import Image
+
+from typing import Any, Self
+import numpy
+import sys
+
+# Bytes of each operand and intermediate per tile, small enough that every array a
+# tile of an expression touches stays in cache, large enough to amortize the numpy
+# call overhead per operation
+TILE_BYTES = 128 * 2**10
+
+
+class LazyImage(Image):
+    """
+    LazyImage
+
+    Opt-in lazy form of Image arithmetic. Adding, subtracting, multiplying or dividing
+    a LazyImage only records the operation; the whole expression is evaluated when
+    its data is first asked for, one tile of rows at a time, so every operation runs
+    over a tile while it is still in cache and no intermediate image is ever built
+    in full. Each tile goes through the same numpy operations as the eager path, so
+    the result is bit-identical to it.
+
+        temperature_input = (LazyImage(r) - LazyImage(g)) / LazyImage(z)
+        temperature_input.data  # evaluated here, in one pass over memory
+
+    Attributes:
+        data (numpy.ndarray): the evaluated expression, computed on first access
+    """
+
+    __slots__ = ("_operation", "_operands", "_shape")
+
+    def __init__(self, image: Image) -> None:
+        """
+        Starts a lazy expression from an image.
+
+        Parameters:
+            image (Image): image whose data the expression reads, without copying
+        """
+        super().__init__(image.data)
+        self._operation: numpy.ufunc | None = None
+        self._operands: tuple[Image, ...] = ()
+        self._shape: tuple[int, int] = image.shape
+
+    @classmethod
+    def _node(cls, operation: numpy.ufunc, operands: tuple[Image, ...]) -> "LazyImage":
+        """
+        Records an operation on images without evaluating it.
+
+        Parameters:
+            operation (numpy.ufunc): elementwise operation
+            operands (tuple[Image, ...]): images the operation is applied to
+
+        Returns:
+            LazyImage: unevaluated expression
+        """
+        shape = operands[0].shape
+        if any(operand.shape != shape for operand in operands):
+            print("Error: Lazy images must all have the same shape.", file=sys.stderr)
+            raise ValueError
+
+        node = cls.__new__(cls)
+        node._data = None
+        node._operation = operation
+        node._operands = operands
+        node._shape = shape
+        return node
+
+    @classmethod
+    def _wrap(cls, data: numpy.ndarray) -> Image:
+        # Results of eager methods such as scale are plain images
+        return Image(data)
+
+    @property
+    def data(self) -> numpy.ndarray:
+        """
+        Gets the data of the expression, evaluating it the first time.
+
+        Returns:
+            numpy.ndarray: 2D array of image data.
+        """
+        if self._data is None:
+            self._data = self.evaluate()
+        return self._data
+
+    @data.setter
+    def data(self, value: Any) -> None:
+        print("Error: Image data is not mutable.", file=sys.stderr)
+        raise TypeError
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """
+        Find the shape of the image, without evaluating it.
+
+        Returns:
+            tuple[int, int]: Shape of image data.
+        """
+        return self._shape
+
+    @property
+    def is_evaluated(self) -> bool:
+        """
+        Whether the data of the expression has been computed.
+        """
+        return self._data is not None
+
+    def _itemsize(self) -> int:
+        """
+        Finds the widest item of any array a tile of the expression touches.
+
+        Returns:
+            int: the largest itemsize, at least that of float64
+        """
+        if self._data is not None:
+            return self._data.itemsize
+        return max(
+            8,
+            *(
+                (
+                    operand._itemsize()
+                    if isinstance(operand, LazyImage)
+                    else operand.data.itemsize
+                )
+                for operand in self._operands
+            ),
+        )
+
+    def _evaluate_rows(
+        self, rows: slice, out: numpy.ndarray | None = None
+    ) -> numpy.ndarray:
+        """
+        Evaluates one tile of rows of the expression.
+
+        Parameters:
+            rows (slice): rows of the tile
+            out (numpy.ndarray, optional): where the tile of the result is written
+
+        Returns:
+            numpy.ndarray: the tile of the result
+        """
+        if self._data is not None:
+            if out is None:
+                return self._data[rows]
+            numpy.copyto(out, self._data[rows])
+            return out
+        operands = [
+            (
+                operand._evaluate_rows(rows)
+                if isinstance(operand, LazyImage)
+                else operand.data[rows]
+            )
+            for operand in self._operands
+        ]
+        return self._operation(*operands, out=out)
+
+    def evaluate(self, out: Image | numpy.ndarray | None = None) -> numpy.ndarray:
+        """
+        Evaluates the expression tile by tile.
+
+        Parameters:
+            out (Image | numpy.ndarray, optional): where the result is written,
+                instead of a new array
+
+        Returns:
+            numpy.ndarray: the result of the expression
+        """
+        if isinstance(out, Image):
+            out = out.data
+        if self._data is not None and out is None:
+            return self._data
+        if out is not None and not out.flags.writeable:
+            print("Error: Output image is read-only.", file=sys.stderr)
+            raise ValueError
+
+        height, width = self._shape
+        tile_rows = max(1, TILE_BYTES // (width * self._itemsize()))
+
+        for start in range(0, height, tile_rows):
+            rows = slice(start, start + tile_rows)
+            if out is None:
+                # The first tile settles the dtype, exactly as the eager path would
+                tile = self._evaluate_rows(rows)
+                out = numpy.empty(self._shape, dtype=tile.dtype)
+                out[rows] = tile
+            else:
+                self._evaluate_rows(rows, out=out[rows])
+        if out is None:
+            out = self._evaluate_rows(slice(0, 0)).reshape(self._shape)
+        return out
+
+    def _apply(
+        self,
+        operation: numpy.ufunc,
+        other: Image,
+        out: Image | numpy.ndarray | None,
+        verb: str,
+    ) -> Self:
+        """
+        Records an elementwise operation between two images, or evaluates it
+        straight into out when one is given.
+        """
+        if not isinstance(other, Image):
+            print(f"Error: Images can only be {verb} with other images.")
+            raise TypeError
+
+        node = self._node(operation, (self, other))
+        if out is None or out is self:
+            return node
+        node.evaluate(out)
+        return out if isinstance(out, Image) else Image(out)
+
+    def __getitem__(
+        self, key: tuple[slice | int, slice | int]
+    ) -> Image | numpy.ndarray | Any:
+        """
+        Accesses a smaller region of the evaluated image.
+        """
+        return Image(self.data)[key]
+
+    def __reduce__(self) -> tuple:
+        # Evaluated before pickling, so worker processes receive plain images
+        return (Image, (self.data,))
@@ -0,0 +1,372 @@
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from profilerenderer import X_LABEL, Y_LABEL
+
+from typing import Any, Iterable
+import math
+import numpy
+import os
+import sys
+
+"""
+PopulationStatistics
+
+Streaming statistics of the temperature profiles of a whole population of galaxies,
+per Galaxy10 class, on a common normalized radius grid.
+
+Profiles are folded in one at a time and never kept: each radius bin holds a running
+mean and variance (Welford's algorithm) and a quantile sketch, so memory depends only
+on the number of bins. Statistics built in different workers or shards merge exactly,
+and give the stacked mean, scatter and percentile curves of the population.
+"""
+
+# Bins of the normalized radius grid, from the galaxy center (0) to its edge (1)
+NORMALIZED_BINS = 50
+
+# Relative accuracy of the quantiles, and the range of temperatures (Kelvin) the
+# sketches resolve; values outside it are counted in the first or last bucket
+SKETCH_ACCURACY = 0.005
+SKETCH_RANGE = (100.0, 1e6)
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def normalize_profile(
+    profile: Iterable[float], bins: int = NORMALIZED_BINS
+) -> numpy.ndarray:
+    """
+    Resamples a profile onto the normalized radius grid.
+
+    The profile is taken to span normalized radius 0 to 1, as TemperatureProfile
+    plots it, and is interpolated linearly between its valid samples.
+
+    Parameters:
+        profile (Iterable[float]): radial temperature profile of a galaxy
+        bins (int): number of bins of the grid
+
+    Returns:
+        numpy.ndarray: value at the center of each bin, NaN outside the valid part
+        of the profile
+    """
+    profile = numpy.asarray(list(profile), dtype="float64")
+    grid = (numpy.arange(bins) + 0.5) / bins
+    radius = numpy.linspace(0, 1, len(profile))
+    valid = numpy.isfinite(profile)
+    if valid.sum() < 2:
+        return numpy.full(bins, numpy.nan)
+    return numpy.interp(
+        grid, radius[valid], profile[valid], left=numpy.nan, right=numpy.nan
+    )
+
+
+class QuantileSketch:
+    """
+    QuantileSketch
+
+    Mergeable quantile sketch of many values per radius bin, with a fixed relative
+    accuracy. Each bin counts values in logarithmically spaced buckets, so two
+    sketches merge by adding their counts, and any quantile is within the relative
+    accuracy of a value at that rank.
+
+    Attributes:
+        accuracy (float): relative accuracy of the quantiles
+        value_range (tuple[float, float]): smallest and largest values resolved
+        counts (numpy.ndarray): (bins, buckets) number of values in each bucket
+    """
+
+    def __init__(
+        self,
+        bins: int = NORMALIZED_BINS,
+        accuracy: float = SKETCH_ACCURACY,
+        value_range: tuple[float, float] = SKETCH_RANGE,
+    ) -> None:
+        self.accuracy: float = accuracy
+        self.value_range: tuple[float, float] = value_range
+        self._gamma: float = (1 + accuracy) / (1 - accuracy)
+        buckets = math.ceil(
+            math.log(value_range[1] / value_range[0]) / math.log(self._gamma)
+        )
+        self.counts: numpy.ndarray = numpy.zeros((bins, buckets), dtype="int64")
+
+    def add(self, values: numpy.ndarray) -> None:
+        """
+        Counts one value per radius bin.
+
+        Parameters:
+            values (numpy.ndarray): value of each bin, NaN where there is none
+        """
+        bins = numpy.flatnonzero(numpy.isfinite(values) & (values > 0))
+        buckets = numpy.log(values[bins] / self.value_range[0]) / math.log(self._gamma)
+        buckets = numpy.clip(buckets, 0, self.counts.shape[1] - 1).astype(numpy.intp)
+        self.counts[bins, buckets] += 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Adds the values counted by another sketch with the same settings.
+
+        Parameters:
+            other (QuantileSketch): sketch to merge into this one
+        """
+        if (
+            other.counts.shape != self.counts.shape
+            or other.accuracy != self.accuracy
+            or tuple(other.value_range) != tuple(self.value_range)
+        ):
+            print("Error: Only sketches with the same settings merge.", file=sys.stderr)
+            raise ValueError
+        self.counts += other.counts
+
+    def quantiles(self, quantiles: Iterable[float]) -> numpy.ndarray:
+        """
+        Estimates quantiles of every radius bin.
+
+        Parameters:
+            quantiles (Iterable[float]): quantiles to estimate, between 0 and 1
+
+        Returns:
+            numpy.ndarray: (len(quantiles), bins) estimates, NaN for empty bins
+        """
+        cumulative = self.counts.cumsum(axis=1)
+        totals = cumulative[:, -1]
+        # Midpoint of each bucket in relative terms, so every value in it is within
+        # the accuracy
+        lower = self.value_range[0] * self._gamma ** numpy.arange(self.counts.shape[1])
+        representative = lower * 2 * self._gamma / (self._gamma + 1)
+
+        estimates = []
+        for quantile in quantiles:
+            rank = numpy.floor(quantile * (totals - 1))
+            bucket = (cumulative <= rank[:, numpy.newaxis]).sum(axis=1)
+            bucket = numpy.minimum(bucket, self.counts.shape[1] - 1)
+            estimates.append(numpy.where(totals > 0, representative[bucket], numpy.nan))
+        return numpy.array(estimates)
+
+
+class RadialStatistics:
+    """
+    RadialStatistics
+
+    Running statistics of one population's profiles in every normalized radius bin.
+
+    Attributes:
+        count (numpy.ndarray): number of profiles with a value in each bin
+        mean (numpy.ndarray): mean of each bin
+        m2 (numpy.ndarray): sum of squared deviations from the mean of each bin
+        sketch (QuantileSketch): quantiles of each bin
+    """
+
+    def __init__(
+        self,
+        bins: int = NORMALIZED_BINS,
+        accuracy: float = SKETCH_ACCURACY,
+        value_range: tuple[float, float] = SKETCH_RANGE,
+    ) -> None:
+        self.count: numpy.ndarray = numpy.zeros(bins, dtype="int64")
+        self.mean: numpy.ndarray = numpy.zeros(bins)
+        self.m2: numpy.ndarray = numpy.zeros(bins)
+        self.sketch: QuantileSketch = QuantileSketch(bins, accuracy, value_range)
+
+    @property
+    def std(self) -> numpy.ndarray:
+        """
+        Gets the sample standard deviation of every bin.
+
+        Returns:
+            numpy.ndarray: standard deviation, NaN for bins with fewer than 2 values
+        """
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            return numpy.where(
+                self.count > 1, numpy.sqrt(self.m2 / (self.count - 1)), numpy.nan
+            )
+
+    def add(self, values: numpy.ndarray) -> None:
+        """
+        Folds in one normalized profile.
+
+        Parameters:
+            values (numpy.ndarray): value of each bin, NaN where there is none
+        """
+        bins = numpy.flatnonzero(numpy.isfinite(values))
+        self.count[bins] += 1
+        delta = values[bins] - self.mean[bins]
+        self.mean[bins] += delta / self.count[bins]
+        self.m2[bins] += delta * (values[bins] - self.mean[bins])
+        self.sketch.add(values)
+
+    def merge(self, other: "RadialStatistics") -> None:
+        """
+        Folds in the statistics of another population, as if its profiles had been
+        added here (Chan et al.'s parallel variance).
+
+        Parameters:
+            other (RadialStatistics): statistics to merge into these
+        """
+        self.sketch.merge(other.sketch)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            weight = numpy.where(count > 0, other.count / count, 0.0)
+        self.mean = self.mean + delta * weight
+        self.m2 = self.m2 + other.m2 + delta**2 * self.count * weight
+        self.count = count
+
+    def curves(self, percentiles: Iterable[float] = PERCENTILES) -> dict[str, Any]:
+        """
+        Gets the stacked curves of the population.
+
+        Parameters:
+            percentiles (Iterable[float]): percentiles to estimate, 0 to 100
+
+        Returns:
+            dict[str, Any]: "radius" (bin centers), "count", "mean", "std" and one
+            "p<percentile>" curve per percentile, NaN where a bin has no values
+        """
+        bins = len(self.count)
+        percentiles = list(percentiles)
+        quantiles = self.sketch.quantiles([p / 100 for p in percentiles])
+        curves = {
+            "radius": (numpy.arange(bins) + 0.5) / bins,
+            "count": self.count.copy(),
+            "mean": numpy.where(self.count > 0, self.mean, numpy.nan),
+            "std": self.std,
+        }
+        for percentile, quantile in zip(percentiles, quantiles):
+            curves[f"p{percentile:g}"] = quantile
+        return curves
+
+
+class PopulationStatistics:
+    """
+    PopulationStatistics
+
+    Streaming statistics of normalized temperature profiles per Galaxy10 class.
+
+    Attributes:
+        bins (int): number of bins of the normalized radius grid
+        accuracy (float): relative accuracy of the quantiles
+        value_range (tuple[float, float]): range of temperatures the quantiles resolve
+        classes (dict[int, RadialStatistics]): statistics of each class seen
+    """
+
+    def __init__(
+        self,
+        bins: int = NORMALIZED_BINS,
+        accuracy: float = SKETCH_ACCURACY,
+        value_range: tuple[float, float] = SKETCH_RANGE,
+    ) -> None:
+        self.bins: int = bins
+        self.accuracy: float = accuracy
+        self.value_range: tuple[float, float] = tuple(value_range)
+        self.classes: dict[int, RadialStatistics] = {}
+
+    def _statistics(self, galaxy_class: int) -> RadialStatistics:
+        if galaxy_class not in self.classes:
+            self.classes[galaxy_class] = RadialStatistics(
+                self.bins, self.accuracy, self.value_range
+            )
+        return self.classes[galaxy_class]
+
+    def add(self, galaxy_class: int, profile: Iterable[float]) -> None:
+        """
+        Folds in the profile of one galaxy.
+
+        Parameters:
+            galaxy_class (int): Galaxy10 class of the galaxy
+            profile (Iterable[float]): radial temperature profile of the galaxy
+        """
+        self._statistics(int(galaxy_class)).add(normalize_profile(profile, self.bins))
+
+    def merge(self, other: "PopulationStatistics") -> None:
+        """
+        Folds in the statistics of another worker or shard.
+
+        Parameters:
+            other (PopulationStatistics): statistics to merge into these
+        """
+        for galaxy_class, statistics in other.classes.items():
+            self._statistics(galaxy_class).merge(statistics)
+
+    def save(self, path: str) -> None:
+        """
+        Writes the statistics, so shards can be merged later, replacing any previous
+        version atomically.
+
+        Parameters:
+            path (str): .npz file to write
+        """
+        arrays = {
+            "bins": numpy.array(self.bins),
+            "accuracy": numpy.array(self.accuracy),
+            "value_range": numpy.array(self.value_range),
+            "classes": numpy.array(sorted(self.classes), dtype="int64"),
+        }
+        for galaxy_class, statistics in self.classes.items():
+            arrays[f"count_{galaxy_class}"] = statistics.count
+            arrays[f"mean_{galaxy_class}"] = statistics.mean
+            arrays[f"m2_{galaxy_class}"] = statistics.m2
+            arrays[f"sketch_{galaxy_class}"] = statistics.sketch.counts
+
+        temporary_path = f"{path}.{os.getpid()}.tmp.npz"
+        numpy.savez_compressed(temporary_path, **arrays)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PopulationStatistics":
+        """
+        Reads statistics written by save().
+
+        Parameters:
+            path (str): .npz file to read
+
+        Returns:
+            PopulationStatistics: the statistics
+        """
+        with numpy.load(path) as arrays:
+            population = cls(
+                int(arrays["bins"]),
+                float(arrays["accuracy"]),
+                tuple(float(x) for x in arrays["value_range"]),
+            )
+            for galaxy_class in arrays["classes"].tolist():
+                statistics = population._statistics(galaxy_class)
+                statistics.count = arrays[f"count_{galaxy_class}"]
+                statistics.mean = arrays[f"mean_{galaxy_class}"]
+                statistics.m2 = arrays[f"m2_{galaxy_class}"]
+                statistics.sketch.counts = arrays[f"sketch_{galaxy_class}"]
+        return population
+
+    def render(self, path: str) -> None:
+        """
+        Plots the stacked profile of every class: its mean with the standard
+        deviation around it, its median, and the band between its 25th and 75th
+        percentiles.
+
+        Parameters:
+            path (str): where the plot is saved
+        """
+        classes = sorted(self.classes)
+        figure = Figure(figsize=(5 * max(1, len(classes)), 5), layout="constrained")
+        FigureCanvasAgg(figure)
+        axes = figure.subplots(1, max(1, len(classes)), squeeze=False).ravel()
+        for panel, galaxy_class in zip(axes, classes):
+            curves = self.classes[galaxy_class].curves((25, 50, 75))
+            radius = curves["radius"]
+            panel.fill_between(
+                radius,
+                curves["mean"] - curves["std"],
+                curves["mean"] + curves["std"],
+                alpha=0.2,
+                label="mean ± std",
+            )
+            panel.fill_between(
+                radius, curves["p25"], curves["p75"], alpha=0.3, label="25th-75th"
+            )
+            panel.plot(radius, curves["mean"], label="mean")
+            panel.plot(radius, curves["p50"], linestyle="--", label="median")
+            panel.set_title(
+                f"Class {galaxy_class} ({int(curves['count'].max())} galaxies)"
+            )
+            panel.legend(fontsize="small")
+        figure.supxlabel(X_LABEL)
+        figure.supylabel(Y_LABEL)
+        figure.savefig(path)
@@ -0,0 +1,67 @@
+import numpy
+import sys
+
+"""
+precision
+
+Floating point precision of the pipeline.
+
+Every stage allocates and computes its float arrays in the precision it is given.
+float32 is the default, as it halves the memory traffic and working set of batched
+and parallel runs; float64 is kept for validation, as the reference float32 results
+are checked against.
+"""
+
+PRECISIONS = {"float32": numpy.float32, "float64": numpy.float64}
+DEFAULT_PRECISION = "float32"
+
+# Largest relative difference allowed between a profile and its float64 reference
+PROFILE_TOLERANCE = 1e-4
+
+
+def float_dtype(precision: str | numpy.dtype | type) -> numpy.dtype:
+    """
+    Resolves a precision setting to its numpy dtype.
+
+    Parameters:
+        precision (str | numpy.dtype | type): "float32", "float64", or either dtype
+
+    Returns:
+        numpy.dtype: the float dtype stages should allocate and compute in
+    """
+    dtype = numpy.dtype(PRECISIONS.get(precision, precision))
+    if dtype not in (numpy.float32, numpy.float64):
+        print(f"Error: Unsupported precision {precision!r}.", file=sys.stderr)
+        raise ValueError
+    return dtype
+
+
+def relative_error(result: numpy.ndarray, reference: numpy.ndarray) -> float:
+    """
+    Measures how far a result is from its float64 reference.
+
+    Parameters:
+        result (numpy.ndarray): values computed at reduced precision
+        reference (numpy.ndarray): the same values computed in float64
+
+    Returns:
+        float: largest relative difference, infinite if the results differ in
+        shape or in where they are NaN
+    """
+    result = numpy.asarray(result, dtype=numpy.float64)
+    reference = numpy.asarray(reference, dtype=numpy.float64)
+    if result.shape != reference.shape or not numpy.array_equal(
+        numpy.isnan(result), numpy.isnan(reference)
+    ):
+        return numpy.inf
+
+    valid = ~numpy.isnan(reference)
+    if not valid.any():
+        return 0.0
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        error = numpy.abs(result[valid] - reference[valid]) / numpy.abs(
+            reference[valid]
+        )
+    # Exact zeros in the reference only match exact zeros
+    error[reference[valid] == result[valid]] = 0
+    return float(error.max())
@@ -0,0 +1,149 @@
+from dataloader import DataLoader
+from galaxyloader import BAND_INDEX, GalaxyLoader, band_selection
+
+from typing import Iterable, Iterator
+import numpy
+import queue
+import threading
+
+# Marks the end of the galaxies in the queue
+_DONE = object()
+
+
+class PrefetchLoader:
+    """
+    PrefetchLoader
+
+    Reads upcoming galaxies from a DataLoader's data set in a background thread, so
+    the disk and decompression work overlaps with the pipeline instead of the CPU
+    sitting idle on every read.
+
+    Galaxies are read in index order, one HDF5 chunk's worth at a time, so each chunk
+    is decompressed once. Only the bands the pipeline needs are read. The reader
+    stays at most queue_depth galaxies (and at most memory_limit bytes, plus the
+    chunk it is reading) ahead of the pipeline.
+
+    Attributes:
+        data_loader (DataLoader): loader whose data set is read
+        galaxy_numbers (numpy.ndarray): sorted indices of the galaxies to read
+        queue_depth (int): most galaxies read ahead of the pipeline
+        bands (tuple[str, ...]): bands read for each galaxy
+    """
+
+    def __init__(
+        self,
+        data_loader: DataLoader,
+        galaxy_numbers: Iterable[int],
+        queue_depth: int = 16,
+        memory_limit: int = 256 * 2**20,
+        bands: Iterable[str] = tuple(BAND_INDEX),
+    ) -> None:
+        """
+        Parameters:
+            data_loader (DataLoader): passed to data_loader attribute
+            galaxy_numbers (Iterable[int]): galaxies to read, yielded in index order
+            queue_depth (int): most galaxies to read ahead
+            memory_limit (int): most bytes of galaxies to hold ahead, which lowers
+                queue_depth if the galaxies are large
+            bands (Iterable[str]): bands to read, e.g. from required_bands
+        """
+        self.data_loader: DataLoader = data_loader
+        self.galaxy_numbers: numpy.ndarray = numpy.unique(
+            numpy.asarray(galaxy_numbers, dtype="int64")
+        )
+
+        self.bands: tuple[str, ...] = tuple(bands)
+
+        images = data_loader.dataset["images"]
+        galaxy_bytes = (
+            images.dtype.itemsize
+            * int(numpy.prod(images.shape[1:-1]))
+            * len(self.bands)
+        )
+        self.queue_depth: int = max(1, min(queue_depth, memory_limit // galaxy_bytes))
+
+    def _chunk_groups(self) -> Iterator[numpy.ndarray]:
+        """
+        Splits the galaxies into groups that lie in the same HDF5 chunk.
+
+        Returns:
+            Iterator[numpy.ndarray]: sorted galaxy indices of each chunk, in order
+        """
+        chunks = self.data_loader.dataset["images"].chunks
+        # Contiguous data sets have no chunks, so read them a galaxy at a time
+        rows_per_chunk = chunks[0] if chunks is not None else 1
+
+        chunk_numbers = self.galaxy_numbers // rows_per_chunk
+        boundaries = numpy.flatnonzero(numpy.diff(chunk_numbers)) + 1
+        return iter(numpy.split(self.galaxy_numbers, boundaries))
+
+    def _read(self, galaxies: queue.Queue, stop: threading.Event) -> None:
+        """
+        Reads every galaxy into the queue, then the end marker. Runs in the
+        background thread.
+
+        Parameters:
+            galaxies (queue.Queue): queue the galaxies are handed over in
+            stop (threading.Event): set when the pipeline stops early
+        """
+        images = self.data_loader.dataset["images"]
+        selection, positions = band_selection(self.bands)
+        try:
+            for group in self._chunk_groups():
+                pixels = images[group, :, :, selection]
+                # Bands the slice covers but the pipeline doesn't need are dropped
+                if positions != list(range(pixels.shape[-1])):
+                    pixels = pixels[..., positions]
+                for galaxy_number, galaxy_pixels in zip(group, pixels):
+                    if not self._put(
+                        galaxies, stop, (int(galaxy_number), galaxy_pixels)
+                    ):
+                        return
+        except BaseException as error:
+            # Hand the failure to the pipeline rather than dying silently
+            self._put(galaxies, stop, error)
+            return
+        self._put(galaxies, stop, _DONE)
+
+    @staticmethod
+    def _put(galaxies: queue.Queue, stop: threading.Event, item: object) -> bool:
+        """
+        Waits for room in the queue, giving up if the pipeline has stopped.
+
+        Returns:
+            bool: True if the item was queued
+        """
+        while not stop.is_set():
+            try:
+                galaxies.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator[tuple[int, GalaxyLoader]]:
+        """
+        Iterates over the galaxies as they are read.
+
+        Returns:
+            galaxy_number (int): Number of each galaxy loaded in
+            GalaxyLoader (GalaxyLoader): GalaxyLoader object with its bands already read
+        """
+        galaxies: queue.Queue = queue.Queue(maxsize=self.queue_depth)
+        stop = threading.Event()
+        reader = threading.Thread(
+            target=self._read, args=(galaxies, stop), name="PrefetchLoader", daemon=True
+        )
+        reader.start()
+
+        try:
+            while (item := galaxies.get()) is not _DONE:
+                if isinstance(item, BaseException):
+                    raise item
+                galaxy_number, pixels = item
+                yield galaxy_number, GalaxyLoader(
+                    galaxy_number, self.data_loader.dataset, pixels, self.bands
+                )
+        finally:
+            stop.set()
+            reader.join()
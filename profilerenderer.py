@@ -0,0 +1,176 @@
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable
+import math
+import numpy
+import os
+
+"""
+ProfileRenderer
+
+Renders radial temperature profiles to .png files without pyplot, so no global
+figure state builds up over long runs.
+
+One figure and line are created per renderer and only their data changes between
+saves, which makes each additional plot cheap. Rendering can be spread over a
+process pool, limited to a random sample, or replaced by multi-panel summary sheets.
+"""
+
+X_LABEL = "Radial Distance (Normalized to Galaxy Radius)"
+Y_LABEL = "Effective Temperature (Kelvin)"
+
+
+class ProfileRenderer:
+    """
+    ProfileRenderer
+
+    Attributes:
+        output_directory (str): directory the plots are saved to
+        figure (Figure): figure reused for every profile
+    """
+
+    def __init__(self, output_directory: str = "output") -> None:
+        self.output_directory: str = output_directory
+        os.makedirs(output_directory, exist_ok=True)
+
+        self.figure: Figure = Figure(figsize=(8, 10))
+        FigureCanvasAgg(self.figure)
+        self._axes = self.figure.add_subplot()
+        (self._line,) = self._axes.plot([], [])
+        self._axes.set_xlabel(X_LABEL)
+        self._axes.set_ylabel(Y_LABEL)
+
+    def render(self, galaxy_number: int, temperature_data: list[float]) -> str:
+        """
+        Plots the temperature profile of one galaxy and saves it as a .png.
+
+        Parameters:
+            galaxy_number (int): number of the galaxy, used for the title and file name
+            temperature_data (list[float]): radial temperature profile of the galaxy
+
+        Returns:
+            str: path of the saved plot
+        """
+        self._line.set_data(
+            numpy.linspace(0, 1, len(temperature_data)), temperature_data
+        )
+        self._axes.relim()
+        self._axes.autoscale_view()
+        self._axes.set_title(f"Temperature Profile of Galaxy #{galaxy_number}")
+
+        path = os.path.join(self.output_directory, f"{galaxy_number}.png")
+        self.figure.savefig(path)
+        return path
+
+    @staticmethod
+    def render_summary(
+        profiles: Iterable[tuple[int, list[float]]],
+        path: str,
+        columns: int = 5,
+    ) -> None:
+        """
+        Plots many temperature profiles as small panels on one sheet.
+
+        Parameters:
+            profiles (Iterable[tuple[int, list[float]]]): galaxy numbers and profiles
+            path (str): where the sheet is saved
+            columns (int): number of panels per row
+        """
+        profiles = list(profiles)
+        rows = max(1, math.ceil(len(profiles) / columns))
+
+        figure = Figure(figsize=(3 * columns, 2.5 * rows), layout="constrained")
+        FigureCanvasAgg(figure)
+        axes = figure.subplots(rows, columns, squeeze=False).ravel()
+        for panel, (galaxy_number, temperature_data) in zip(axes, profiles):
+            panel.plot(numpy.linspace(0, 1, len(temperature_data)), temperature_data)
+            panel.set_title(f"Galaxy #{galaxy_number}", fontsize="small")
+            panel.tick_params(labelsize="x-small")
+        for panel in axes[len(profiles) :]:
+            panel.set_axis_off()
+        figure.supxlabel(X_LABEL)
+        figure.supylabel(Y_LABEL)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        figure.savefig(path)
+
+
+# Each rendering worker process keeps its own renderer
+_worker_renderer: ProfileRenderer | None = None
+
+
+def _render_in_worker(
+    output_directory: str, profiles: list[tuple[int, list[float]]]
+) -> list[str]:
+    global _worker_renderer
+    if (
+        _worker_renderer is None
+        or _worker_renderer.output_directory != output_directory
+    ):
+        _worker_renderer = ProfileRenderer(output_directory)
+    return [_worker_renderer.render(*profile) for profile in profiles]
+
+
+def sample_profiles(
+    profiles: Iterable[tuple[int, list[float]]],
+    sample: int | None = None,
+    seed: int | None = None,
+) -> list[tuple[int, list[float]]]:
+    """
+    Picks a random sample of profiles to plot, keeping their order.
+
+    Parameters:
+        profiles (Iterable[tuple[int, list[float]]]): galaxy numbers and profiles
+        sample (int, optional): number of profiles to keep, all if None
+        seed (int, optional): seed for the random sample
+
+    Returns:
+        list[tuple[int, list[float]]]: the sampled galaxy numbers and profiles
+    """
+    profiles = list(profiles)
+    if sample is not None and sample < len(profiles):
+        picked = numpy.random.default_rng(seed).choice(
+            len(profiles), sample, replace=False
+        )
+        profiles = [profiles[index] for index in numpy.sort(picked)]
+    return profiles
+
+
+def render_profiles(
+    profiles: Iterable[tuple[int, list[float]]],
+    output_directory: str = "output",
+    workers: int = 1,
+    sample: int | None = None,
+    seed: int | None = None,
+) -> list[str]:
+    """
+    Renders one plot per galaxy, optionally for a random sample only and across
+    a process pool.
+
+    Parameters:
+        profiles (Iterable[tuple[int, list[float]]]): galaxy numbers and profiles
+        output_directory (str): directory the plots are saved to
+        workers (int): number of rendering processes, 1 renders in this process
+        sample (int, optional): only render this many galaxies, picked at random
+        seed (int, optional): seed for the random sample
+
+    Returns:
+        list[str]: paths of the saved plots, in the order of the profiles
+    """
+    profiles = sample_profiles(profiles, sample, seed)
+    if workers <= 1 or len(profiles) <= 1:
+        return _render_in_worker(output_directory, profiles)
+
+    # Contiguous batches, so the paths come back in the order of the profiles
+    batch_size = math.ceil(len(profiles) / workers)
+    batches = [
+        profiles[start : start + batch_size]
+        for start in range(0, len(profiles), batch_size)
+    ]
+    with ProcessPoolExecutor(workers) as pool:
+        rendered = pool.map(
+            _render_in_worker, [output_directory] * len(batches), batches
+        )
+    return [path for paths in rendered for path in paths]
@@ -0,0 +1,257 @@
+from galaxylocation import GalaxyLocation
+
+from typing import Any, Iterable
+import h5py
+import json
+import numpy
+
+# Rows per HDF5 chunk, and bins per chunk along the profile axis
+ROW_CHUNK_SIZE = 256
+BIN_CHUNK_SIZE = 64
+
+ROW_FIELDS = {
+    "galaxy_number": ((), "int64"),
+    "run": ((), "int64"),
+    "center": ((2,), "int64"),
+    "radius": ((), "int64"),
+    "length": ((), "int64"),
+}
+
+
+class ProfileStore:
+    """
+    ProfileStore
+
+    Single HDF5 file holding the radial temperature profile of every processed
+    galaxy, so results can be analysed later without rerunning the pipeline.
+
+    Each galaxy is one row across resizable, chunked and compressed datasets: its
+    galaxy number, the run it came from, its location, and its profile padded with
+    NaN to the widest profile stored. The parameters of every run are kept as JSON
+    in "runs". Appended rows are buffered in memory and written in batches. When a
+    galaxy is stored more than once, its latest row is the one read back.
+
+    Attributes:
+        path (str): path of the HDF5 file
+        buffer_size (int): number of rows buffered before they are written
+        file (h5py.File): the open HDF5 file
+        index (dict[int, int]): row of each stored galaxy number
+    """
+
+    def __init__(self, path: str, mode: str = "a", buffer_size: int = 256) -> None:
+        self.path: str = path
+        self.buffer_size: int = buffer_size
+        self.file: h5py.File = h5py.File(path, mode)
+
+        if "profile" not in self.file and self.file.mode != "r":
+            self._create()
+
+        self.index: dict[int, int] = {}
+        if "galaxy_number" in self.file:
+            galaxy_numbers = self.file["galaxy_number"][:]
+            self.index = {int(n): row for row, n in enumerate(galaxy_numbers)}
+
+        self._buffer: list[tuple[int, int, GalaxyLocation, list[float]]] = []
+        self._run: int | None = None
+
+    def _create(self) -> None:
+        for name, (shape, dtype) in ROW_FIELDS.items():
+            self.file.create_dataset(
+                name,
+                shape=(0, *shape),
+                maxshape=(None, *shape),
+                dtype=dtype,
+                chunks=(ROW_CHUNK_SIZE, *shape),
+                compression="gzip",
+                shuffle=True,
+            )
+        self.file.create_dataset(
+            "profile",
+            shape=(0, 0),
+            maxshape=(None, None),
+            dtype="float64",
+            chunks=(ROW_CHUNK_SIZE, BIN_CHUNK_SIZE),
+            compression="gzip",
+            shuffle=True,
+            fillvalue=numpy.nan,
+        )
+        self.file.create_dataset(
+            "runs", shape=(0,), maxshape=(None,), dtype=h5py.string_dtype()
+        )
+
+    def __enter__(self) -> "ProfileStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, galaxy_number: int) -> bool:
+        return int(galaxy_number) in self.index
+
+    def begin_run(self, params: dict[str, Any]) -> int:
+        """
+        Records the parameters of a run, which every row appended after it refers to.
+
+        Parameters:
+            params (dict[str, Any]): JSON-compatible parameters of the run
+
+        Returns:
+            int: number of the run
+        """
+        self.flush()
+        runs = self.file["runs"]
+        self._run = len(runs)
+        runs.resize((self._run + 1,))
+        runs[self._run] = json.dumps(params, sort_keys=True)
+        return self._run
+
+    def runs(self) -> list[dict[str, Any]]:
+        """
+        Gets the parameters of every run recorded in the store.
+
+        Returns:
+            list[dict[str, Any]]: parameters of each run, indexed by run number
+        """
+        return [json.loads(params) for params in self.file["runs"].asstr()[:]]
+
+    def append(
+        self,
+        galaxy_number: int,
+        location: GalaxyLocation,
+        profile: list[float],
+        run: int | None = None,
+    ) -> None:
+        """
+        Buffers the result of one galaxy, writing the buffer once it is full.
+
+        Parameters:
+            galaxy_number (int): index of the galaxy in the data set
+            location (GalaxyLocation): where the galaxy was found
+            profile (list[float]): radial temperature profile of the galaxy
+            run (int, optional): run the galaxy came from, the latest begun if None
+        """
+        if run is None:
+            if self._run is None:
+                self.begin_run({})
+            run = self._run
+        self._buffer.append((int(galaxy_number), run, location, profile))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes every buffered row to the file.
+        """
+        if not self._buffer:
+            return
+
+        start = self.file["galaxy_number"].shape[0]
+        stop = start + len(self._buffer)
+        width = max(len(profile) for _, _, _, profile in self._buffer)
+        width = max(width, self.file["profile"].shape[1])
+
+        profiles = numpy.full((len(self._buffer), width), numpy.nan)
+        for row, (_, _, _, profile) in enumerate(self._buffer):
+            profiles[row, : len(profile)] = profile
+        rows = {
+            "galaxy_number": [n for n, _, _, _ in self._buffer],
+            "run": [run for _, run, _, _ in self._buffer],
+            "center": [location.center for _, _, location, _ in self._buffer],
+            "radius": [location.radius for _, _, location, _ in self._buffer],
+            "length": [len(profile) for _, _, _, profile in self._buffer],
+        }
+
+        for name, values in rows.items():
+            dataset = self.file[name]
+            dataset.resize(stop, axis=0)
+            dataset[start:stop] = numpy.asarray(values, dtype=dataset.dtype)
+        self.file["profile"].resize((stop, width))
+        self.file["profile"][start:stop] = profiles
+
+        for row, (galaxy_number, _, _, _) in enumerate(self._buffer, start):
+            self.index[galaxy_number] = row
+        self._buffer.clear()
+        self.file.flush()
+
+    def close(self) -> None:
+        """
+        Writes any buffered rows and closes the file.
+        """
+        if self.file.mode != "r":
+            self.flush()
+        self.file.close()
+
+    def galaxy_numbers(self) -> numpy.ndarray:
+        """
+        Gets the galaxy numbers of every stored galaxy.
+
+        Returns:
+            numpy.ndarray: sorted galaxy numbers
+        """
+        if self.file.mode != "r":
+            self.flush()
+        return numpy.array(sorted(self.index), dtype="int64")
+
+    def read(
+        self, galaxy_numbers: Iterable[int] | None = None
+    ) -> dict[str, numpy.ndarray]:
+        """
+        Reads the stored rows of many galaxies at once.
+
+        Parameters:
+            galaxy_numbers (Iterable[int], optional): galaxies to read, every stored
+                galaxy in increasing order if None
+
+        Returns:
+            dict[str, numpy.ndarray]: "galaxy_number", "run", "center" (N, 2),
+            "radius", "length" and "profile" (N, width) of the galaxies, in the
+            order they were asked for, with profiles padded with NaN
+        """
+        if self.file.mode != "r":
+            self.flush()
+        if galaxy_numbers is None:
+            galaxy_numbers = sorted(self.index)
+
+        try:
+            rows = numpy.array(
+                [self.index[int(n)] for n in galaxy_numbers], dtype="int64"
+            )
+        except KeyError as error:
+            raise KeyError(f"Galaxy {error.args[0]} is not in {self.path}") from None
+
+        # h5py reads point selections in increasing order only
+        unique_rows, order = numpy.unique(rows, return_inverse=True)
+        return {
+            name: self.file[name][unique_rows][order]
+            for name in (*ROW_FIELDS, "profile")
+        }
+
+    def profile(self, galaxy_number: int) -> list[float]:
+        """
+        Reads the profile of one galaxy, without its padding.
+
+        Parameters:
+            galaxy_number (int): index of the galaxy in the data set
+
+        Returns:
+            list[float]: radial temperature profile of the galaxy
+        """
+        rows = self.read([galaxy_number])
+        return [float(x) for x in rows["profile"][0, : rows["length"][0]]]
+
+    def location(self, galaxy_number: int) -> GalaxyLocation:
+        """
+        Reads where a galaxy was found.
+
+        Parameters:
+            galaxy_number (int): index of the galaxy in the data set
+
+        Returns:
+            GalaxyLocation: location of the galaxy
+        """
+        rows = self.read([galaxy_number])
+        center_x, center_y = rows["center"][0]
+        return GalaxyLocation((int(center_x), int(center_y)), int(rows["radius"][0]))
@@ -1,4 +1,129 @@
+from typing import Iterable
 import numpy
+import warnings
+
+# Defaults of the sigma clipping, as in astropy.stats.sigma_clip
+CLIP_SIGMA = 3.0
+CLIP_ITERATIONS = 5
+
+
+def _segment_quantile(
+    values: numpy.ndarray, start: numpy.ndarray, count: numpy.ndarray, quantile: float
+) -> numpy.ndarray:
+    """
+    Finds a quantile of every segment of a sorted array, interpolating linearly
+    between the values on either side as numpy.percentile does.
+
+    Parameters:
+        values (numpy.ndarray): values sorted within each segment, followed by a NaN
+        start (numpy.ndarray): index of the first value of each segment
+        count (numpy.ndarray): number of values in each segment
+        quantile (float): quantile to find, between 0 and 1
+
+    Returns:
+        numpy.ndarray: the quantile of each segment, NaN for empty segments
+    """
+    position = quantile * numpy.maximum(count - 1, 0)
+    below = numpy.floor(position)
+    fraction = position - below
+    lower = start + below.astype(numpy.intp)
+    # Stays on the lower value when the quantile lands exactly on it, so the
+    # index never runs into the next segment
+    upper = lower + (fraction > 0)
+    result = values[lower] * (1 - fraction) + values[upper] * fraction
+    return numpy.where(count > 0, result, numpy.nan)
+
+
+def segmented_statistics(
+    values: numpy.ndarray,
+    labels: numpy.ndarray,
+    num_bins: int,
+    percentiles: Iterable[float] = (),
+    clip_sigma: float = CLIP_SIGMA,
+    clip_iterations: int = CLIP_ITERATIONS,
+) -> dict[str, numpy.ndarray]:
+    """
+    Computes robust statistics of values grouped into bins, from a single sort.
+
+    Values are sorted by bin, then by value, once. Every order statistic is then an
+    index into each bin's segment of the sorted array, and each round of sigma
+    clipping only narrows each segment to the run of values it keeps, so no bin is
+    ever sorted or searched on its own.
+
+    Parameters:
+        values (numpy.ndarray): values, NaN where there is no data
+        labels (numpy.ndarray): bin of each value, same size as values; labels of
+            num_bins or more are ignored
+        num_bins (int): number of bins
+        percentiles (Iterable[float]): percentiles to compute, 0 to 100
+        clip_sigma (float): values further than this many standard deviations from
+            their bin's median are clipped
+        clip_iterations (int): most rounds of clipping
+
+    Returns:
+        dict[str, numpy.ndarray]: per bin, "count" of values, their "mean" and
+        "median", the "clipped_mean" and "clipped_count" after sigma clipping, and
+        one "p<percentile>" per percentile; NaN for bins without values
+    """
+    values = numpy.asarray(values, dtype="float64").ravel()
+    labels = numpy.asarray(labels).ravel()
+    valid = ~numpy.isnan(values) & (labels < num_bins)
+    values = values[valid]
+    labels = labels[valid]
+
+    order = numpy.lexsort((values, labels))
+    labels = labels[order]
+    # A NaN after the last value, for the quantiles of empty bins to land on
+    values = numpy.append(values[order], numpy.nan)
+
+    count = numpy.bincount(labels, minlength=num_bins)
+    start = numpy.cumsum(count) - count
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        statistics = {
+            "count": count,
+            "mean": numpy.bincount(labels, values[:-1], minlength=num_bins) / count,
+            "median": _segment_quantile(values, start, count, 0.5),
+        }
+        for percentile in percentiles:
+            statistics[f"p{percentile:g}"] = _segment_quantile(
+                values, start, count, percentile / 100
+            )
+
+        # Each bin keeps one run of its sorted values, narrowed every round. Sums
+        # over a run come from prefix sums of the values, taken relative to their
+        # bin's median so the sums of squares don't lose precision.
+        shifted = values[:-1] - statistics["median"][labels]
+        sums = numpy.concatenate(([0.0], numpy.cumsum(shifted)))
+        squares = numpy.concatenate(([0.0], numpy.cumsum(shifted**2)))
+        kept_start, kept_stop = start, start + count
+        for _ in range(clip_iterations):
+            kept_count = kept_stop - kept_start
+            mean = (sums[kept_stop] - sums[kept_start]) / kept_count
+            variance = (squares[kept_stop] - squares[kept_start]) / kept_count
+            bound = clip_sigma * numpy.sqrt(numpy.maximum(variance - mean**2, 0))
+            center = _segment_quantile(values, kept_start, kept_count, 0.5)
+            center -= statistics["median"]
+
+            # Values are sorted within their bin, so counting those outside the
+            # bounds moves the ends of the run
+            below = numpy.bincount(labels, shifted < (center - bound)[labels], num_bins)
+            above = numpy.bincount(labels, shifted > (center + bound)[labels], num_bins)
+            clipped_start = numpy.maximum(kept_start, start + below.astype(numpy.intp))
+            clipped_stop = numpy.minimum(
+                kept_stop, start + count - above.astype(numpy.intp)
+            )
+            if numpy.array_equal(clipped_start, kept_start) and numpy.array_equal(
+                clipped_stop, kept_stop
+            ):
+                break
+            kept_start, kept_stop = clipped_start, clipped_stop
+
+        kept_count = kept_stop - kept_start
+        statistics["clipped_mean"] = (
+            statistics["median"] + (sums[kept_stop] - sums[kept_start]) / kept_count
+        )
+        statistics["clipped_count"] = kept_count
+    return statistics
 
 
 class RadialAverager:
@@ -13,8 +138,8 @@ class RadialAverager:
     """
 
     def __init__(self, radial_data: numpy.ndarray) -> None:
-        if radial_data.shape[0] != 360:
-            print("Radial data must span 360 degrees.")
+        if radial_data.ndim != 2 or radial_data.shape[0] == 0:
+            print("Radial data must have one or more angles in its rows.")
             raise ValueError
 
         self.radial_data: numpy.ndarray = radial_data
@@ -27,3 +152,65 @@ class RadialAverager:
             list[float]: Average radial values for each position.
         """
         return [float(x) for x in numpy.nanmean(self.radial_data, 0)]
+
+    def compute_statistics(
+        self,
+        percentiles: Iterable[float] = (),
+        sectors: int = 1,
+        clip_sigma: float = CLIP_SIGMA,
+        clip_iterations: int = CLIP_ITERATIONS,
+    ) -> dict[str, numpy.ndarray]:
+        """
+        Computes robust statistics for each radius across angles, in one pass.
+
+        Parameters:
+            percentiles (Iterable[float]): percentiles to compute, 0 to 100
+            sectors (int): number of equal angular wedges to profile separately,
+                starting at the first row
+            clip_sigma (float): values further than this many standard deviations
+                from the median of their radius are clipped
+            clip_iterations (int): most rounds of clipping
+
+        Returns:
+            dict[str, numpy.ndarray]: statistics named as by segmented_statistics,
+            each of shape (radii,), or (sectors, radii) with more than one sector
+        """
+        angles, radii = self.radial_data.shape
+        if not 1 <= sectors <= angles:
+            print("Sectors must number between 1 and the number of angles.")
+            raise ValueError
+
+        sector = numpy.arange(angles) * sectors // angles
+        labels = sector[:, numpy.newaxis] * radii + numpy.arange(radii)
+        statistics = segmented_statistics(
+            self.radial_data,
+            labels,
+            sectors * radii,
+            percentiles,
+            clip_sigma,
+            clip_iterations,
+        )
+        shape = (sectors, radii) if sectors > 1 else (radii,)
+        return {name: value.reshape(shape) for name, value in statistics.items()}
+
+    @staticmethod
+    def compute_average_batch(radial_data: numpy.ndarray) -> numpy.ndarray:
+        """
+        Computes average value for each radius across all angles, for a stack of
+        polar images at once.
+
+        Parameters:
+            radial_data (numpy.ndarray): (N, angles, radii) stack of polar images
+
+        Returns:
+            numpy.ndarray: (N, radii) average radial values, NaN where a radius
+            has no valid samples
+        """
+        if radial_data.ndim != 3 or radial_data.shape[-2] == 0:
+            print("Radial data must have one or more angles in its rows.")
+            raise ValueError
+
+        with warnings.catch_warnings():
+            # Radii outside a galaxy are all NaN, which is expected here
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return numpy.nanmean(radial_data, axis=-2)
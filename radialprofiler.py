@@ -0,0 +1,206 @@
+from galaxyimage import GalaxyImage
+from radialaverager import CLIP_ITERATIONS, CLIP_SIGMA, segmented_statistics
+
+from typing import Iterable
+import functools
+import numpy
+
+
+@functools.lru_cache(maxsize=32)
+def _radius_labels(height: int, width: int, num_radii: int) -> numpy.ndarray:
+    """
+    Labels every pixel of an image with the radial bin it falls in.
+
+    Parameters:
+        height (int): image height in pixels
+        width (int): image width in pixels
+        num_radii (int): number of radial bins between the center and max_radius
+
+    Returns:
+        numpy.ndarray: read-only flat array of bin labels, where pixels at or past
+        max_radius are labelled num_radii so they can be dropped after binning
+    """
+    center_x = width // 2
+    center_y = height // 2
+    max_radius = min(center_x, center_y)
+
+    y = numpy.arange(height)[:, numpy.newaxis] - center_y
+    x = numpy.arange(width)[numpy.newaxis, :] - center_x
+    distance = numpy.sqrt(x**2 + y**2)
+
+    if max_radius == 0:
+        # Images under 2 pixels on a side have no radius to bin on
+        labels = numpy.full(distance.shape, num_radii, dtype=numpy.intp)
+    else:
+        labels = (distance * (num_radii / max_radius)).astype(numpy.intp)
+        labels[distance >= max_radius] = num_radii
+    labels = labels.ravel()
+    labels.flags.writeable = False
+    return labels
+
+
+@functools.lru_cache(maxsize=32)
+def _sector_labels(height: int, width: int, sectors: int) -> numpy.ndarray:
+    """
+    Labels every pixel of an image with the angular sector it falls in, with angles
+    measured as GalaxyUnwinder does, so sector k here is sector k of a polar image.
+
+    Parameters:
+        height (int): image height in pixels
+        width (int): image width in pixels
+        sectors (int): number of equal angular wedges
+
+    Returns:
+        numpy.ndarray: read-only flat array of sector labels, from 0 to sectors - 1
+    """
+    y = numpy.arange(height)[:, numpy.newaxis] - height // 2
+    x = numpy.arange(width)[numpy.newaxis, :] - width // 2
+    angle = numpy.mod(numpy.arctan2(y, x), 2 * numpy.pi)
+
+    labels = numpy.minimum(
+        (angle * (sectors / (2 * numpy.pi))).astype(numpy.intp), sectors - 1
+    )
+    labels = labels.ravel()
+    labels.flags.writeable = False
+    return labels
+
+
+class RadialProfiler:
+    """
+    RadialProfiler
+
+    Computes average value for each radius directly from a Cartesian image,
+    by binning every pixel on its distance from the center. This replaces
+    unwinding with GalaxyUnwinder and averaging with RadialAverager, without
+    building the polar image in between.
+
+    Attributes:
+        image (GalaxyImage): image to profile, NaN where there is no data
+        max_radius (int): inscribed circle radius, pixels beyond it are ignored
+    """
+
+    def __init__(self, image: GalaxyImage) -> None:
+        self.image: GalaxyImage = image
+        self.max_radius: int = min(image.shape[0] // 2, image.shape[1] // 2)
+
+    def compute_profile(self, num_radii: int = None) -> list[float]:
+        """
+        Computes average value for each radius across every valid pixel.
+
+        Parameters:
+            num_radii (int, optional): number of radial bins. If None, uses one
+                bin per pixel of radius (self.max_radius).
+
+        Returns:
+            list[float]: Average radial values for each position.
+        """
+        if num_radii is None:
+            num_radii = self.max_radius
+
+        height, width = self.image.shape
+        labels = _radius_labels(height, width, num_radii)
+        data = self.image.data.ravel()
+
+        valid = ~numpy.isnan(data)
+        labels = labels[valid]
+        sums = numpy.bincount(labels, weights=data[valid], minlength=num_radii + 1)
+        counts = numpy.bincount(labels, minlength=num_radii + 1)
+
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            profile = sums[:num_radii] / counts[:num_radii]
+
+        return [float(x) for x in profile]
+
+    def compute_statistics(
+        self,
+        num_radii: int = None,
+        percentiles: Iterable[float] = (),
+        sectors: int = 1,
+        clip_sigma: float = CLIP_SIGMA,
+        clip_iterations: int = CLIP_ITERATIONS,
+    ) -> dict[str, numpy.ndarray]:
+        """
+        Computes robust statistics for each radius across every valid pixel, in
+        one pass, as RadialAverager.compute_statistics does for polar images.
+
+        Parameters:
+            num_radii (int, optional): number of radial bins. If None, uses one
+                bin per pixel of radius (self.max_radius).
+            percentiles (Iterable[float]): percentiles to compute, 0 to 100
+            sectors (int): number of equal angular wedges to profile separately
+            clip_sigma (float): values further than this many standard deviations
+                from the median of their radius are clipped
+            clip_iterations (int): most rounds of clipping
+
+        Returns:
+            dict[str, numpy.ndarray]: statistics named as by segmented_statistics,
+            each of shape (num_radii,), or (sectors, num_radii) with more than one
+            sector
+        """
+        if num_radii is None:
+            num_radii = self.max_radius
+        if sectors < 1:
+            print("Sectors must number one or more.")
+            raise ValueError
+
+        height, width = self.image.shape
+        labels = _radius_labels(height, width, num_radii)
+        if sectors > 1:
+            # Pixels past max_radius land past the last sector, so they are dropped
+            labels = numpy.where(
+                labels < num_radii,
+                _sector_labels(height, width, sectors) * num_radii + labels,
+                sectors * num_radii,
+            )
+
+        statistics = segmented_statistics(
+            self.image.data,
+            labels,
+            sectors * num_radii,
+            percentiles,
+            clip_sigma,
+            clip_iterations,
+        )
+        shape = (sectors, num_radii) if sectors > 1 else (num_radii,)
+        return {name: value.reshape(shape) for name, value in statistics.items()}
+
+    @staticmethod
+    def compute_profile_batch(
+        images: numpy.ndarray, radii: numpy.ndarray
+    ) -> numpy.ndarray:
+        """
+        Computes the radial profile of a stack of galaxy crops in one bincount,
+        each galaxy binned out to its own radius.
+
+        Parameters:
+            images (numpy.ndarray): (N, height, width) stack of crops, each with its
+                galaxy at the crop center and NaN where there is no data
+            radii (numpy.ndarray): (N,) radius of each galaxy, at most the inscribed
+                circle radius of the crops
+
+        Returns:
+            numpy.ndarray: (N, max_radius) average radial values, with one bin per
+            pixel of radius, NaN past each galaxy's radius
+        """
+        count, height, width = images.shape
+        max_radius = min(height // 2, width // 2)
+        labels = _radius_labels(height, width, max_radius)
+
+        # Bins past a galaxy's own radius go to its overflow bin, then every galaxy
+        # gets its own block of max_radius + 1 bins
+        labels = (
+            numpy.where(labels < radii[:, numpy.newaxis], labels, max_radius)
+            + (numpy.arange(count) * (max_radius + 1))[:, numpy.newaxis]
+        )
+
+        data = images.reshape(count, -1)
+        valid = ~numpy.isnan(data)
+        labels = labels[valid]
+        num_bins = count * (max_radius + 1)
+        sums = numpy.bincount(labels, weights=data[valid], minlength=num_bins)
+        counts = numpy.bincount(labels, minlength=num_bins)
+
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            profiles = sums / counts
+
+        return profiles.reshape(count, max_radius + 1)[:, :max_radius]
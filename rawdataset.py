@@ -0,0 +1,222 @@
+#!/usr/bin/python
+
+from galaxycatalog import dataset_fingerprint
+
+from typing import Any, Iterable
+import argparse
+import h5py
+import json
+import numpy
+import os
+import sys
+
+"""
+rawdataset.py
+
+Exports a subset of Galaxy10 DECaLS, by default the unbarred spirals, into an
+uncompressed, band-planar raw file that is memory-mapped instead of read:
+
+    ./rawdataset.py dataset/Dataset.h5 dataset/spirals.raw
+    ./galaxy_temp.py --dataset dataset/spirals.raw
+
+Each band of each galaxy is one contiguous plane of the file, so a band is a view of
+the page cache rather than a decompressed copy, and every worker process mapping the
+file shares one physical copy of it. Galaxies keep their Galaxy10 numbers.
+"""
+
+# The header sits next to the raw file, and is written last so it marks a
+# complete export
+HEADER_SUFFIX = ".json"
+
+# Number of source galaxies read at once while exporting
+EXPORT_CHUNK_SIZE = 256
+
+
+class RawDataset:
+    """
+    RawDataset
+
+    Memory-mapped (N, bands, height, width) export of a subset of a data set, with a
+    JSON header recording the data set it came from and the Galaxy10 number and class
+    of each of its galaxies.
+
+    Attributes:
+        path (str): path of the raw file
+        images (numpy.ndarray): (N, bands, height, width) read-only view of the file
+        galaxy_numbers (numpy.ndarray): sorted Galaxy10 number of each row
+        classes (numpy.ndarray): Galaxy10 class of each row
+        source_count (int): number of galaxies in the data set exported from
+        header (dict[str, Any]): everything recorded in the header
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Maps an exported data set.
+
+        Parameters:
+            path (str): path of the raw file
+        """
+        with open(path + HEADER_SUFFIX) as file:
+            self.header: dict[str, Any] = json.load(file)
+        self.path: str = path
+        self.galaxy_numbers: numpy.ndarray = numpy.asarray(
+            self.header["galaxy_numbers"], dtype="int64"
+        )
+        self.classes: numpy.ndarray = numpy.asarray(
+            self.header["classes"], dtype="int64"
+        )
+        self.source_count: int = self.header["source_count"]
+
+        shape = tuple(self.header["shape"])
+        if shape[0] == 0:
+            # numpy can't map an empty file
+            self.images: numpy.ndarray = numpy.empty(shape, self.header["dtype"])
+        else:
+            # A plain view, so slices of it don't carry the memmap subclass around
+            self.images = numpy.memmap(
+                path, dtype=self.header["dtype"], mode="r", shape=shape
+            ).view(numpy.ndarray)
+
+    @staticmethod
+    def is_raw(path: str) -> bool:
+        """
+        Tells whether a path is a complete raw export, rather than e.g. an HDF5 file.
+
+        Parameters:
+            path (str): path of a data set
+
+        Returns:
+            bool: True if the export's header exists
+        """
+        return os.path.exists(path + HEADER_SUFFIX)
+
+    @property
+    def filename(self) -> str:
+        """
+        Gets the path of the raw file, as h5py.File.filename would.
+
+        Returns:
+            str: path of the raw file
+        """
+        return self.path
+
+    def row(self, galaxy_number: int) -> int:
+        """
+        Finds where a galaxy is stored.
+
+        Parameters:
+            galaxy_number (int): Galaxy10 number of the galaxy
+
+        Returns:
+            int: row of the galaxy in images
+        """
+        row = int(numpy.searchsorted(self.galaxy_numbers, galaxy_number))
+        if row == len(self.galaxy_numbers) or self.galaxy_numbers[row] != galaxy_number:
+            raise KeyError(f"Galaxy {galaxy_number} is not in {self.path}")
+        return row
+
+    def rows(self, galaxy_numbers: Iterable[int]) -> numpy.ndarray:
+        """
+        Finds where many galaxies are stored.
+
+        Parameters:
+            galaxy_numbers (Iterable[int]): Galaxy10 numbers of the galaxies
+
+        Returns:
+            numpy.ndarray: row of each galaxy in images, in the order given
+        """
+        return numpy.array([self.row(int(n)) for n in galaxy_numbers], dtype="int64")
+
+    def close(self) -> None:
+        """
+        Drops this dataset's reference to the mapping, which is unmapped once no
+        views of it are left.
+        """
+        self.images = numpy.empty((0, *self.images.shape[1:]), self.images.dtype)
+
+    @classmethod
+    def export(
+        cls, source_path: str, path: str, classes: Iterable[int] = (6, 7)
+    ) -> "RawDataset":
+        """
+        Writes the galaxies of the given classes from a Galaxy10 HDF5 file into a raw
+        file, replacing any previous export atomically.
+
+        Parameters:
+            source_path (str): Galaxy10 HDF5 file to export from
+            path (str): raw file to write, with its header at path + HEADER_SUFFIX
+            classes (Iterable[int]): Galaxy10 classes to export
+
+        Returns:
+            RawDataset: the export, mapped
+        """
+        with h5py.File(source_path, "r") as source:
+            images = source["images"]
+            labels = numpy.asarray(source["ans"][:], dtype="int64")
+            galaxy_numbers = numpy.flatnonzero(numpy.isin(labels, list(classes)))
+            source_count, height, width, bands = images.shape
+            shape = (len(galaxy_numbers), bands, height, width)
+
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as file:
+                # Whole blocks are read, so each compressed chunk is decoded once
+                for start in range(0, source_count, EXPORT_CHUNK_SIZE):
+                    stop = start + EXPORT_CHUNK_SIZE
+                    selected = galaxy_numbers[
+                        (galaxy_numbers >= start) & (galaxy_numbers < stop)
+                    ]
+                    if len(selected) == 0:
+                        continue
+                    block = images[start:stop][selected - start]
+                    # (N, height, width, bands) to contiguous band planes
+                    file.write(numpy.ascontiguousarray(block.transpose(0, 3, 1, 2)))
+                file.flush()
+                os.fsync(file.fileno())
+            dtype = images.dtype.str
+
+        header = {
+            "source": os.path.abspath(source_path),
+            "source_fingerprint": dataset_fingerprint(source_path).tolist(),
+            "source_count": source_count,
+            "shape": list(shape),
+            "dtype": dtype,
+            "galaxy_numbers": galaxy_numbers.tolist(),
+            "classes": labels[galaxy_numbers].tolist(),
+        }
+
+        # Without a header the raw file is never taken for a complete export
+        if os.path.exists(path + HEADER_SUFFIX):
+            os.remove(path + HEADER_SUFFIX)
+        os.replace(temporary_path, path)
+        temporary_header = f"{path}{HEADER_SUFFIX}.{os.getpid()}.tmp"
+        with open(temporary_header, "w") as file:
+            json.dump(header, file)
+        os.replace(temporary_header, path + HEADER_SUFFIX)
+        return cls(path)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Export Galaxy10 DECaLS galaxies to a memory-mappable raw file."
+    )
+    parser.add_argument("source", help="Galaxy10 HDF5 file to export from")
+    parser.add_argument("path", help="raw file to write")
+    parser.add_argument(
+        "--classes",
+        type=int,
+        nargs="+",
+        default=[6, 7],
+        help="Galaxy10 classes to export (default: unbarred spirals)",
+    )
+    args = parser.parse_args(argv)
+
+    dataset = RawDataset.export(args.source, args.path, args.classes)
+    print(
+        f"Exported {len(dataset.galaxy_numbers)} galaxies "
+        f"({dataset.images.nbytes / 2**20:.0f} MB) to {args.path}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+from typing import Any, Iterable
+import json
+import numpy
+import os
+
+
+class RunManifest:
+    """
+    RunManifest
+
+    Checkpoint of a run over many galaxies, so an interrupted run can be resumed
+    without redoing the galaxies it already finished.
+
+    The manifest is a JSON lines file. Its first line records the parameters of the
+    run and every galaxy it selected, and each following line records a batch of
+    galaxies that completed or failed. Batches are appended with a single write, so
+    a crash can at worst leave a torn last line, which is ignored when loading.
+    Galaxies in the selection with no record yet are in progress.
+
+    Attributes:
+        path (str): path of the manifest file
+        params (dict[str, Any]): parameters of the run
+        galaxy_numbers (numpy.ndarray): sorted galaxies selected for the run
+        completed (set[int]): galaxies processed successfully
+        failures (dict[int, int]): number of failed attempts of each galaxy that
+            has not completed
+        errors (dict[int, str]): last error of each galaxy in failures
+    """
+
+    def __init__(
+        self, path: str, params: dict[str, Any], galaxy_numbers: Iterable[int]
+    ) -> None:
+        self.path: str = path
+        self.params: dict[str, Any] = params
+        self.galaxy_numbers: numpy.ndarray = numpy.sort(
+            numpy.asarray(list(galaxy_numbers), dtype="int64")
+        )
+        self.completed: set[int] = set()
+        self.failures: dict[int, int] = {}
+        self.errors: dict[int, str] = {}
+        self._pending_records: list[tuple[int, str | None]] = []
+
+    @classmethod
+    def create(
+        cls, path: str, params: dict[str, Any], galaxy_numbers: Iterable[int]
+    ) -> "RunManifest":
+        """
+        Starts the manifest of a new run, replacing any previous one atomically.
+
+        Parameters:
+            path (str): path of the manifest file
+            params (dict[str, Any]): JSON-compatible parameters of the run
+            galaxy_numbers (Iterable[int]): galaxies selected for the run
+
+        Returns:
+            RunManifest: manifest with every galaxy in progress
+        """
+        manifest = cls(path, params, galaxy_numbers)
+        header = {"params": params, "galaxies": manifest.galaxy_numbers.tolist()}
+
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as file:
+            file.write(json.dumps(header) + "\n")
+        os.replace(temporary_path, path)
+        return manifest
+
+    @classmethod
+    def load(cls, path: str) -> "RunManifest":
+        """
+        Loads the manifest of an earlier, possibly interrupted, run.
+
+        Parameters:
+            path (str): path of the manifest file
+
+        Returns:
+            RunManifest: manifest as of the last complete record
+        """
+        with open(path) as file:
+            text = file.read()
+        if not text.endswith("\n"):
+            # End a torn last line, so records appended after it stay readable
+            with open(path, "a") as file:
+                file.write("\n")
+        lines = text.split("\n")
+
+        header = json.loads(lines[0])
+        manifest = cls(path, header["params"], header["galaxies"])
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Empty, or torn by a crash while it was being written
+                continue
+            for galaxy_number in record.get("completed", []):
+                manifest._apply(galaxy_number, None)
+            for galaxy_number, error in record.get("failed", []):
+                manifest._apply(galaxy_number, error)
+        return manifest
+
+    def _apply(self, galaxy_number: int, error: str | None) -> None:
+        if error is None:
+            self.completed.add(galaxy_number)
+            self.failures.pop(galaxy_number, None)
+            self.errors.pop(galaxy_number, None)
+        elif galaxy_number not in self.completed:
+            self.failures[galaxy_number] = self.failures.get(galaxy_number, 0) + 1
+            self.errors[galaxy_number] = error
+
+    @property
+    def in_progress(self) -> list[int]:
+        """
+        Galaxies of the run that have neither completed nor failed yet.
+        """
+        return [
+            int(n)
+            for n in self.galaxy_numbers
+            if n not in self.completed and n not in self.failures
+        ]
+
+    def pending(self, max_attempts: int = 3) -> list[int]:
+        """
+        Gets the galaxies still to be processed when resuming the run.
+
+        Parameters:
+            max_attempts (int): galaxies that failed this many times are given up on
+
+        Returns:
+            list[int]: sorted galaxies that are in progress or can be retried
+        """
+        return [
+            int(n)
+            for n in self.galaxy_numbers
+            if n not in self.completed and self.failures.get(n, 0) < max_attempts
+        ]
+
+    def record_completed(self, galaxy_number: int) -> None:
+        """
+        Marks a galaxy as processed successfully, once the manifest is next flushed.
+
+        Parameters:
+            galaxy_number (int): index of the galaxy in the data set
+        """
+        self._pending_records.append((int(galaxy_number), None))
+
+    def record_failed(self, galaxy_number: int, error: str) -> None:
+        """
+        Marks an attempt at a galaxy as failed, once the manifest is next flushed.
+
+        Parameters:
+            galaxy_number (int): index of the galaxy in the data set
+            error (str): why the galaxy failed
+        """
+        self._pending_records.append((int(galaxy_number), error))
+
+    def flush(self) -> None:
+        """
+        Appends every recorded result to the manifest file as one line.
+        """
+        if not self._pending_records:
+            return
+
+        record = {
+            "completed": [n for n, error in self._pending_records if error is None],
+            "failed": [
+                [n, error] for n, error in self._pending_records if error is not None
+            ],
+        }
+        with open(self.path, "a") as file:
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+        for galaxy_number, error in self._pending_records:
+            self._apply(galaxy_number, error)
+        self._pending_records.clear()
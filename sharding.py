@@ -0,0 +1,314 @@
+#!/usr/bin/python
+
+from galaxylocation import GalaxyLocation
+from populationstatistics import PopulationStatistics
+from profilestore import ProfileStore
+
+from typing import Any, Iterable
+import argparse
+import numpy
+import os
+import sys
+
+"""
+sharding.py
+
+Splits a run over many galaxies into shards that run independently, e.g. one per
+cluster node, and merges the profile stores the shards write back into one.
+
+Every shard selects the same galaxies from the catalog (so shards must share --seed
+unless every galaxy is processed), then keeps its own contiguous slice of them:
+
+    ./galaxy_temp.py --count 0 --shard 0/4   # on each node, 0/4 to 3/4
+    ./sharding.py merge output/profiles.h5 output/profiles.shard-*-of-4.h5
+    ./sharding.py merge-population output/population.npz \
+        output/population.shard-*-of-4.npz
+
+Merging checks that every shard is there exactly once, that the shards ran with the
+same parameters, and that every selected galaxy was stored by exactly one shard.
+"""
+
+# Run parameters allowed to differ between the shards of one run. Nodes may keep
+# the data set at different paths, so it is only compared by fingerprint.
+SHARD_PARAMS = ("shard", "galaxies", "dataset")
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    """
+    Parses a shard given as "i/n", the i-th of n shards counting from 0.
+
+    Parameters:
+        text (str): the shard, e.g. "0/4"
+
+    Returns:
+        tuple[int, int]: index of the shard and number of shards
+    """
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must be i/n, not {text!r}") from None
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..{count - 1}")
+    return index, count
+
+
+def shard_path(path: str, shard: tuple[int, int] | None) -> str:
+    """
+    Gives each shard its own output file, next to where an unsharded run writes.
+
+    Parameters:
+        path (str): output file of an unsharded run
+        shard (tuple[int, int], optional): index of the shard and number of shards
+
+    Returns:
+        str: e.g. output/profiles.shard-0-of-4.h5, or path itself without a shard
+    """
+    if shard is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{extension}"
+
+
+def shard_galaxies(
+    galaxy_numbers: Iterable[int], shard_index: int, shard_count: int
+) -> numpy.ndarray:
+    """
+    Picks one shard of a selection of galaxies.
+
+    The sorted galaxies are split into shard_count contiguous slices whose sizes
+    differ by at most one, so shards are balanced, every shard is the same whatever
+    order the galaxies came in, and each shard reads as few HDF5 chunks as possible.
+
+    Parameters:
+        galaxy_numbers (Iterable[int]): galaxies selected for the whole run
+        shard_index (int): which shard to keep, from 0
+        shard_count (int): number of shards
+
+    Returns:
+        numpy.ndarray: sorted galaxies of the shard
+    """
+    if not 0 <= shard_index < shard_count:
+        print(
+            f"Error: Shard {shard_index} doesn't exist in {shard_count} shards.",
+            file=sys.stderr,
+        )
+        raise ValueError
+    galaxy_numbers = numpy.sort(numpy.asarray(list(galaxy_numbers), dtype="int64"))
+    return numpy.array_split(galaxy_numbers, shard_count)[shard_index]
+
+
+class ShardCheck:
+    """
+    ShardCheck
+
+    What merging a set of shard stores would find wrong with them.
+
+    Attributes:
+        shards (dict[int, str]): path of each shard's store, by shard index
+        shard_count (int | None): number of shards of the run
+        expected (set[int]): galaxies the shards were given
+        owner (dict[int, str]): path of the store holding each stored galaxy
+        problems (list[str]): inconsistencies that make the shards unmergeable
+        duplicates (set[int]): galaxies stored by more than one shard
+    """
+
+    def __init__(self) -> None:
+        self.shards: dict[int, str] = {}
+        self.shard_count: int | None = None
+        self.expected: set[int] = set()
+        self.owner: dict[int, str] = {}
+        self.problems: list[str] = []
+        self.duplicates: set[int] = set()
+        self._params: dict[str, Any] | None = None
+
+    @property
+    def missing(self) -> list[int]:
+        """
+        Gets the galaxies a shard was given but no shard stored, e.g. because
+        they failed.
+
+        Returns:
+            list[int]: sorted galaxy numbers
+        """
+        return sorted(self.expected - self.owner.keys())
+
+    def add(self, path: str, store: ProfileStore) -> None:
+        """
+        Checks one shard's store against the shards added before it.
+
+        Parameters:
+            path (str): path of the store
+            store (ProfileStore): the store, open for reading
+        """
+        shard_indices = set()
+        for params in store.runs():
+            if params.get("shard") is None:
+                self.problems.append(f"{path} was not written by a sharded run")
+                return
+            shard_index, shard_count = params["shard"]
+            shard_indices.add(shard_index)
+
+            if self.shard_count is None:
+                self.shard_count = shard_count
+            elif shard_count != self.shard_count:
+                self.problems.append(
+                    f"{path} is a shard of {shard_count}, not {self.shard_count}"
+                )
+
+            run_params = {
+                key: value for key, value in params.items() if key not in SHARD_PARAMS
+            }
+            if self._params is None:
+                self._params = run_params
+            elif run_params != self._params:
+                self.problems.append(
+                    f"{path} ran with different parameters from the other shards"
+                )
+            self.expected.update(params.get("galaxies", []))
+
+        if len(shard_indices) != 1:
+            self.problems.append(f"{path} holds shards {sorted(shard_indices)}")
+            return
+        shard_index = shard_indices.pop()
+        if shard_index in self.shards:
+            self.problems.append(
+                f"shard {shard_index} is in both {self.shards[shard_index]} and {path}"
+            )
+        self.shards[shard_index] = path
+
+        for galaxy_number in store.galaxy_numbers().tolist():
+            if galaxy_number in self.owner:
+                self.duplicates.add(galaxy_number)
+            else:
+                self.owner[galaxy_number] = path
+
+    def finish(self) -> None:
+        """
+        Checks that no shard is missing, once every store has been added.
+        """
+        if self.shard_count is None:
+            return
+        absent = sorted(set(range(self.shard_count)) - self.shards.keys())
+        if absent:
+            self.problems.append(f"shards {absent} of {self.shard_count} are missing")
+
+
+def merge_shards(
+    output_path: str, shard_paths: Iterable[str], allow_missing: bool = False
+) -> ShardCheck:
+    """
+    Merges the profile stores of every shard of a run into one store.
+
+    Nothing is written if the shards are inconsistent, a galaxy was stored by more
+    than one shard, or, unless allow_missing, a galaxy was stored by none.
+
+    Parameters:
+        output_path (str): store to write, replaced atomically
+        shard_paths (Iterable[str]): stores written by the shards
+        allow_missing (bool): merge even if some galaxies weren't stored
+
+    Returns:
+        ShardCheck: what was checked, with any problems found
+    """
+    check = ShardCheck()
+    for path in shard_paths:
+        with ProfileStore(path, "r") as store:
+            check.add(path, store)
+    check.finish()
+    if check.problems or check.duplicates or (check.missing and not allow_missing):
+        return check
+
+    temporary_path = f"{output_path}.{os.getpid()}.tmp"
+    with ProfileStore(temporary_path, "w") as merged:
+        for shard_index in sorted(check.shards):
+            with ProfileStore(check.shards[shard_index], "r") as store:
+                runs = [merged.begin_run(params) for params in store.runs()]
+                rows = store.read()
+                for (
+                    galaxy_number,
+                    run,
+                    (center_x, center_y),
+                    radius,
+                    length,
+                    profile,
+                ) in zip(
+                    rows["galaxy_number"].tolist(),
+                    rows["run"].tolist(),
+                    rows["center"].tolist(),
+                    rows["radius"].tolist(),
+                    rows["length"].tolist(),
+                    rows["profile"],
+                ):
+                    merged.append(
+                        galaxy_number,
+                        GalaxyLocation((center_x, center_y), radius),
+                        profile[:length].tolist(),
+                        run=runs[run],
+                    )
+    os.replace(temporary_path, output_path)
+    return check
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Work with the shards of a run split with galaxy_temp.py --shard."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    merge = commands.add_parser(
+        "merge", help="merge the profile stores of every shard into one"
+    )
+    merge.add_argument("output", help="profile store to write")
+    merge.add_argument("shards", nargs="+", help="profile stores of the shards")
+    merge.add_argument(
+        "--allow-missing",
+        action="store_true",
+        help="merge even if some galaxies, e.g. failed ones, were stored by no shard",
+    )
+    merge_population = commands.add_parser(
+        "merge-population",
+        help="merge the population statistics of every shard, and plot them",
+    )
+    merge_population.add_argument("output", help="statistics to write")
+    merge_population.add_argument(
+        "shards", nargs="+", help="population statistics of the shards"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "merge-population":
+        population = PopulationStatistics()
+        for path in args.shards:
+            population.merge(PopulationStatistics.load(path))
+        population.save(args.output)
+        population.render(os.path.splitext(args.output)[0] + ".png")
+        print(f"Merged {len(args.shards)} shards into {args.output}")
+        return 0
+
+    check = merge_shards(args.output, args.shards, args.allow_missing)
+    for problem in check.problems:
+        print(f"Error: {problem}", file=sys.stderr)
+    if check.duplicates:
+        print(
+            f"Error: {len(check.duplicates)} galaxies were stored by more than one "
+            f"shard: {sorted(check.duplicates)[:20]}",
+            file=sys.stderr,
+        )
+    if check.missing:
+        print(
+            f"{'Warning' if args.allow_missing else 'Error'}: "
+            f"{len(check.missing)} galaxies were stored by no shard: "
+            f"{check.missing[:20]}",
+            file=sys.stderr,
+        )
+    if check.problems or check.duplicates or (check.missing and not args.allow_missing):
+        print("Nothing was merged.", file=sys.stderr)
+        return 1
+
+    print(
+        f"Merged {len(check.owner)} galaxies from {len(check.shards)} shards "
+        f"into {args.output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+from galaxylocation import GalaxyLocation
+
+from types import ModuleType
+from typing import Any, Callable, Iterable
+import functools
+import hashlib
+import inspect
+import json
+import numpy
+import os
+import photutils
+
+
+@functools.lru_cache(maxsize=None)
+def _source_hash(module: ModuleType) -> str:
+    """
+    Hashes the source code of a module, so cached results go stale when it changes,
+    along with the versions of the libraries every stage computes with.
+
+    Parameters:
+        module (ModuleType): module that computes a stage
+
+    Returns:
+        str: hex digest of the module's source and the library versions
+    """
+    digest = hashlib.sha256(inspect.getsource(module).encode())
+    digest.update(f"numpy {numpy.__version__}".encode())
+    digest.update(f"photutils {photutils.__version__}".encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    StageCache
+
+    Content-addressed on-disk cache of pipeline stage outputs, so reruns only
+    recompute the stages whose inputs, parameters or code changed.
+
+    Each result is stored under a hash of the stage name, its parameters, its inputs
+    (array bytes, or e.g. a galaxy number and data set fingerprint) and the source
+    code of the modules that compute it. Arrays are stored as compressed .npz files
+    and GalaxyLocations as small .json records. Once the cache grows past max_bytes,
+    the least recently used results are evicted.
+
+    Attributes:
+        path (str): directory the results are stored in
+        max_bytes (int): size the cache is trimmed back under
+    """
+
+    # How many results are stored between checks of the size of the cache on disk
+    EVICTION_INTERVAL = 64
+
+    def __init__(self, path: str = "cache/stages", max_bytes: int = 2**30) -> None:
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self._stores_since_eviction: int = 0
+
+    def key(
+        self,
+        stage: str,
+        params: dict[str, Any],
+        inputs: Iterable[Any],
+        code: Iterable[ModuleType] = (),
+    ) -> str:
+        """
+        Computes the address of a stage result.
+
+        Parameters:
+            stage (str): name of the stage
+            params (dict[str, Any]): parameters of the stage, as JSON-compatible values
+            inputs (Iterable[Any]): arrays, numbers or strings the result depends on
+            code (Iterable[ModuleType]): modules whose source computes the result
+
+        Returns:
+            str: hex digest identifying the result
+        """
+        digest = hashlib.sha256()
+        digest.update(stage.encode())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        for value in inputs:
+            if isinstance(value, numpy.ndarray):
+                digest.update(f"{value.dtype.str}{value.shape}".encode())
+                digest.update(numpy.ascontiguousarray(value).data)
+            else:
+                digest.update(repr(value).encode())
+        for module in code:
+            digest.update(_source_hash(module).encode())
+        return digest.hexdigest()
+
+    def _file(self, stage: str, key: str, extension: str) -> str:
+        return os.path.join(self.path, stage, key[:2], f"{key}{extension}")
+
+    def get(self, stage: str, key: str) -> numpy.ndarray | GalaxyLocation | None:
+        """
+        Loads a stored stage result.
+
+        Parameters:
+            stage (str): name of the stage
+            key (str): address from key()
+
+        Returns:
+            numpy.ndarray | GalaxyLocation | None: the stored result, or None if there
+            is none
+        """
+        array_file = self._file(stage, key, ".npz")
+        location_file = self._file(stage, key, ".json")
+        try:
+            if os.path.exists(array_file):
+                with numpy.load(array_file) as stored:
+                    value = stored["value"]
+                os.utime(array_file)
+                return value
+            if os.path.exists(location_file):
+                with open(location_file) as stored:
+                    record = json.load(stored)
+                os.utime(location_file)
+                return GalaxyLocation(tuple(record["center"]), record["radius"])
+        except (OSError, ValueError, KeyError):
+            # Evicted by another process, or left half-written by a crash
+            return None
+        return None
+
+    def put(self, stage: str, key: str, value: numpy.ndarray | GalaxyLocation) -> None:
+        """
+        Stores a stage result, atomically so concurrent workers never read half of it.
+
+        Parameters:
+            stage (str): name of the stage
+            key (str): address from key()
+            value (numpy.ndarray | GalaxyLocation): result to store
+        """
+        if isinstance(value, GalaxyLocation):
+            file = self._file(stage, key, ".json")
+        else:
+            file = self._file(stage, key, ".npz")
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+
+        temporary_file = f"{file}.{os.getpid()}.tmp"
+        with open(temporary_file, "wb") as stored:
+            if isinstance(value, GalaxyLocation):
+                record = {
+                    "center": [int(x) for x in value.center],
+                    "radius": int(value.radius),
+                }
+                stored.write(json.dumps(record).encode())
+            else:
+                numpy.savez_compressed(stored, value=value)
+        os.replace(temporary_file, file)
+
+        self._stores_since_eviction += 1
+        if self._stores_since_eviction >= self.EVICTION_INTERVAL:
+            self.evict()
+
+    def get_or_compute(
+        self,
+        stage: str,
+        params: dict[str, Any],
+        inputs: Iterable[Any],
+        code: Iterable[ModuleType],
+        compute: Callable[[], numpy.ndarray | GalaxyLocation],
+    ) -> numpy.ndarray | GalaxyLocation:
+        """
+        Loads a stage result if it is cached, otherwise computes and stores it.
+
+        Parameters:
+            stage (str): name of the stage
+            params (dict[str, Any]): parameters of the stage
+            inputs (Iterable[Any]): values the result depends on
+            code (Iterable[ModuleType]): modules whose source computes the result
+            compute (Callable): computes the result when it isn't cached
+
+        Returns:
+            numpy.ndarray | GalaxyLocation: the stage result
+        """
+        key = self.key(stage, params, inputs, code)
+        value = self.get(stage, key)
+        if value is None:
+            value = compute()
+            self.put(stage, key, value)
+        return value
+
+    def evict(self) -> None:
+        """
+        Deletes the least recently used results until the cache is under max_bytes.
+        """
+        self._stores_since_eviction = 0
+
+        files = []
+        for directory, _, names in os.walk(self.path):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                file = os.path.join(directory, name)
+                try:
+                    status = os.stat(file)
+                except OSError:
+                    continue
+                files.append((status.st_mtime_ns, status.st_size, file))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, file in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(file)
+            except OSError:
+                continue
+            total -= size
@@ -1,7 +1,9 @@
 from galaxyimage import GalaxyImage
 from image import Image
+from precision import DEFAULT_PRECISION, float_dtype
 import numpy
-
+import os
+import sys
 
 # Central wavelengths for DECaLS filters in meters (converted from nm)
 LAMBDA_G = 477e-9
@@ -16,10 +18,17 @@ X_R = h * c / (LAMBDA_R * kB)
 
 GAMMA = 5 - 9 * (numpy.log(X_G / X_R) + 3) ** -0.252
 
+# The Galaxy10 DECaLS bands are 8-bit, so every (R, G) pair fits in a 256x256 table
+LOOKUP_TABLE_SIZE = 256
+LOOKUP_TABLE_PATH = "cache/temperature_table.npz"
+
+# Lookup tables already built or loaded in this process, keyed by filter set and dtype
+_lookup_tables: dict[tuple[tuple[float, float, float], str], numpy.ndarray] = {}
+
 
 class TemperatureCalculator:
     """
-        Computes pixel-wise blackbody temperature estimates (in Kelvin) from DECaLS R, G, and Z-band images
+        Computes pixel-wise blackbody temperature estimates (in Kelvin) from DECaLS R and G-band images
         using a generalized dual-logarithmic estimator adapted from the blackbody intensity ratio method.
 
         This estimator is more accurate across temperature ranges, especially at high temperatures,
@@ -28,40 +37,197 @@ class TemperatureCalculator:
     Uses https://iopscience.iop.org/article/10.1209/0295-5075/97/34008, specifically Eqs (9), (11), (13).
     """
 
+    # Images of the galaxy the calculator is given, see galaxyloader.required_bands.
+    # Only R and G enter the estimate, so the Z band is never read for it.
+    BANDS: tuple[str, ...] = ("R", "G")
+
     def __init__(
         self,
-        r_band_image: GalaxyImage,
-        g_band_image: GalaxyImage,
-        z_band_image: GalaxyImage,
+        r_band_image: GalaxyImage | None = None,
+        g_band_image: GalaxyImage | None = None,
+        z_band_image: GalaxyImage | None = None,
+        use_lookup_table: bool = False,
+        lookup_table_path: str = LOOKUP_TABLE_PATH,
+        dtype: str | numpy.dtype = DEFAULT_PRECISION,
     ) -> None:
+        """
+        Parameters:
+            r_band_image (GalaxyImage): R-band intensities
+            g_band_image (GalaxyImage): G-band intensities
+            z_band_image (GalaxyImage, optional): Z-band intensities, unused by the
+                estimate and kept for callers that pass it
+            use_lookup_table (bool): gather temperatures from a precomputed table of every
+                8-bit (R, G) pair instead of evaluating the logs per pixel
+            lookup_table_path (str): where the lookup table is cached on disk
+            dtype (str | numpy.dtype): float precision temperatures are computed in
+
+        The band images may be left out when only compute_temperature is used.
+        """
         self.r_band_image = r_band_image
         self.g_band_image = g_band_image
         self.z_band_image = z_band_image
+        self.use_lookup_table = use_lookup_table
+        self.lookup_table_path = lookup_table_path
+        self.dtype = float_dtype(dtype)
+
+    def _estimate_temperature(
+        self,
+        intensity_r: numpy.ndarray,
+        intensity_g: numpy.ndarray,
+        out: numpy.ndarray | None = None,
+    ) -> numpy.ndarray:
+        """
+        Estimates the temperature for whole arrays of R and G intensities at once.
 
-    def _estimate_temperature(self, intensity_r: float, intensity_g: float) -> float:
-        if intensity_r <= 0 or intensity_g <= 0:
-            return numpy.nan
+        Pixels with a non-positive intensity in either band, or a non-positive
+        temperature estimate, are set to NaN.
 
-        try:
-            tau = (X_G - X_R) / numpy.log(
-                intensity_r / intensity_g * (X_G / X_R) ** 3  # N = 4; N-1 -> 3
-            )
-            tau_prime = (X_G - X_R) / numpy.log(
-                intensity_r / intensity_g * (X_G / X_R) ** (4 - GAMMA)
+        Parameters:
+            intensity_r (numpy.ndarray): R-band intensities
+            intensity_g (numpy.ndarray): G-band intensities, same shape as intensity_r
+            out (numpy.ndarray, optional): buffer the temperatures are written into,
+                whose dtype sets the precision of the arithmetic
+
+        Returns:
+            numpy.ndarray: temperature estimate (Kelvin) for every pixel
+        """
+        intensity_r = numpy.asarray(intensity_r)
+        intensity_g = numpy.asarray(intensity_g)
+        if out is None:
+            out = numpy.empty(
+                numpy.broadcast_shapes(intensity_r.shape, intensity_g.shape),
+                dtype=self.dtype,
             )
-            T = (tau + tau_prime) / 2
-            return T if T > 0 else numpy.nan
-        except (ZeroDivisionError, FloatingPointError):
-            return numpy.nan
 
-    def compute_temperature_image(self) -> GalaxyImage:
-        height, width = self.r_band_image.shape
-        temp_array = numpy.zeros((height, width))
+        # NaN intensities compare False here, and end up NaN through the logs anyway
+        valid = (intensity_r > 0) & (intensity_g > 0)
+
+        with numpy.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            ratio = numpy.divide(intensity_r, intensity_g, dtype=out.dtype)
+            tau = (X_G - X_R) / numpy.log(ratio * (X_G / X_R) ** 3)  # N = 4; N-1 -> 3
+            # tau_prime is built up in the output buffer to save an allocation
+            numpy.log(ratio * (X_G / X_R) ** (4 - GAMMA), out=out)
+            numpy.divide(X_G - X_R, out, out=out)
+            out += tau
+            out /= 2
+            valid &= out > 0
+
+        out[~valid] = numpy.nan
+        return out
+
+    def compute_temperature_image(
+        self, out: numpy.ndarray | None = None
+    ) -> GalaxyImage:
+        """
+        Computes the temperature map of the whole R/G image in one pass.
 
-        for y in range(height):
-            for x in range(width):
-                r = self.r_band_image[y, x]
-                g = self.g_band_image[y, x]
-                temp_array[y, x] = self._estimate_temperature(r, g)
+        Parameters:
+            out (numpy.ndarray, optional): preallocated buffer with the same shape as the
+                band images, so batch runs can reuse one temperature map between galaxies
+
+        Returns:
+            GalaxyImage: temperature (Kelvin) of every pixel, NaN where it is undefined
+        """
+        if out is not None and out.shape != self.r_band_image.shape:
+            print("Error: Output buffer must match the image shape.", file=sys.stderr)
+            raise ValueError
+
+        temp_array = self.compute_temperature(
+            self.r_band_image.data, self.g_band_image.data, out
+        )
 
         return GalaxyImage(Image(temp_array))
+
+    def compute_temperature(
+        self,
+        intensity_r: numpy.ndarray,
+        intensity_g: numpy.ndarray,
+        out: numpy.ndarray | None = None,
+    ) -> numpy.ndarray:
+        """
+        Computes the temperature of arrays of R and G intensities of any shape,
+        such as a (N, height, width) stack of galaxies.
+
+        Parameters:
+            intensity_r (numpy.ndarray): R-band intensities
+            intensity_g (numpy.ndarray): G-band intensities, same shape as intensity_r
+            out (numpy.ndarray, optional): buffer the temperatures are written into,
+                whose dtype sets the precision instead of the calculator's
+
+        Returns:
+            numpy.ndarray: temperature (Kelvin) of every pixel, NaN where it is undefined
+        """
+        if self.use_lookup_table and self._fits_lookup_table(intensity_r, intensity_g):
+            # Flat index of each (R, G) pair in the table, then one gather
+            index = numpy.multiply(intensity_r, LOOKUP_TABLE_SIZE, dtype=numpy.intp)
+            index += intensity_g
+            table = self.lookup_table(None if out is None else out.dtype)
+            return numpy.take(table.ravel(), index, out=out)
+
+        return self._estimate_temperature(intensity_r, intensity_g, out)
+
+    @staticmethod
+    def _fits_lookup_table(
+        intensity_r: numpy.ndarray, intensity_g: numpy.ndarray
+    ) -> bool:
+        """
+        Checks whether both bands can be used as indices into the lookup table.
+
+        Returns:
+            bool: True if both bands are integer images with values in [0, 255]
+        """
+        for intensity in (intensity_r, intensity_g):
+            if not numpy.issubdtype(intensity.dtype, numpy.integer):
+                return False
+            if (
+                intensity.dtype != numpy.uint8
+                and intensity.size
+                and (intensity.min() < 0 or intensity.max() >= LOOKUP_TABLE_SIZE)
+            ):
+                return False
+        return True
+
+    def lookup_table(self, dtype: str | numpy.dtype | None = None) -> numpy.ndarray:
+        """
+        Gets the temperature of every 8-bit (R, G) pair for the current filter set.
+
+        The table is built once in float64, cached on disk at lookup_table_path, and
+        only reused from disk if it was built from the same LAMBDA_G, LAMBDA_R and GAMMA.
+        Lower precisions round the float64 table, so they gather the correctly
+        rounded temperature of every pair.
+
+        Parameters:
+            dtype (str | numpy.dtype, optional): float precision of the table, the
+                calculator's own if None
+
+        Returns:
+            numpy.ndarray: read-only (256, 256) table of dtype, indexed as table[r, g]
+        """
+        dtype = self.dtype if dtype is None else float_dtype(dtype)
+        constants = (LAMBDA_G, LAMBDA_R, GAMMA)
+        if (constants, dtype.str) in _lookup_tables:
+            return _lookup_tables[(constants, dtype.str)]
+
+        table = None
+        if os.path.exists(self.lookup_table_path):
+            with numpy.load(self.lookup_table_path) as cached:
+                if numpy.array_equal(cached["constants"], constants):
+                    table = cached["table"]
+
+        if table is None:
+            intensities = numpy.arange(LOOKUP_TABLE_SIZE)
+            table = self._estimate_temperature(
+                intensities[:, numpy.newaxis],
+                intensities[numpy.newaxis, :],
+                out=numpy.empty((LOOKUP_TABLE_SIZE, LOOKUP_TABLE_SIZE)),
+            )
+            # Write to a temporary file first so other processes never see half a table
+            os.makedirs(os.path.dirname(self.lookup_table_path) or ".", exist_ok=True)
+            temporary_path = f"{self.lookup_table_path}.{os.getpid()}.tmp.npz"
+            numpy.savez(temporary_path, table=table, constants=constants)
+            os.replace(temporary_path, self.lookup_table_path)
+
+        table = table.astype(dtype)
+        table.flags.writeable = False
+        _lookup_tables[(constants, dtype.str)] = table
+        return table
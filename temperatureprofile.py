@@ -1,5 +1,4 @@
-import matplotlib.pyplot as plt
-import numpy as np
+from profilerenderer import ProfileRenderer
 
 """
 TemperatureProfile
@@ -13,15 +12,17 @@ The y-axis shows effective temperature in Kelvin.
 The plot is saved as a .png image in the output directory.
 """
 
+# Every profile is drawn on the same figure, so plotting many galaxies doesn't
+# leave one open figure behind per galaxy.
+_renderer: ProfileRenderer | None = None
+
 
 class TemperatureProfile:
     def __init__(self, temperature_data: list[float]) -> None:
         self.temperature_data = temperature_data
 
     def plot_temperature(self, galaxy_number: int) -> None:
-        plt.figure(figsize=(8, 10))
-        plt.plot(np.linspace(0, 1, len(self.temperature_data)), self.temperature_data)
-        plt.xlabel("Radial Distance (Normalized to Galaxy Radius)")
-        plt.ylabel("Effective Temperature (Kelvin)")
-        plt.title(f"Temperature Profile of Galaxy #{galaxy_number}")
-        plt.savefig(f"output/{galaxy_number}.png")
+        global _renderer
+        if _renderer is None:
+            _renderer = ProfileRenderer("output")
+        _renderer.render(galaxy_number, self.temperature_data)
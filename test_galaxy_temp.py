@@ -0,0 +1,44 @@
+import galaxy_temp
+
+import os
+import pytest
+
+
+def _run(dataset: str, *options: str) -> int:
+    return galaxy_temp.main(
+        ["--dataset", dataset, "--index", "index.npz", "--count", "0", *options]
+    )
+
+
+def _plots() -> set[str]:
+    return {name for name in os.listdir("output") if name.endswith(".png")}
+
+
+def test_resumed_run_plots_every_galaxy(
+    synthetic_dataset, tmp_path, monkeypatch, capsys
+):
+    for directory in ("uninterrupted", "interrupted"):
+        (tmp_path / directory).mkdir()
+    monkeypatch.chdir(tmp_path / "uninterrupted")
+    assert _run(synthetic_dataset, "--seed", "1") == 0
+    expected = _plots()
+
+    monkeypatch.chdir(tmp_path / "interrupted")
+    run_galaxies = galaxy_temp.run_galaxies
+
+    def interrupted(*args, **kwargs):
+        for checkpoint, result in enumerate(run_galaxies(*args, **kwargs)):
+            if checkpoint == 3:
+                raise KeyboardInterrupt
+            yield result
+
+    monkeypatch.setattr(galaxy_temp, "CHECKPOINT_INTERVAL", 1)
+    monkeypatch.setattr(galaxy_temp, "run_galaxies", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        _run(synthetic_dataset, "--seed", "1")
+    assert not _plots()
+
+    monkeypatch.setattr(galaxy_temp, "run_galaxies", run_galaxies)
+    assert _run(synthetic_dataset, "--resume") == 0
+    assert "Resuming: 3 galaxies done, 3 to go" in capsys.readouterr().out
+    assert _plots() == expected
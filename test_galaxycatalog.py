@@ -0,0 +1,46 @@
+from galaxycatalog import GalaxyCatalog
+from galaxylocation import GalaxyLocation
+
+import h5py
+import numpy
+import pytest
+
+
+@pytest.fixture
+def dataset_path(tmp_path):
+    path = str(tmp_path / "Dataset.h5")
+    with h5py.File(path, "w") as dataset:
+        dataset["images"] = numpy.zeros((4, 16, 16, 3), dtype=numpy.uint8)
+        dataset["ans"] = numpy.array([6, 7, 6, 2])
+    return path
+
+
+def test_concurrent_saves_keep_each_others_locations(tmp_path, dataset_path):
+    index_path = str(tmp_path / "index.npz")
+    with h5py.File(dataset_path, "r") as dataset:
+        first = GalaxyCatalog.open(dataset, dataset_path, index_path)
+        second = GalaxyCatalog.open(dataset, dataset_path, index_path)
+
+    first.record_location(0, GalaxyLocation((8, 8), 5))
+    second.record_location(2, GalaxyLocation((7, 9), 4))
+    first.save()
+    second.save()
+
+    with h5py.File(dataset_path, "r") as dataset:
+        merged = GalaxyCatalog.open(dataset, dataset_path, index_path)
+    assert merged.location(0).radius == 5
+    assert merged.location(2).radius == 4
+    assert merged.location(1) is None
+
+
+def test_unwritable_index_is_kept_in_memory(tmp_path, dataset_path):
+    (tmp_path / "not_a_directory").write_text("")
+    index_path = str(tmp_path / "not_a_directory" / "index.npz")
+    with h5py.File(dataset_path, "r") as dataset:
+        catalog = GalaxyCatalog.open(dataset, dataset_path, index_path)
+
+    catalog.record_location(1, GalaxyLocation((8, 8), 3))
+    catalog.flush()
+
+    assert catalog.location(1).radius == 3
+    assert list(catalog.select()) == [0, 1, 2]
@@ -0,0 +1,29 @@
+from galaxyfinder import GalaxyFinder
+from image import Image
+
+import numpy
+import pytest
+
+
+def _galaxy_with_neighbor(neighbor_peak: float) -> Image:
+    """
+    A truncated Gaussian galaxy at the center of the image, with a bright compact
+    source 16 pixels to its right, inside the centroid window but not touching it.
+    """
+    y, x = numpy.mgrid[:128, :128].astype(float)
+    galaxy = (y - 64) ** 2 + (x - 64) ** 2
+    neighbor = (y - 64) ** 2 + (x - 80) ** 2
+    data = numpy.where(galaxy <= 100, 200 * numpy.exp(-galaxy / 72), 0.0)
+    data += numpy.where(neighbor <= 16, neighbor_peak * numpy.exp(-neighbor / 8), 0.0)
+    return Image(data)
+
+
+@pytest.mark.parametrize("neighbor_peak", [0.0, 1000.0])
+def test_fast_mode_matches_full_search_next_to_bright_neighbor(neighbor_peak):
+    image = _galaxy_with_neighbor(neighbor_peak)
+
+    fast = GalaxyFinder(image, fast=True).find_galaxy()
+    full = GalaxyFinder(image).find_galaxy()
+
+    assert fast.center == full.center == (64, 64)
+    assert fast.radius == full.radius
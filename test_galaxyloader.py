@@ -0,0 +1,36 @@
+from galaxyloader import GalaxyLoader
+from rawdataset import RawDataset
+
+import galaxyloader
+import h5py
+import numpy
+
+
+def test_raw_path_is_mapped_once_per_loader(synthetic_dataset, tmp_path, monkeypatch):
+    path = str(tmp_path / "spirals.raw")
+    export = RawDataset.export(synthetic_dataset, path)
+    galaxy_number = int(export.galaxy_numbers[0])
+    export.close()
+
+    opened = []
+
+    class CountingRawDataset(RawDataset):
+        def __init__(self, path: str) -> None:
+            super().__init__(path)
+            opened.append(self)
+
+    monkeypatch.setattr(galaxyloader, "RawDataset", CountingRawDataset)
+
+    with GalaxyLoader(galaxy_number, path) as galaxy:
+        galaxy.read_bands(["G"])
+        galaxy.read_bands(["R"])
+        wide = galaxy.load_image("Wide").data
+        assert len(opened) == 1
+    assert galaxy._raw_dataset is None
+    assert opened[0].images.shape[0] == 0
+
+    with h5py.File(synthetic_dataset, "r") as dataset:
+        pixels = dataset["images"][galaxy_number].astype("uint16")
+    numpy.testing.assert_array_equal(wide, pixels.sum(axis=2))
+    # Bands read before closing are still readable
+    numpy.testing.assert_array_equal(galaxy.load_image("G").data, pixels[:, :, 0])
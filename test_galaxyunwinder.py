@@ -0,0 +1,41 @@
+from galaxyimage import GalaxyImage
+from galaxyunwinder import GalaxyUnwinder
+from image import Image
+
+import numpy
+import pytest
+
+
+def test_bilinear_unwind_with_more_radii_than_pixels():
+    data = numpy.arange(64 * 64, dtype="float64").reshape(64, 64)
+    unwinder = GalaxyUnwinder(GalaxyImage(Image(data)))
+
+    polar = unwinder.unwind(num_radii=40, interpolation="bilinear")
+
+    assert polar.shape == (360, 40)
+    assert numpy.all(numpy.isfinite(polar))
+    assert polar.min() >= data.min() and polar.max() <= data.max()
+
+
+def _unwind_loop(data: numpy.ndarray, num_angles: int = 360) -> numpy.ndarray:
+    # The original per-sample unwind, which the cached remap must reproduce
+    center_x, center_y = data.shape[1] // 2, data.shape[0] // 2
+    max_radius = min(center_x, center_y)
+    polar = numpy.zeros((num_angles, max_radius))
+    theta_vals = numpy.linspace(0, 2 * numpy.pi, num_angles, endpoint=False)
+    r_vals = numpy.linspace(0, max_radius, max_radius, endpoint=False)
+    for i, theta in enumerate(theta_vals):
+        for j, r in enumerate(r_vals):
+            x = int(center_x + r * numpy.cos(theta))
+            y = int(center_y + r * numpy.sin(theta))
+            polar[i, j] = data[y, x]
+    return polar
+
+
+@pytest.mark.parametrize("shape", [(64, 64), (63, 65), (100, 100)])
+def test_nearest_unwind_matches_per_sample_loop(shape):
+    data = numpy.arange(shape[0] * shape[1], dtype="float64").reshape(shape)
+
+    polar = GalaxyUnwinder(GalaxyImage(Image(data))).unwind()
+
+    numpy.testing.assert_array_equal(polar, _unwind_loop(data))
@@ -0,0 +1,18 @@
+from image import Image
+
+import numpy
+import pytest
+
+
+def test_asarray_shares_pixels():
+    data = numpy.zeros((3, 4), dtype=numpy.float32)
+
+    assert numpy.asarray(Image(data), copy=False) is data
+
+
+def test_asarray_without_copy_refuses_dtype_conversion():
+    image = Image(numpy.zeros((3, 4), dtype=numpy.float32))
+
+    with pytest.raises(ValueError):
+        numpy.asarray(image, dtype=numpy.float64, copy=False)
+    assert numpy.asarray(image, dtype=numpy.float64).dtype == numpy.float64
@@ -0,0 +1,85 @@
+from instrumentation import Instrumentation
+
+import numpy
+import pickle
+import time
+import tracemalloc
+
+
+def _busy(seconds: float) -> None:
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+def test_nested_stage_time_is_not_counted_twice():
+    instrumentation = Instrumentation(enabled=True, trace_memory=False)
+
+    with instrumentation.measure("radial_profile"):
+        _busy(0.02)
+        with instrumentation.measure("temperature_image"):
+            _busy(0.1)
+
+    inner, outer = instrumentation.samples
+    assert inner[0] == "temperature_image" and outer[0] == "radial_profile"
+    assert inner[2] >= 0.1
+    assert 0.02 <= outer[2] < 0.08
+    assert outer[1] < inner[1]
+
+
+def test_nested_stages_are_counted_and_memory_includes_inner_peak():
+    instrumentation = Instrumentation(enabled=True)
+    try:
+        for _ in range(3):
+            with instrumentation.measure("radial_profile") as outer:
+                small = numpy.ones(2**16)
+                outer.add_array(small)
+                with instrumentation.measure("temperature_image") as inner:
+                    large = numpy.ones(2**20)
+                    inner.add_array(large)
+                    del large
+                del small
+    finally:
+        tracemalloc.stop()
+
+    report = instrumentation.report()
+    assert report["radial_profile"]["count"] == 3
+    assert report["temperature_image"]["count"] == 3
+
+    inner_peaks = [sample[3] for sample in instrumentation.samples[0::2]]
+    outer_peaks = [sample[3] for sample in instrumentation.samples[1::2]]
+    assert all(peak >= 2**20 * 8 for peak in inner_peaks)
+    # The outer stage's peak is reached while the inner stage holds its array
+    assert all(
+        outer >= inner + 2**16 * 8 for outer, inner in zip(outer_peaks, inner_peaks)
+    )
+    assert report["temperature_image"]["array_bytes"]["max"] == 2**20 * 8
+    assert report["radial_profile"]["array_bytes"]["max"] == 2**16 * 8
+
+
+def test_drained_samples_round_trip_through_add_samples():
+    worker = Instrumentation(enabled=True, trace_memory=False)
+    for stage in ("find_galaxy", "temperature_image", "find_galaxy"):
+        with worker.measure(stage) as sample:
+            sample.add_array(numpy.zeros(16))
+    expected = worker.report()
+
+    samples = worker.drain()
+    assert worker.samples == [] and worker.report() == {}
+
+    parent = pickle.loads(pickle.dumps(worker))
+    assert parent.enabled and parent.samples == []
+    parent.add_samples(samples)
+    assert parent.samples == samples
+    assert parent.report() == expected
+    assert parent.report()["find_galaxy"]["count"] == 2
+
+
+def test_disabled_instrumentation_records_nothing():
+    instrumentation = Instrumentation()
+
+    with instrumentation.measure("galaxy") as sample:
+        with instrumentation.measure("read"):
+            sample.add_array(numpy.zeros(4))
+
+    assert instrumentation.samples == [] and instrumentation.report() == {}
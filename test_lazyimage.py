@@ -0,0 +1,94 @@
+from image import Image
+from lazyimage import TILE_BYTES, LazyImage
+
+import numpy
+import pytest
+
+# Several tiles of rows, the last one shorter than the rest
+TILED_SHAPE = (1000, 777)
+
+
+def _images() -> tuple[Image, Image]:
+    rng = numpy.random.default_rng(0)
+    return Image(rng.random((7, 5))), Image(rng.random((7, 5)))
+
+
+def test_evaluate_out_fills_buffer_for_leaf_image():
+    r, _ = _images()
+    buffer = numpy.zeros(r.shape)
+
+    result = LazyImage(r).evaluate(out=buffer)
+
+    assert result is buffer
+    numpy.testing.assert_array_equal(buffer, r.data)
+
+
+def test_evaluate_out_fills_buffer_for_evaluated_image():
+    r, g = _images()
+    difference = LazyImage(r) - LazyImage(g)
+    difference.data
+    buffer = numpy.zeros(r.shape)
+
+    difference.evaluate(out=buffer)
+
+    numpy.testing.assert_array_equal(buffer, r.data - g.data)
+
+
+def test_add_out_with_evaluated_operand():
+    r, g = _images()
+    buffer = numpy.full(r.shape, numpy.nan)
+
+    LazyImage(r).add(LazyImage(g), out=buffer)
+
+    numpy.testing.assert_array_equal(buffer, r.data + g.data)
+
+
+def test_asarray_evaluates_expression():
+    r, g = _images()
+
+    difference = numpy.asarray(LazyImage(r) - LazyImage(g))
+
+    numpy.testing.assert_array_equal(difference, r.data - g.data)
+
+
+def _tiled_images(dtype: str) -> list[Image]:
+    rng = numpy.random.default_rng(1)
+    if dtype == "uint8":
+        # No zeros, so division stays finite
+        return [
+            Image(rng.integers(1, 256, TILED_SHAPE, dtype=numpy.uint8))
+            for _ in range(4)
+        ]
+    return [Image(rng.uniform(0.5, 2.0, TILED_SHAPE).astype(dtype)) for _ in range(4)]
+
+
+def test_tiled_shape_spans_several_uneven_tiles():
+    height, width = TILED_SHAPE
+    tile_rows = TILE_BYTES // (width * 8)
+    assert height // tile_rows > 2
+    assert height % tile_rows != 0
+
+
+@pytest.mark.parametrize("dtype", ["float32", "uint8"])
+def test_tiled_chain_matches_eager_images(dtype):
+    r, g, z, w = _tiled_images(dtype)
+    eager = ((r - g) * z) / w + r
+
+    lazy = ((LazyImage(r) - LazyImage(g)) * LazyImage(z)) / LazyImage(w) + LazyImage(r)
+
+    assert lazy.data.dtype == eager.data.dtype
+    numpy.testing.assert_array_equal(lazy.data, eager.data)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "uint8"])
+def test_tiled_chain_into_out_matches_eager_images(dtype):
+    r, g, z, _ = _tiled_images(dtype)
+    eager = (r + g) * z - g
+    # An operand evaluated on its own is read back tile by tile
+    total = LazyImage(r) + LazyImage(g)
+    total.data
+    buffer = numpy.zeros(TILED_SHAPE, dtype=eager.data.dtype)
+
+    (total * LazyImage(z) - LazyImage(g)).evaluate(out=buffer)
+
+    numpy.testing.assert_array_equal(buffer, eager.data)
@@ -0,0 +1,103 @@
+from populationstatistics import (
+    SKETCH_ACCURACY,
+    SKETCH_RANGE,
+    PopulationStatistics,
+    QuantileSketch,
+    normalize_profile,
+)
+
+import numpy
+import pytest
+
+
+def _profiles(count: int = 500, seed: int = 0) -> list[numpy.ndarray]:
+    rng = numpy.random.default_rng(seed)
+    profiles = []
+    for _ in range(count):
+        length = rng.integers(10, 80)
+        radius = numpy.linspace(0, 1, length)
+        profile = rng.uniform(4000, 9000) * (1 - 0.4 * radius)
+        profile *= rng.lognormal(0, 0.05, length)
+        profile[rng.random(length) < 0.1] = numpy.nan
+        profiles.append(profile)
+    return profiles
+
+
+def test_normalize_profile():
+    grid = (numpy.arange(50) + 0.5) / 50
+
+    numpy.testing.assert_allclose(
+        normalize_profile(1000 + 500 * numpy.linspace(0, 1, 11)), 1000 + 500 * grid
+    )
+    # Past the last valid sample there is nothing to interpolate
+    half = normalize_profile([1.0, 2.0, numpy.nan, numpy.nan, numpy.nan])
+    assert not numpy.isnan(half[grid <= 0.25]).any()
+    assert numpy.isnan(half[grid > 0.25]).all()
+    assert numpy.isnan(normalize_profile([1.0, numpy.nan])).all()
+
+
+def test_statistics_match_numpy():
+    profiles = _profiles()
+    population = PopulationStatistics()
+    for profile in profiles:
+        population.add(6, profile)
+    normalized = numpy.stack([normalize_profile(profile) for profile in profiles])
+
+    curves = population.classes[6].curves(percentiles=(10, 50, 90))
+
+    numpy.testing.assert_array_equal(
+        curves["count"], numpy.isfinite(normalized).sum(axis=0)
+    )
+    numpy.testing.assert_allclose(
+        curves["mean"], numpy.nanmean(normalized, axis=0), rtol=1e-9
+    )
+    numpy.testing.assert_allclose(
+        curves["std"], numpy.nanstd(normalized, axis=0, ddof=1), rtol=1e-9
+    )
+    for percentile in (10, 50, 90):
+        for column, estimate in zip(normalized.T, curves[f"p{percentile}"]):
+            values = numpy.sort(column[numpy.isfinite(column)])
+            exact = values[int((percentile / 100) * (len(values) - 1))]
+            assert estimate == pytest.approx(exact, rel=SKETCH_ACCURACY)
+
+
+def test_merge_of_shards_reproduces_single_run(tmp_path):
+    profiles = _profiles()
+    classes = numpy.random.default_rng(1).choice([6, 7], len(profiles))
+    single = PopulationStatistics()
+    shards = [PopulationStatistics() for _ in range(3)]
+    for index, (galaxy_class, profile) in enumerate(zip(classes, profiles)):
+        single.add(galaxy_class, profile)
+        shards[index % 3].add(galaxy_class, profile)
+
+    merged = PopulationStatistics()
+    for index, shard in enumerate(shards):
+        # Shards are merged from the files they save, as sharding.py does
+        shard.save(str(tmp_path / f"population.shard-{index}-of-3.npz"))
+        merged.merge(
+            PopulationStatistics.load(
+                str(tmp_path / f"population.shard-{index}-of-3.npz")
+            )
+        )
+
+    assert sorted(merged.classes) == [6, 7]
+    for galaxy_class, statistics in single.classes.items():
+        result = merged.classes[galaxy_class]
+        numpy.testing.assert_array_equal(result.count, statistics.count)
+        numpy.testing.assert_allclose(result.mean, statistics.mean, rtol=1e-12)
+        numpy.testing.assert_allclose(result.m2, statistics.m2, rtol=1e-9)
+        numpy.testing.assert_array_equal(result.sketch.counts, statistics.sketch.counts)
+
+
+def test_sketch_clamps_values_outside_its_range():
+    sketch = QuantileSketch(bins=3)
+    low, high = SKETCH_RANGE
+
+    sketch.add(numpy.array([low / 10, high * 10, 0.0]))
+
+    estimates = sketch.quantiles([0.5])[0]
+    assert estimates[0] == pytest.approx(low, rel=SKETCH_ACCURACY)
+    assert estimates[1] == pytest.approx(high, rel=2 * SKETCH_ACCURACY)
+    # Non-positive temperatures have no place on the log scale
+    assert numpy.isnan(estimates[2])
+    assert sketch.counts.sum() == 2
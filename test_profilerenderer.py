@@ -0,0 +1,31 @@
+from profilerenderer import ProfileRenderer, render_profiles
+
+import os
+
+
+def _profiles(count: int) -> list[tuple[int, list[float]]]:
+    return [(galaxy_number, [5000.0, 6000.0, 5500.0]) for galaxy_number in range(count)]
+
+
+def test_render_profiles_creates_output_directory(tmp_path):
+    output_directory = str(tmp_path / "output")
+
+    paths = render_profiles(_profiles(2), output_directory)
+
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_render_profiles_keeps_order_across_workers(tmp_path):
+    output_directory = str(tmp_path / "output")
+
+    paths = render_profiles(_profiles(7), output_directory, workers=3)
+
+    assert paths == [os.path.join(output_directory, f"{n}.png") for n in range(7)]
+
+
+def test_render_summary_creates_output_directory(tmp_path):
+    path = str(tmp_path / "output" / "summary.png")
+
+    ProfileRenderer.render_summary(_profiles(3), path)
+
+    assert os.path.exists(path)
@@ -0,0 +1,47 @@
+from galaxylocation import GalaxyLocation
+from profilestore import ProfileStore
+
+import numpy
+
+
+def test_append_flush_and_reopen(tmp_path):
+    path = str(tmp_path / "profiles.h5")
+    with ProfileStore(path, buffer_size=2) as store:
+        run = store.begin_run({"seed": 1})
+        store.append(3, GalaxyLocation((10, 12), 5), [1.0, 2.0])
+        store.append(1, GalaxyLocation((8, 9), 3), [4.0, 5.0, 6.0])
+        store.append(7, GalaxyLocation((4, 4), 2), [7.0])
+        # The third row is still buffered, but reads see it
+        assert list(store.galaxy_numbers()) == [1, 3, 7]
+
+    with ProfileStore(path, "r") as store:
+        assert len(store) == 3 and 7 in store and 2 not in store
+        assert store.runs() == [{"seed": 1}]
+        assert store.profile(1) == [4.0, 5.0, 6.0]
+        assert store.profile(7) == [7.0]
+        location = store.location(3)
+        assert location.center == (10, 12) and location.radius == 5
+
+        rows = store.read([7, 3])
+        assert list(rows["galaxy_number"]) == [7, 3]
+        assert list(rows["run"]) == [run, run]
+        assert list(rows["length"]) == [1, 2]
+        # Profiles are padded with NaN to the widest one stored
+        assert rows["profile"].shape == (2, 3)
+        assert numpy.isnan(rows["profile"][0, 1:]).all()
+
+
+def test_latest_row_of_a_galaxy_is_read(tmp_path):
+    path = str(tmp_path / "profiles.h5")
+    with ProfileStore(path) as store:
+        store.begin_run({"attempt": 1})
+        store.append(5, GalaxyLocation((1, 1), 1), [1.0])
+    with ProfileStore(path) as store:
+        second = store.begin_run({"attempt": 2})
+        store.append(5, GalaxyLocation((2, 2), 2), [2.0, 3.0])
+
+    with ProfileStore(path, "r") as store:
+        assert len(store) == 1
+        assert store.profile(5) == [2.0, 3.0]
+        assert store.location(5).radius == 2
+        assert store.read([5])["run"][0] == second
@@ -0,0 +1,85 @@
+from galaxyimage import GalaxyImage
+from image import Image
+from radialprofiler import RadialProfiler
+
+import numpy
+import pytest
+
+
+def _image(height: int = 41, width: int = 41, seed: int = 0) -> numpy.ndarray:
+    rng = numpy.random.default_rng(seed)
+    data = rng.normal(6000, 500, (height, width))
+    data[rng.random(data.shape) < 0.2] = numpy.nan
+    return data
+
+
+def _distances(height: int, width: int) -> numpy.ndarray:
+    y = numpy.arange(height)[:, numpy.newaxis] - height // 2
+    x = numpy.arange(width)[numpy.newaxis, :] - width // 2
+    return numpy.sqrt(x**2 + y**2)
+
+
+@pytest.mark.parametrize("shape", [(41, 41), (40, 46)])
+def test_compute_profile_averages_each_radius(shape):
+    data = _image(*shape)
+    profiler = RadialProfiler(GalaxyImage(Image(data)))
+    radius = _distances(*shape).astype(int)
+
+    profile = profiler.compute_profile()
+
+    assert len(profile) == profiler.max_radius
+    expected = [numpy.nanmean(data[radius == r]) for r in range(profiler.max_radius)]
+    numpy.testing.assert_allclose(profile, expected)
+
+
+def test_compute_profile_of_tiny_image():
+    profiler = RadialProfiler(GalaxyImage(Image(numpy.ones((1, 3)))))
+
+    assert profiler.compute_profile(num_radii=4) == pytest.approx(
+        [numpy.nan] * 4, nan_ok=True
+    )
+    assert numpy.isnan(profiler.compute_statistics(num_radii=4)["median"]).all()
+
+
+def test_compute_statistics_matches_numpy():
+    data = _image()
+    profiler = RadialProfiler(GalaxyImage(Image(data)))
+    radius = _distances(*data.shape).astype(int)
+
+    statistics = profiler.compute_statistics(percentiles=(10, 90))
+
+    numpy.testing.assert_allclose(statistics["mean"], profiler.compute_profile())
+    for r in range(profiler.max_radius):
+        values = data[radius == r]
+        assert statistics["count"][r] == numpy.count_nonzero(~numpy.isnan(values))
+        assert statistics["median"][r] == pytest.approx(numpy.nanmedian(values))
+        assert statistics["p10"][r] == pytest.approx(numpy.nanpercentile(values, 10))
+
+
+def test_compute_statistics_sectors_split_every_pixel():
+    data = _image()
+    profiler = RadialProfiler(GalaxyImage(Image(data)))
+    radius = _distances(*data.shape).astype(int)
+    y, x = numpy.mgrid[-20:21, -20:21]
+
+    total = profiler.compute_statistics()
+    sectors = profiler.compute_statistics(sectors=4)
+
+    assert sectors["median"].shape == (4, profiler.max_radius)
+    numpy.testing.assert_array_equal(sectors["count"].sum(axis=0), total["count"])
+    # The first sector runs from angle 0 (x axis) towards increasing rows
+    first = data[(y >= 0) & (x > 0) & (radius == 10)]
+    assert sectors["median"][0, 10] == pytest.approx(numpy.nanmedian(first))
+
+
+def test_compute_profile_batch_matches_single_profiles():
+    images = numpy.stack([_image(seed=seed) for seed in range(3)])
+    radii = numpy.array([20, 12, 5])
+
+    profiles = RadialProfiler.compute_profile_batch(images, radii)
+
+    assert profiles.shape == (3, 20)
+    for image, radius, profile in zip(images, radii, profiles):
+        single = RadialProfiler(GalaxyImage(Image(image))).compute_profile()
+        numpy.testing.assert_allclose(profile[:radius], single[:radius])
+        assert numpy.isnan(profile[radius:]).all()
@@ -0,0 +1,51 @@
+from runmanifest import RunManifest
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / "manifest.jsonl")
+    manifest = RunManifest.create(path, {"seed": 1}, [4, 2, 9])
+    manifest.record_completed(2)
+    manifest.flush()
+    with open(path, "a") as file:
+        file.write('{"completed": [4], "fai')
+
+    resumed = RunManifest.load(path)
+    assert resumed.params == {"seed": 1}
+    assert resumed.completed == {2}
+    assert resumed.in_progress == [4, 9]
+
+    # Records appended after the torn line stay readable
+    resumed.record_completed(9)
+    resumed.flush()
+    assert RunManifest.load(path).completed == {2, 9}
+
+
+def test_pending_gives_up_after_max_attempts(tmp_path):
+    path = str(tmp_path / "manifest.jsonl")
+    manifest = RunManifest.create(path, {}, [1, 2, 3, 4])
+    manifest.record_completed(1)
+    manifest.record_failed(2, "no galaxy found")
+    manifest.record_failed(3, "no galaxy found")
+    manifest.flush()
+    manifest.record_failed(3, "no galaxy found")
+    manifest.flush()
+
+    resumed = RunManifest.load(path)
+    assert resumed.failures == {2: 1, 3: 2}
+    assert resumed.errors[3] == "no galaxy found"
+    assert resumed.pending(max_attempts=3) == [2, 3, 4]
+    assert resumed.pending(max_attempts=2) == [2, 4]
+    assert resumed.pending(max_attempts=1) == [4]
+
+
+def test_completing_a_failed_galaxy_clears_its_failures(tmp_path):
+    path = str(tmp_path / "manifest.jsonl")
+    manifest = RunManifest.create(path, {}, [1])
+    manifest.record_failed(1, "read error")
+    manifest.flush()
+    manifest.record_completed(1)
+    manifest.flush()
+
+    resumed = RunManifest.load(path)
+    assert resumed.completed == {1} and resumed.failures == {}
+    assert resumed.pending() == []
@@ -0,0 +1,103 @@
+from galaxylocation import GalaxyLocation
+from profilestore import ProfileStore
+from sharding import merge_shards, shard_galaxies, shard_path
+
+import galaxy_temp
+import numpy
+import os
+
+PARAMS = {"seed": 0, "count": 0, "dataset": "Dataset.h5"}
+
+
+def _write_shard(
+    directory, index: int, count: int, galaxies: list[int], stored: list[int], **params
+) -> str:
+    directory.mkdir(exist_ok=True)
+    path = shard_path(str(directory / "profiles.h5"), (index, count))
+    with ProfileStore(path, "w") as store:
+        store.begin_run(
+            {**PARAMS, **params, "shard": [index, count], "galaxies": galaxies}
+        )
+        for galaxy_number in stored:
+            store.append(
+                galaxy_number, GalaxyLocation((5, 5), 3), [float(galaxy_number)]
+            )
+    return path
+
+
+def test_shards_split_every_galaxy_once():
+    galaxies = [9, 1, 4, 7, 2, 8, 3]
+
+    shards = [shard_galaxies(galaxies, index, 3) for index in range(3)]
+
+    assert [len(shard) for shard in shards] == [3, 2, 2]
+    assert sorted(numpy.concatenate(shards).tolist()) == sorted(galaxies)
+
+
+def test_merge_refuses_missing_shard(tmp_path):
+    paths = [_write_shard(tmp_path, 0, 3, [1, 2], [1, 2])]
+    paths.append(_write_shard(tmp_path, 2, 3, [5], [5]))
+    output = str(tmp_path / "merged.h5")
+
+    check = merge_shards(output, paths)
+
+    assert check.problems == ["shards [1] of 3 are missing"]
+    assert not os.path.exists(output)
+
+
+def test_merge_refuses_duplicate_galaxies_and_shards(tmp_path):
+    first = _write_shard(tmp_path / "a", 0, 2, [1, 2], [1, 2])
+    second = _write_shard(tmp_path / "b", 1, 2, [3], [2, 3])
+    again = _write_shard(tmp_path / "c", 1, 2, [3], [3])
+    output = str(tmp_path / "merged.h5")
+
+    assert merge_shards(output, [first, second]).duplicates == {2}
+    check = merge_shards(output, [first, second, again])
+    assert any("shard 1 is in both" in problem for problem in check.problems)
+    assert not os.path.exists(output)
+
+
+def test_merge_refuses_mismatched_parameters(tmp_path):
+    first = _write_shard(tmp_path, 0, 2, [1], [1])
+    second = _write_shard(tmp_path, 1, 2, [2], [2], seed=1)
+    output = str(tmp_path / "merged.h5")
+
+    check = merge_shards(output, [first, second])
+
+    assert check.problems == [
+        f"{second} ran with different parameters from the other shards"
+    ]
+    assert not os.path.exists(output)
+
+
+def test_merge_of_missing_galaxies_needs_allow_missing(tmp_path):
+    first = _write_shard(tmp_path, 0, 2, [1, 2], [1])
+    second = _write_shard(tmp_path, 1, 2, [3], [3])
+    output = str(tmp_path / "merged.h5")
+
+    assert merge_shards(output, [first, second]).missing == [2]
+    assert not os.path.exists(output)
+    merge_shards(output, [first, second], allow_missing=True)
+    with ProfileStore(output, "r") as merged:
+        assert merged.galaxy_numbers().tolist() == [1, 3]
+
+
+def test_merged_shards_equal_single_run(synthetic_dataset, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    options = ["--dataset", synthetic_dataset, "--index", "index.npz"]
+    options += ["--count", "0", "--plots", "none"]
+    assert galaxy_temp.main(options + ["--store", "single.h5"]) == 0
+    for index in range(3):
+        assert galaxy_temp.main(options + ["--shard", f"{index}/3"]) == 0
+
+    check = merge_shards(
+        "merged.h5", [f"output/profiles.shard-{index}-of-3.h5" for index in range(3)]
+    )
+
+    assert not check.problems and not check.duplicates and not check.missing
+    with ProfileStore("single.h5", "r") as single, ProfileStore(
+        "merged.h5", "r"
+    ) as merged:
+        expected, result = single.read(), merged.read()
+        for name in ("galaxy_number", "center", "radius", "length", "profile"):
+            numpy.testing.assert_array_equal(result[name], expected[name])
@@ -0,0 +1,105 @@
+from galaxylocation import GalaxyLocation
+from stagecache import StageCache
+
+import importlib.util
+import numpy
+import os
+import stagecache
+
+
+def _module(path, name: str, source: str):
+    file = path / f"{name}.py"
+    file.write_text(source)
+    spec = importlib.util.spec_from_file_location(name, file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_key_changes_with_params_inputs_and_code(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"))
+    first = _module(tmp_path, "stage_a", "SCALE = 1\n")
+    second = _module(tmp_path, "stage_b", "SCALE = 2\n")
+    array = numpy.arange(6, dtype=numpy.float32).reshape(2, 3)
+    key = cache.key("profile", {"radius": 5}, [3, array], [first])
+
+    assert cache.key("profile", {"radius": 5}, [3, array.copy()], [first]) == key
+    assert cache.key("other", {"radius": 5}, [3, array], [first]) != key
+    assert cache.key("profile", {"radius": 6}, [3, array], [first]) != key
+    assert cache.key("profile", {"radius": 5}, [4, array], [first]) != key
+    changed = array.copy()
+    changed[1, 2] += 1
+    assert cache.key("profile", {"radius": 5}, [3, changed], [first]) != key
+    # Same bytes in another dtype or shape are another input
+    assert cache.key("profile", {"radius": 5}, [3, array.reshape(3, 2)], [first]) != key
+    assert (
+        cache.key("profile", {"radius": 5}, [3, array.view(numpy.int32)], [first])
+        != key
+    )
+    assert cache.key("profile", {"radius": 5}, [3, array], [second]) != key
+    assert cache.key("profile", {"radius": 5}, [3, array], []) != key
+
+
+def test_stored_results_are_keyed_on_module_source(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"))
+    module = _module(tmp_path, "stage_c", "SCALE = 1\n")
+    calls = []
+
+    def compute():
+        calls.append(module.SCALE)
+        return numpy.full(4, module.SCALE, dtype=numpy.float32)
+
+    first = cache.get_or_compute("profile", {}, [1], [module], compute)
+    again = cache.get_or_compute("profile", {}, [1], [module], compute)
+    numpy.testing.assert_array_equal(first, again)
+    assert calls == [1]
+
+    # Editing the module's source makes its earlier results unreachable
+    module = _module(tmp_path, "stage_c", "SCALE = 2\n")
+    stagecache._source_hash.cache_clear()
+    changed = cache.get_or_compute("profile", {}, [1], [module], compute)
+    numpy.testing.assert_array_equal(changed, numpy.full(4, 2, dtype=numpy.float32))
+    assert calls == [1, 2]
+
+
+def test_locations_round_trip(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"))
+    key = cache.key("find_galaxy", {"fast": True}, [0])
+    assert cache.get("find_galaxy", key) is None
+
+    cache.put("find_galaxy", key, GalaxyLocation((12, 30), 9))
+
+    location = cache.get("find_galaxy", key)
+    assert location.center == (12, 30) and location.radius == 9
+
+
+def test_evict_removes_least_recently_used_until_under_max_bytes(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"))
+    rng = numpy.random.default_rng(0)
+    keys = [cache.key("temperature_image", {}, [number]) for number in range(4)]
+    for age, key in enumerate(keys):
+        cache.put("temperature_image", key, rng.random(256))
+        file = cache._file("temperature_image", key, ".npz")
+        os.utime(file, ns=(age * 10**9, age * 10**9))
+    # Reading a result marks it as recently used
+    assert cache.get("temperature_image", keys[0]) is not None
+    size = os.path.getsize(cache._file("temperature_image", keys[0], ".npz"))
+
+    cache.max_bytes = 2 * size + size // 2
+    cache.evict()
+
+    kept = [cache.get("temperature_image", key) is not None for key in keys]
+    assert kept == [True, False, False, True]
+
+
+def test_put_evicts_every_interval(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"), max_bytes=0)
+    cache.EVICTION_INTERVAL = 3
+    keys = [cache.key("radial_profile", {}, [number]) for number in range(3)]
+
+    cache.put("radial_profile", keys[0], numpy.zeros(8))
+    cache.put("radial_profile", keys[1], numpy.zeros(8))
+    assert cache.get("radial_profile", keys[0]) is not None
+
+    cache.put("radial_profile", keys[2], numpy.zeros(8))
+    assert all(cache.get("radial_profile", key) is None for key in keys)
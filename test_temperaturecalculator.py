@@ -0,0 +1,32 @@
+from galaxyimage import GalaxyImage
+from image import Image
+from precision import PROFILE_TOLERANCE
+from temperaturecalculator import TemperatureCalculator
+
+import numpy
+import pytest
+
+
+@pytest.mark.parametrize("use_lookup_table", [False, True])
+@pytest.mark.parametrize("dtype", ["float32", "float64"])
+def test_compute_temperature_image_follows_out_dtype(tmp_path, use_lookup_table, dtype):
+    rng = numpy.random.default_rng(0)
+    r, g = (
+        GalaxyImage(Image(rng.integers(0, 256, (6, 4), dtype=numpy.uint8)))
+        for _ in range(2)
+    )
+    calculator = TemperatureCalculator(
+        r,
+        g,
+        use_lookup_table=use_lookup_table,
+        lookup_table_path=str(tmp_path / "table.npz"),
+    )
+    out = numpy.empty(r.shape, dtype=dtype)
+
+    temperature = calculator.compute_temperature_image(out=out)
+
+    assert temperature.data is out
+    reference = TemperatureCalculator(r, g, dtype="float64").compute_temperature(
+        r.data, g.data
+    )
+    numpy.testing.assert_allclose(out, reference, rtol=PROFILE_TOLERANCE)